@@ -0,0 +1,145 @@
+"""
+Compares the throughput of the tender list under WSGI and ASGI, with many
+concurrent slow clients, against the database configured in .env.
+
+    pip install gunicorn uvicorn
+    python benchmarks/async_reads.py --concurrency 200 --slow-ms 200 --duration 20
+
+Three setups are measured, each with the same number of worker processes:
+- gunicorn with threaded workers serving the DRF view (GET /api/v1/tenders/)
+- uvicorn serving the same DRF view, which runs in a worker thread
+- uvicorn serving the async view (GET /api/v1/async/tenders/)
+
+Every client opens a connection, sends the request line, waits --slow-ms before
+sending the rest of the request, as a client on a slow network would, and reads
+the whole response. Without a pool (pip install "psycopg[binary,pool]"), the
+ASGI setups open a database connection per request, so keep --concurrency
+below the server's max_connections. A 'benchmark' user is created in the database if it doesn't
+exist.
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+import django
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tenderhubapi.settings')
+
+
+def server_commands(args, port):
+    """Returns {name: (command, connection mode, path)} of the setups."""
+    gunicorn = [
+        sys.executable, '-m', 'gunicorn', 'tenderhubapi.wsgi', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(args.workers), '--threads', str(args.threads), '--log-level', 'warning',
+    ]
+    uvicorn = [
+        sys.executable, '-m', 'uvicorn', 'tenderhubapi.asgi:application', '--port', str(port),
+        '--workers', str(args.workers), '--log-level', 'warning',
+    ]
+    # Under ASGI every request runs its queries in a thread of its own, so
+    # connections can't be kept per thread: they are pooled, or opened per request.
+    asgi_mode = 'pool' if importlib.util.find_spec('psycopg_pool') else 'none'
+    return {
+        'wsgi (DRF)': (gunicorn, 'persistent', '/api/v1/tenders/'),
+        'asgi (DRF)': (uvicorn, asgi_mode, '/api/v1/tenders/'),
+        'asgi (async)': (uvicorn, asgi_mode, '/api/v1/async/tenders/'),
+    }
+
+
+async def wait_for_server(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+async def slow_request(port, path, host, token, slow_seconds):
+    """Sends one request in two parts and returns (status code, latency in seconds)."""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\n'.encode())
+        await writer.drain()
+        await asyncio.sleep(slow_seconds)
+        writer.write(
+            f'Host: {host}\r\nAuthorization: Bearer {token}\r\nConnection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status_code = int(response.split(b' ', 2)[1]) if response else 0
+    return status_code, time.perf_counter() - started
+
+
+async def load(port, path, host, token, args):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + args.duration
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            try:
+                status_code, latency = await slow_request(port, path, host, token, args.slow_ms / 1000)
+            except OSError:
+                status_code, latency = 0, None
+            if status_code == 200:
+                latencies.append(latency)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    return np.array(latencies) * 1000, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--slow-ms', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help="Threads per gunicorn worker")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    django.setup()
+    from django.conf import settings
+    from rest_framework_simplejwt.tokens import AccessToken
+    from users.models import User
+
+    user, _ = User.objects.get_or_create(username='benchmark')
+    token = str(AccessToken.for_user(user))
+    host = settings.ALLOWED_HOSTS[0]
+
+    for name, (command, mode, path) in server_commands(args, args.port).items():
+        server = subprocess.Popen(command, cwd=BASE_DIR, env={**os.environ, 'DB_CONNECTION_MODE': mode})
+        try:
+            asyncio.run(wait_for_server(args.port))
+            latencies, errors, elapsed = asyncio.run(load(args.port, path, host, token, args))
+        finally:
+            server.terminate()
+            server.wait()
+        if len(latencies):
+            print(
+                f"{name:>13}, {mode:>10} connections: {len(latencies) / elapsed:7.0f} req/s, p50 {np.percentile(latencies, 50):7.0f} ms, "
+                f"p99 {np.percentile(latencies, 99):7.0f} ms, {errors} errors"
+            )
+        else:
+            print(f"{name:>13}, {mode:>10} connections: no successful request, {errors} errors")
+
+
+if __name__ == '__main__':
+    main()
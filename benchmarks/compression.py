@@ -0,0 +1,58 @@
+"""
+Compares the size and compression time of a page of tender details with gzip
+and with brotli at several qualities.
+
+    pip install brotli
+    python benchmarks/compression.py --tenders 10 --bids 5 --repeat 50
+
+The page is rendered from in-memory rows, as in benchmarks/renderers.py, so no
+database is needed.
+"""
+import argparse
+import time
+
+# Sets up Django, and builds the page
+from renderers import make_payload
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from tenderhubapi import compression  # noqa: E402
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tenders', type=int, default=10)
+    parser.add_argument('--bids', type=int, default=5, help="Bids per tender")
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    content = JSONRenderer().render(make_payload(args.tenders, args.bids))
+    print(f"{'identity':>10}: {len(content) / 1024:7.1f} KiB")
+    codings = {'gzip': compression.gzip_compress}
+    if compression.brotli is not None:
+        for quality in (1, 4, 5, 6, 11):
+            codings[f'br q={quality}'] = lambda content, quality=quality: compression.brotli.compress(
+                content, quality=quality
+            )
+    else:
+        print("Install brotli to compare it")
+
+    for name, compress in codings.items():
+        elapsed, compressed = best_time(lambda: compress(content), args.repeat)
+        print(
+            f"{name:>10}: {len(compressed) / 1024:7.1f} KiB ({len(compressed) / len(content):4.0%}), "
+            f"compressed in {elapsed * 1000:6.2f} ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Times GET /api/v1/tags/ through the WSGI handler with each database connection
+mode of settings.DB_CONNECTIONS, against the database configured in .env.
+
+    python benchmarks/connection_pool.py --requests 2000 --threads 8
+    python benchmarks/connection_pool.py --mode persistent
+
+Without --mode, every mode runs in its own process; 'pool' is skipped unless
+psycopg 3 and psycopg_pool are installed. A 'benchmark' user is created in the
+database if it doesn't exist.
+"""
+import argparse
+import importlib.util
+import io
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tenderhubapi.settings')
+
+MODES = ['none', 'persistent', 'pool']
+
+
+def run_mode(args):
+    django.setup()
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from rest_framework_simplejwt.tokens import AccessToken
+    from tenderhubapi.db_connections import connection_stats
+    from users.models import User
+
+    user, _ = User.objects.get_or_create(username='benchmark')
+    token = str(AccessToken.for_user(user))
+    application = get_wsgi_application()
+
+    def request(_):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': '/api/v1/tags/',
+            'SERVER_NAME': settings.ALLOWED_HOSTS[0],
+            'SERVER_PORT': '80',
+            'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': sys.stderr,
+        }
+        started = time.perf_counter()
+        response = application(environ, lambda status, headers: None)
+        b''.join(response)
+        # Fires request_finished, which closes or keeps the connection
+        response.close()
+        return time.perf_counter() - started
+
+    # Warm up the imports, caches and (in 'pool' mode) the pool
+    for _ in range(args.threads):
+        request(None)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        latencies = np.array(list(executor.map(request, range(args.requests)))) * 1000
+    elapsed = time.perf_counter() - started
+
+    opened = connection_stats()['databases']['default']['connections_opened']
+    print(
+        f"{settings.DB_CONNECTIONS['MODE']:>10}: {args.requests / elapsed:8.0f} req/s, "
+        f"mean {latencies.mean():6.2f} ms, p50 {np.percentile(latencies, 50):6.2f} ms, "
+        f"p95 {np.percentile(latencies, 95):6.2f} ms, {opened} connections opened"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--mode', choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        os.environ['DB_CONNECTION_MODE'] = args.mode
+        run_mode(args)
+        return
+
+    for mode in MODES:
+        if mode == 'pool' and importlib.util.find_spec('psycopg_pool') is None:
+            print(f"{mode:>10}: skipped, psycopg_pool is not installed")
+            continue
+        subprocess.run(
+            [sys.executable, __file__, '--mode', mode, '--requests', str(args.requests), '--threads', str(args.threads)],
+            check=True,
+        )
+
+
+if __name__ == '__main__':
+    main()
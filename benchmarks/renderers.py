@@ -0,0 +1,102 @@
+"""
+Times rendering and parsing TenderDetailSerializer payloads with DRF's JSON
+classes, the orjson ones and MessagePack.
+
+    pip install orjson msgpack
+    python benchmarks/renderers.py --tenders 100 --bids 20 --repeat 20
+
+The payload is a page of tender details, each with its bids and comments,
+serialized from in-memory rows, so no database is needed.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tenderhubapi.settings')
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from tender.models import Bid, Category, Comment, Tag, Tender, VendorStats  # noqa: E402
+from tender.serializers import TenderDetailSerializer  # noqa: E402
+from tenderhubapi import renderers  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def make_payload(tender_count, bid_count):
+    now = timezone.now()
+    users = [User(id=index + 1, username=f'user{index}', is_client=True, is_vendor=True) for index in range(50)]
+    for user in users:
+        user.vendor_stats = VendorStats(vendor_id=user.id, bids_total=10, bids_won=2, deliveries=2, on_time_deliveries=1)
+    category = Category(id=1, name='Design', description='Graphic and web design')
+    tags = [Tag(id=index + 1, name=f'tag{index}') for index in range(3)]
+
+    tenders = []
+    for index in range(tender_count):
+        tender = Tender(
+            tender_id=index + 1, client=users[index % 50], title=f'Tender {index}', description='Une description ' * 30,
+            max_duration=30, min_budget=Decimal('1000.00'), max_budget=Decimal('5000.00'), created_at=now,
+            deadline=(now + timedelta(days=30)).date(), category=category, status='open',
+        )
+        tender.bid_count = bid_count
+        bids = [
+            Bid(
+                bid_id=index * bid_count + number, tender=tender, vendor=users[number % 50],
+                amount=Decimal('2500.50'), proposal='A proposal ' * 20, delivery_time=10, created_at=now,
+            )
+            for number in range(bid_count)
+        ]
+        comments = [Comment(comment_id=index + 1, tender=tender, user=users[0], content='A comment', created_at=now)]
+        tender._prefetched_objects_cache = {'tags': tags, 'bids': bids, 'comments': comments}
+        tenders.append(tender)
+    context = {'request': APIRequestFactory().get('/')}
+    return {'count': tender_count, 'results': TenderDetailSerializer(tenders, many=True, context=context).data}
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tenders', type=int, default=100)
+    parser.add_argument('--bids', type=int, default=20, help="Bids per tender")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payload = make_payload(args.tenders, args.bids)
+    classes = {'DRF json': (JSONRenderer, JSONParser)}
+    if renderers.orjson is not None:
+        classes['orjson'] = (renderers.ORJSONRenderer, renderers.ORJSONParser)
+    if renderers.msgpack is not None:
+        classes['msgpack'] = (renderers.MessagePackRenderer, renderers.MessagePackParser)
+
+    for name, (renderer_class, parser_class) in classes.items():
+        rendered_in, content = best_time(lambda: renderer_class().render(payload), args.repeat)
+        parsed_in, _ = best_time(lambda: parser_class().parse(io.BytesIO(content)), args.repeat)
+        print(
+            f"{name:>8}: {len(content) / 1024:7.0f} KiB, rendered in {rendered_in * 1000:6.2f} ms, "
+            f"parsed in {parsed_in * 1000:6.2f} ms"
+        )
+    if len(classes) < 3:
+        print("Install orjson and msgpack to compare them")
+
+
+if __name__ == '__main__':
+    main()
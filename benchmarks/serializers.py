@@ -0,0 +1,96 @@
+"""
+Times the list serializers of tenders, bids and comments with DRF's field
+machinery and with their compiled read path.
+
+    python benchmarks/serializers.py --rows 2000 --repeat 5
+
+The rows are built in memory, with their related rows loaded as
+select_related and prefetch_related would, so only the serialization is
+measured and no database is needed.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tenderhubapi.settings')
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework import serializers  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from tender.models import Bid, Category, Comment, Tag, Tender, VendorStats  # noqa: E402
+from tender.serializers import BidSerializer, CommentSerializer, TenderSerializer  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def make_rows(count):
+    now = timezone.now()
+    users = [User(id=index + 1, username=f'user{index}', is_client=True, is_vendor=index % 2 == 0) for index in range(50)]
+    for user in users:
+        user.vendor_stats = VendorStats(vendor_id=user.id, bids_total=10, bids_won=2, deliveries=2, on_time_deliveries=1)
+    categories = [Category(id=index + 1, name=f'category{index}', description='A category') for index in range(10)]
+    tags = [Tag(id=index + 1, name=f'tag{index}') for index in range(20)]
+
+    tenders, bids, comments = [], [], []
+    for index in range(count):
+        tender = Tender(
+            tender_id=index + 1, client=users[index % 50], title=f'Tender {index}', description='A description ' * 20,
+            max_duration=30, min_budget=Decimal('1000.00'), max_budget=Decimal('5000.00'),
+            created_at=now - timedelta(minutes=index), deadline=(now + timedelta(days=30)).date(),
+            category=categories[index % 10] if index % 7 else None, status='open',
+        )
+        tender.bid_count = index % 5
+        tender._prefetched_objects_cache = {'tags': tags[index % 20:index % 20 + 3]}
+        tenders.append(tender)
+        bids.append(Bid(
+            bid_id=index + 1, tender=tender, vendor=users[index % 50], amount=Decimal('2500.00'),
+            proposal='A proposal ' * 20, delivery_time=10, created_at=now, status='pending',
+        ))
+        comments.append(Comment(
+            comment_id=index + 1, tender=tender, user=users[index % 50], content='A comment', created_at=now,
+        ))
+    return {'tenders': (TenderSerializer, tenders), 'bids': (BidSerializer, bids), 'comments': (CommentSerializer, comments)}
+
+
+def time_serializer(serialize, repeat):
+    """Returns the best time of `repeat` runs, and the rendered output."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = serialize()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, JSONRenderer().render(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    context = {'request': APIRequestFactory().get('/')}
+    for name, (serializer_class, rows) in make_rows(args.rows).items():
+        drf, drf_output = time_serializer(
+            lambda: serializers.ListSerializer(rows, child=serializer_class(), context=context).data, args.repeat
+        )
+        compiled, compiled_output = time_serializer(
+            lambda: serializer_class(rows, many=True, context=context).data, args.repeat
+        )
+        assert compiled_output == drf_output, f"The compiled {name} differ from DRF's"
+        print(
+            f"{name:>9}: DRF {drf / args.rows * 1e6:6.1f} us/row, compiled {compiled / args.rows * 1e6:6.1f} us/row, "
+            f"{drf / compiled:4.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
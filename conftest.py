@@ -0,0 +1,35 @@
+import pytest
+from django.db import connections
+
+from tenderhubapi.db_router import replica_health
+from tenderhubapi.reference_data import REFERENCE_TABLES
+
+@pytest.fixture(autouse=True)
+def clear_reference_data():
+    # The cached rows of a test's rolled back transaction must not leak into the next test
+    for table in REFERENCE_TABLES:
+        table.clear()
+    yield
+    for table in REFERENCE_TABLES:
+        table.clear()
+
+@pytest.fixture
+def replica(settings):
+    """A second connection to the test database, standing in for a streaming replica."""
+    def add_replica(**overrides):
+        connections.settings['replica'] = {**connections['default'].settings_dict, **overrides}
+        settings.READ_REPLICAS = {**settings.READ_REPLICAS, 'ALIASES': ['replica']}
+        replica_health.reset()
+        replica_connection = connections['replica']
+        # Connected up front, as the test case refuses lazy connections to databases it does not know of
+        try:
+            replica_connection.connect()
+        except Exception:
+            pass
+        return replica_connection
+    yield add_replica
+    if 'replica' in connections.settings:
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+    replica_health.reset()
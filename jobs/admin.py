@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+from tenderhubapi.pagination import EstimatedCountPaginator
+from .models import Job
+
+def requeue_jobs(modeladmin, request, queryset):
+    count = queryset.filter(status='dead').update(status='queued', attempts=0, run_at=timezone.now())
+    modeladmin.message_user(request, f"{count} dead jobs were queued again.")
+requeue_jobs.short_description = "Queue selected dead jobs again"
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'task', 'queue', 'priority', 'status', 'attempts', 'run_at', 'wait_ms', 'duration_ms', 'finished_at')
+    list_filter = ('status', 'queue', 'task')
+    search_fields = ('=job_id', 'task')
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = [requeue_jobs]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,44 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.worker import load_tasks, run_processes, run_threads
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued jobs with a pool of worker threads or processes. "
+        "Workers poll every --interval seconds while idle unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOBS['WORKERS'],
+            help="Number of workers (default: JOBS['WORKERS']).",
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help="Run the workers as processes instead of threads, for CPU-bound tasks.",
+        )
+        parser.add_argument(
+            '--queue', action='append', dest='queues',
+            help="Queue to take jobs from, can be repeated (default: 'default').",
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="Seconds between two checks for due jobs while idle (default: 1).",
+        )
+        parser.add_argument('--once', action='store_true', help="Run the due jobs and exit.")
+
+    def handle(self, *args, **options):
+        load_tasks()
+        queues = options['queues'] or ['default']
+        workers = max(1, options['workers'])
+
+        mode = 'processes' if options['processes'] else 'threads'
+        self.stdout.write(f"Running {workers} worker {mode} on {', '.join(queues)}.")
+        if options['processes']:
+            run_processes(queues, workers, options['interval'], options['once'])
+        else:
+            run_threads(queues, workers, threading.Event(), options['interval'], options['once'])
@@ -0,0 +1,55 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+class Job(models.Model):
+    """
+    A call of a registered task, run by `python manage.py run_jobs`.
+    
+    Queued jobs are claimed by priority (highest first), then by `run_at`. A job
+    that raises is queued again with an exponential backoff, and moved to 'dead'
+    once it has failed `max_attempts` times.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('dead', 'Dead'),
+    )
+    
+    job_id = models.BigAutoField(primary_key=True)
+    task = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    queue = models.CharField(max_length=50, default='default')
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    # Renewed by the worker running the job; a running job past it has lost its worker
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Timing of the latest attempt, in milliseconds
+    wait_ms = models.FloatField(null=True, blank=True)
+    duration_ms = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            # Only the queued jobs are scanned when claiming, in claim order
+            models.Index(
+                fields=['queue', '-priority', 'run_at', 'job_id'],
+                condition=Q(status='queued'), name='job_claim_idx'
+            ),
+            models.Index(fields=['lease_expires_at'], condition=Q(status='running'), name='job_running_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.job_id}"
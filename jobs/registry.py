@@ -0,0 +1,53 @@
+"""
+Registry of the functions that can be queued as jobs.
+
+Tasks are registered with the `task` decorator in a `tasks` module of any
+installed app, which the worker imports on start:
+
+    @task(queue='exports', priority=5)
+    def export_bids(tender_id):
+        ...
+
+    export_bids.enqueue(tender_id=3)
+    export_bids.enqueue(run_at=tomorrow, tender_id=3)
+
+Keyword arguments are stored as JSON, so they should be ids and plain values.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+
+registry = {}
+
+class Task:
+    def __init__(self, func, name, queue, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, run_at=None, priority=None, queue=None, **kwargs):
+        """
+        Queues a call of the task. Inside a transaction, the job is only visible
+        to the workers once the transaction commits.
+        """
+        return Job.objects.create(
+            task=self.name,
+            kwargs=kwargs,
+            queue=queue or self.queue,
+            priority=self.priority if priority is None else priority,
+            run_at=run_at or timezone.now(),
+            max_attempts=self.max_attempts or settings.JOBS['MAX_ATTEMPTS'],
+        )
+
+def task(name=None, queue='default', priority=0, max_attempts=None):
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registry[task_name] = Task(func, task_name, queue, priority, max_attempts)
+        return registry[task_name]
+    return register
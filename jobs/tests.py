@@ -0,0 +1,139 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+from .registry import registry, task
+from .worker import (
+    claim_job, load_tasks, requeue_stale_jobs, run_job, run_pending, run_processes, run_threads, work
+)
+
+calls = []
+
+@task(name='jobs.tests.record')
+def record(label):
+    calls.append(label)
+
+@task(name='jobs.tests.fail', max_attempts=2)
+def fail():
+    raise ValueError("broken")
+
+@task(name='jobs.tests.noop')
+def noop(n):
+    pass
+
+@task(name='jobs.tests.watch_lease')
+def watch_lease():
+    for _ in range(2):
+        calls.append(Job.objects.get(task='jobs.tests.watch_lease').lease_expires_at)
+        time.sleep(0.5)
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+@pytest.mark.django_db
+class TestQueue:
+    def test_jobs_run_by_priority_then_schedule(self):
+        now = timezone.now()
+        record.enqueue(label='low', priority=-1)
+        record.enqueue(label='first', run_at=now - timedelta(minutes=1))
+        record.enqueue(label='second')
+        record.enqueue(label='urgent', priority=10)
+        record.enqueue(label='later', run_at=now + timedelta(hours=1))
+        record.enqueue(label='other queue', queue='exports')
+
+        assert run_pending(['default'], 'test') == 4
+        assert calls == ['urgent', 'first', 'second', 'low']
+
+        job = Job.objects.get(kwargs={'label': 'first'})
+        assert (job.status, job.attempts) == ('succeeded', 1)
+        assert job.wait_ms >= 60000
+        assert job.duration_ms is not None
+        assert Job.objects.filter(status='queued').count() == 2
+
+    def test_failing_job_is_retried_then_dead_lettered(self):
+        job = fail.enqueue()
+        run_pending(['default'], 'test')
+        job.refresh_from_db()
+        assert (job.status, job.attempts) == ('queued', 1)
+        assert 'ValueError: broken' in job.last_error
+        assert job.run_at > job.finished_at
+
+        # Not due before its backoff has passed
+        assert claim_job(['default'], 'test') is None
+        claimed = claim_job(['default'], 'test', now=job.run_at)
+        assert claimed.pk == job.pk
+        run_job(claimed)
+        job.refresh_from_db()
+        assert (job.status, job.attempts) == ('dead', 2)
+
+    def test_unknown_task_is_dead_lettered(self):
+        job = Job.objects.create(task='missing.task', max_attempts=1)
+        run_pending(['default'], 'test')
+        job.refresh_from_db()
+        assert job.status == 'dead'
+        assert 'Unknown task' in job.last_error
+
+    def test_jobs_with_an_expired_lease_are_requeued(self):
+        now = timezone.now()
+        stale = record.enqueue(label='stale')
+        exhausted = record.enqueue(label='exhausted')
+        live = record.enqueue(label='live')
+        Job.objects.update(status='running', started_at=now - timedelta(hours=2), attempts=1)
+        Job.objects.filter(pk__in=[stale.pk, exhausted.pk]).update(lease_expires_at=now - timedelta(seconds=1))
+        Job.objects.filter(pk=exhausted.pk).update(attempts=F('max_attempts'))
+        # Running for long, but its worker keeps renewing the lease
+        Job.objects.filter(pk=live.pk).update(lease_expires_at=now + timedelta(seconds=30))
+
+        assert requeue_stale_jobs() == 2
+        assert Job.objects.get(pk=stale.pk).status == 'queued'
+        assert Job.objects.get(pk=exhausted.pk).status == 'dead'
+        assert Job.objects.get(pk=live.pk).status == 'running'
+
+    def test_outcome_of_a_requeued_job_is_discarded(self):
+        record.enqueue(label='slow')
+        job = claim_job(['default'], 'test')
+        # The lease expired meanwhile, and the job went to another worker
+        Job.objects.filter(pk=job.pk).update(status='running', locked_by='other')
+        run_job(job)
+        assert Job.objects.get(pk=job.pk).locked_by == 'other'
+
+    def test_task_modules_are_registered(self):
+        load_tasks()
+        assert 'tender.tasks.compute_market_stats' in registry
+
+@pytest.mark.django_db(transaction=True)
+class TestWorkerPool:
+    @pytest.mark.parametrize('mode', ['threads', 'processes'])
+    def test_every_job_runs_exactly_once(self, mode):
+        Job.objects.bulk_create([Job(task='jobs.tests.noop', kwargs={'n': n}) for n in range(30)])
+        if mode == 'threads':
+            run_threads(['default'], 4, threading.Event(), once=True)
+        else:
+            run_processes(['default'], 3, once=True)
+
+        jobs = list(Job.objects.all())
+        assert all(job.status == 'succeeded' and job.attempts == 1 for job in jobs)
+        assert len({job.kwargs['n'] for job in jobs}) == 30
+
+    def test_workers_requeue_expired_leases(self):
+        job = record.enqueue(label='orphaned')
+        Job.objects.filter(pk=job.pk).update(
+            status='running', attempts=1, locked_by='dead-worker', lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        work(['default'], 'test', threading.Event(), once=True)
+        job.refresh_from_db()
+        assert (job.status, job.attempts) == ('succeeded', 2)
+        assert calls == ['orphaned']
+
+    def test_lease_is_renewed_while_the_job_runs(self, settings):
+        settings.JOBS = {**settings.JOBS, 'LEASE': 2, 'HEARTBEAT_INTERVAL': 0.2}
+        Job.objects.create(task='jobs.tests.watch_lease')
+        run_threads(['default'], 1, threading.Event(), once=True)
+        first, second = calls
+        assert second > first
+        assert Job.objects.get().status == 'succeeded'
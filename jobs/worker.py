@@ -0,0 +1,235 @@
+"""
+Execution of queued jobs.
+
+Each worker claims one job at a time with SELECT ... FOR UPDATE SKIP LOCKED,
+marks it running and commits, then runs the task outside of any transaction.
+Workers run as threads or as forked processes of `python manage.py run_jobs`,
+and share nothing but the database. Process workers need the 'fork' start
+method, so they are not available on Windows.
+
+A running job is leased to its worker for JOBS['LEASE'] seconds, and a thread
+renews the lease every JOBS['HEARTBEAT_INTERVAL'] seconds while the task runs.
+Every worker requeues the running jobs whose lease expired, as their worker
+died, at most once per heartbeat interval. The outcome of a job is only saved
+by the worker that still holds it.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+def load_tasks():
+    """Imports the `tasks` module of every installed app, which registers their tasks."""
+    autodiscover_modules('tasks')
+
+def worker_name(index):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+def retry_delay(attempts):
+    delay = settings.JOBS['RETRY_DELAY'] * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.JOBS['MAX_RETRY_DELAY']))
+
+def lease_until(now):
+    return now + timedelta(seconds=settings.JOBS['LEASE'])
+
+def claim_job(queues, worker, now=None):
+    """Marks the next due job of the queues as running and returns it, or None."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', queue__in=queues, run_at__lte=now)
+            .order_by('-priority', 'run_at', 'job_id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_by = worker
+        job.lease_expires_at = lease_until(now)
+        job.started_at = now
+        job.finished_at = None
+        job.wait_ms = max((now - job.run_at).total_seconds() * 1000, 0)
+        job.save(update_fields=[
+            'status', 'attempts', 'locked_by', 'lease_expires_at', 'started_at', 'finished_at', 'wait_ms'
+        ])
+    return job
+
+def renew_lease(job):
+    """Extends the lease of a job this worker runs, and returns whether it still holds it."""
+    return Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by).update(
+        lease_expires_at=lease_until(timezone.now())
+    ) == 1
+
+class Heartbeat:
+    """Renews the lease of a job from a thread of its own, while the job runs."""
+    def __init__(self, job):
+        self.job = job
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop.set()
+        self.thread.join()
+
+    def run(self):
+        try:
+            while not self.stop.wait(settings.JOBS['HEARTBEAT_INTERVAL']):
+                try:
+                    renew_lease(self.job)
+                except DatabaseError:
+                    # The lease has some time left, the next beat tries again
+                    logger.exception("Could not renew the lease of job %s", self.job.pk)
+                    connection.close()
+        finally:
+            connection.close()
+
+def run_job(job):
+    """Runs a claimed job and records its outcome and timing."""
+    started = time.perf_counter()
+    try:
+        task = registry.get(job.task)
+        if task is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        with Heartbeat(job):
+            task(**job.kwargs)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    job.duration_ms = (time.perf_counter() - started) * 1000
+    job.finished_at = timezone.now()
+    worker, job.locked_by = job.locked_by, ''
+    job.lease_expires_at = None
+
+    if error is None:
+        job.status = 'succeeded'
+        job.last_error = ''
+    elif job.attempts >= job.max_attempts:
+        # Dead-lettered, kept for inspection and requeued from the admin
+        job.status = 'dead'
+        job.last_error = error
+    else:
+        job.status = 'queued'
+        job.run_at = job.finished_at + retry_delay(job.attempts)
+        job.last_error = error
+    # A job whose lease expired was requeued, and may run on another worker by now
+    saved = Job.objects.filter(pk=job.pk, status='running', locked_by=worker).update(
+        status=job.status, run_at=job.run_at, last_error=job.last_error, locked_by='', lease_expires_at=None,
+        finished_at=job.finished_at, duration_ms=job.duration_ms,
+    )
+    if not saved:
+        logger.warning("Job %s finished after its lease expired, its outcome is discarded", job.pk)
+    return job
+
+def requeue_stale_jobs(now=None):
+    """
+    Queues the running jobs again whose worker died, i.e. whose lease expired,
+    or dead-letters them when they used up their attempts. Returns their number.
+    """
+    now = now or timezone.now()
+    error = 'Requeued after the worker stopped responding'
+    expired = Job.objects.filter(status='running', lease_expires_at__lt=now)
+    dead = expired.filter(attempts__gte=F('max_attempts')).update(
+        status='dead', locked_by='', lease_expires_at=None, finished_at=now, last_error=error
+    )
+    return dead + expired.update(status='queued', run_at=now, locked_by='', lease_expires_at=None, last_error=error)
+
+class StaleJobSweeper:
+    """Calls requeue_stale_jobs() at most once per heartbeat interval."""
+    def __init__(self):
+        self.swept_at = None
+
+    def __call__(self):
+        if self.swept_at is None or time.monotonic() - self.swept_at >= settings.JOBS['HEARTBEAT_INTERVAL']:
+            self.swept_at = time.monotonic()
+            requeue_stale_jobs()
+
+def run_pending(queues, worker, sweep=None):
+    """
+    Runs the due jobs of the queues one after the other, and returns the number
+    run. `sweep` is called before each claim.
+    """
+    ran = 0
+    while True:
+        if sweep is not None:
+            sweep()
+        job = claim_job(queues, worker)
+        if job is None:
+            return ran
+        run_job(job)
+        ran += 1
+
+def work(queues, worker, stop, interval=1.0, once=False):
+    """
+    Runs jobs until `stop` is set, checking for due jobs every `interval`
+    seconds while idle. With `once`, returns as soon as no job is due.
+    """
+    sweep = StaleJobSweeper()
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            run_pending(queues, worker, sweep)
+            if once:
+                return
+            stop.wait(interval)
+    finally:
+        # Every worker thread and process has its own connection
+        connection.close()
+
+def run_threads(queues, workers, stop, interval=1.0, once=False):
+    threads = [
+        threading.Thread(target=work, args=(queues, worker_name(index), stop, interval, once))
+        for index in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    wait_for(threads, stop)
+
+def process_main(queues, index, stop, interval, once):
+    # Ctrl-C is handled by the parent, which tells the workers to stop after their current job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(queues, worker_name(index), stop, interval, once)
+
+def run_processes(queues, workers, interval=1.0, once=False):
+    # Forked children must not share the parent's database connection
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    stop = context.Event()
+    processes = [
+        context.Process(target=process_main, args=(queues, index, stop, interval, once))
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    wait_for(processes, stop)
+
+def wait_for(workers, stop):
+    try:
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from tenderhubapi.pagination import EstimatedCountPaginator
+from .models import Notification, NotificationCounter
+
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('notification_id', 'recipient', 'kind', 'message', 'count', 'updated_at', 'read_at')
+    list_filter = ('kind', 'target_type')
+    list_select_related = ('recipient',)
+    autocomplete_fields = ('recipient',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+class NotificationCounterAdmin(admin.ModelAdmin):
+    list_display = ('user', 'unread', 'updated_at')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+
+admin.site.register(Notification, NotificationAdmin)
+admin.site.register(NotificationCounter, NotificationCounterAdmin)
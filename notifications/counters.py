@@ -0,0 +1,51 @@
+from collections import defaultdict
+
+from django.db.models import Count, F
+from django.utils import timezone
+
+from tenderhubapi.db_router import read_from_primary
+from .models import Notification, NotificationCounter
+
+def rebuild_unread_counts(user_ids):
+    """Recomputes the unread counters of the given users from the notification table."""
+    counts = dict.fromkeys(user_ids, 0)
+    with read_from_primary():
+        counts.update(
+            Notification.objects.filter(recipient_id__in=counts, read_at__isnull=True)
+            .values_list('recipient_id').annotate(unread=Count('pk')).order_by()
+        )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread=count, updated_at=timezone.now()) for user_id, count in counts.items()],
+        update_conflicts=True, unique_fields=['user'], update_fields=['unread', 'updated_at'],
+    )
+
+def bump_unread_counts(deltas):
+    """
+    Adds the deltas, a {user id: delta} dict, to the unread counters. Users with
+    the same delta are updated by one UPDATE, and users without a counter yet get
+    it rebuilt from the notification table, which includes this change.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    existing = set(NotificationCounter.objects.filter(pk__in=deltas).values_list('pk', flat=True))
+    
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if user_id in existing:
+            by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        NotificationCounter.objects.filter(pk__in=user_ids).update(
+            unread=F('unread') + delta, updated_at=timezone.now()
+        )
+    
+    missing = set(deltas) - existing
+    if missing:
+        rebuild_unread_counts(missing)
+
+def get_unread_count(user_id):
+    count = NotificationCounter.objects.filter(pk=user_id).values_list('unread', flat=True).first()
+    if count is None:
+        rebuild_unread_counts([user_id])
+        count = NotificationCounter.objects.get(pk=user_id).unread
+    return count
@@ -0,0 +1,118 @@
+"""
+Fan-out of outbox events to the recipients' inboxes.
+
+`fan_out` is registered as an outbox handler (see settings.OUTBOX), so it runs
+in the relay process with a batch of events, and its writes commit together
+with the events it consumed. The events of a batch are grouped per recipient
+and target, and each group is merged into the recipient's unread notification
+of that target, so a burst of bids becomes a single "12 new bids on X".
+
+The outbox delivers at least once, so the events are recorded as handled in the
+same transaction, and the events already applied are skipped instead of being
+counted again.
+"""
+from collections import Counter
+
+from django.db.models import Q
+from django.utils import timezone
+
+from outbox.relay import record_handled
+from tender.models import Project, Tender
+from .counters import bump_unread_counts
+from .models import Notification
+
+def pluralize(count, singular, plural):
+    return f"{count} {singular if count == 1 else plural}"
+
+MESSAGES = {
+    'new_bid': lambda count, title: f"{pluralize(count, 'new bid', 'new bids')} on {title}",
+    'new_comment': lambda count, title: f"{pluralize(count, 'new comment', 'new comments')} on {title}",
+    'bid_accepted': lambda count, title: f"Your bid on {title} was accepted",
+    'project_update': lambda count, title: f"{pluralize(count, 'new update', 'new updates')} on project {title}",
+    'project_overdue': lambda count, title: f"Project {title} is past its deadline",
+}
+
+def event_recipients(event):
+    """Returns the (recipient id, kind, target type, target id) entries of an event."""
+    payload = event.payload
+    if event.event_type == 'bid.placed':
+        return [(payload['client_id'], 'new_bid', 'tender', payload['tender_id'])]
+    if event.event_type == 'bid.accepted':
+        return [(payload['vendor_id'], 'bid_accepted', 'tender', payload['tender_id'])]
+    if event.event_type == 'comment.added':
+        if payload['user_id'] == payload['client_id']:
+            return []
+        return [(payload['client_id'], 'new_comment', 'tender', payload['tender_id'])]
+    if event.event_type == 'project.overdue':
+        project_id = int(event.aggregate_id)
+        return [
+            (payload['client_id'], 'project_overdue', 'project', project_id),
+            (payload['vendor_id'], 'project_overdue', 'project', project_id),
+        ]
+    if event.event_type.startswith('project.') and 'activity_id' in payload:
+        # Participants are told about the other participant's activity
+        project_id = int(event.aggregate_id)
+        return [
+            (user_id, 'project_update', 'project', project_id)
+            for user_id in (payload['client_id'], payload['vendor_id']) if user_id != payload['user_id']
+        ]
+    return []
+
+def target_titles(keys):
+    """Returns the titles of the targets, keyed by (target type, target id)."""
+    tender_ids = {target_id for _, _, target_type, target_id in keys if target_type == 'tender'}
+    project_ids = {target_id for _, _, target_type, target_id in keys if target_type == 'project'}
+    titles = {}
+    if tender_ids:
+        titles.update(
+            (('tender', tender_id), title)
+            for tender_id, title in Tender.objects.filter(pk__in=tender_ids).values_list('tender_id', 'title')
+        )
+    if project_ids:
+        titles.update(
+            (('project', project_id), title)
+            for project_id, title in Project.objects.filter(pk__in=project_ids).values_list('project_id', 'tender__title')
+        )
+    return titles
+
+HANDLER_NAME = 'notifications.handlers.fan_out'
+
+def fan_out(events):
+    events = record_handled(HANDLER_NAME, events)
+    counts = Counter(key for event in events for key in event_recipients(event))
+    if not counts:
+        return
+
+    titles = target_titles(counts)
+    # Targets deleted since the event was published are skipped
+    counts = {key: count for key, count in counts.items() if key[2:] in titles}
+    if not counts:
+        return
+    now = timezone.now()
+
+    condition = Q()
+    for recipient_id, kind, target_type, target_id in counts:
+        condition |= Q(recipient_id=recipient_id, kind=kind, target_type=target_type, target_id=target_id)
+    unread = {
+        (notification.recipient_id, notification.kind, notification.target_type, notification.target_id): notification
+        for notification in Notification.objects.select_for_update().filter(condition, read_at__isnull=True)
+    }
+
+    updated, created = [], []
+    for key, count in counts.items():
+        recipient_id, kind, target_type, target_id = key
+        notification = unread.get(key)
+        if notification is None:
+            notification = Notification(
+                recipient_id=recipient_id, kind=kind, target_type=target_type, target_id=target_id, count=0
+            )
+            created.append(notification)
+        else:
+            updated.append(notification)
+        notification.count += count
+        notification.message = MESSAGES[kind](notification.count, titles[target_type, target_id])
+        notification.updated_at = now
+
+    Notification.objects.bulk_update(updated, ['count', 'message', 'updated_at'])
+    Notification.objects.bulk_create(created)
+    bump_unread_counts(Counter(notification.recipient_id for notification in created))
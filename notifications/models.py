@@ -0,0 +1,69 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import User
+
+class Notification(models.Model):
+    """
+    An inbox entry. Events of the same kind on the same target are coalesced
+    into the recipient's unread notification, e.g. "12 new bids on X".
+    """
+    KIND_CHOICES = (
+        ('new_bid', 'New Bid'),
+        ('new_comment', 'New Comment'),
+        ('bid_accepted', 'Bid Accepted'),
+        ('project_update', 'Project Update'),
+        ('project_overdue', 'Project Overdue'),
+    )
+    TARGET_TYPE_CHOICES = (
+        ('tender', 'Tender'),
+        ('project', 'Project'),
+    )
+    
+    notification_id = models.BigAutoField(primary_key=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    target_type = models.CharField(max_length=20, choices=TARGET_TYPE_CHOICES)
+    target_id = models.BigIntegerField()
+    message = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+    read_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Notification"
+        verbose_name_plural = "Notifications"
+        ordering = ['-updated_at', '-notification_id']
+        indexes = [
+            # Serves the inbox, newest first
+            models.Index(fields=['recipient', '-updated_at', '-notification_id'], name='notification_inbox_idx'),
+        ]
+        constraints = [
+            # At most one unread notification per target, which new events are coalesced into
+            models.UniqueConstraint(
+                fields=['recipient', 'kind', 'target_type', 'target_id'],
+                condition=Q(read_at__isnull=True), name='unique_unread_notification'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient}: {self.message}"
+    
+    @property
+    def is_read(self):
+        return self.read_at is not None
+
+class NotificationCounter(models.Model):
+    """Number of unread notifications of a user, maintained as notifications are created and read."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Notification Counter"
+        verbose_name_plural = "Notification Counters"
+    
+    def __str__(self):
+        return f"{self.user}: {self.unread} unread"
@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+from .models import Notification
+
+class NotificationSerializer(serializers.ModelSerializer):
+    is_read = serializers.BooleanField(read_only=True)
+    
+    class Meta:
+        model = Notification
+        fields = [
+            'notification_id', 'kind', 'target_type', 'target_id', 'message', 'count',
+            'is_read', 'created_at', 'updated_at', 'read_at'
+        ]
+        read_only_fields = fields
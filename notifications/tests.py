@@ -0,0 +1,187 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from faker import Faker
+from outbox.models import OutboxEvent
+from outbox.relay import relay_pending
+from tender.models import Project, Tender
+from users.models import User
+from .handlers import fan_out
+from .models import Notification, NotificationCounter
+
+fake = Faker()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def client_user():
+    return User.objects.create_user(
+        username=fake.user_name(),
+        password=fake.password(),
+        is_client=True
+    )
+
+@pytest.fixture
+def vendor_user():
+    return User.objects.create_user(
+        username=f'{fake.unique.user_name()}_vendor',
+        password=fake.password(),
+        is_vendor=True
+    )
+
+@pytest.fixture
+def tender(client_user):
+    return Tender.objects.create(
+        client=client_user,
+        title=fake.sentence(),
+        description=fake.text(),
+        max_duration=30,
+        min_budget=1000,
+        max_budget=5000,
+        deadline=fake.future_date()
+    )
+
+def make_vendors(count):
+    return [
+        User.objects.create_user(username=f'{fake.unique.user_name()}_vendor', password='secret', is_vendor=True)
+        for _ in range(count)
+    ]
+
+def place_bid(api_client, vendor, tender):
+    api_client.force_authenticate(user=vendor)
+    response = api_client.post(reverse('tender-place-bid', args=[tender.tender_id]), {
+        'amount': 2000, 'proposal': fake.text(), 'delivery_time': 10
+    })
+    assert response.status_code == status.HTTP_201_CREATED
+
+@pytest.mark.django_db
+class TestFanOut:
+    def test_bids_are_coalesced_into_one_notification(self, api_client, client_user, tender):
+        vendors = make_vendors(3)
+        for vendor in vendors[:2]:
+            place_bid(api_client, vendor, tender)
+        relay_pending()
+        place_bid(api_client, vendors[2], tender)
+        relay_pending()
+
+        notification = Notification.objects.get(recipient=client_user)
+        assert (notification.kind, notification.count) == ('new_bid', 3)
+        assert notification.message == f"3 new bids on {tender.title}"
+        assert NotificationCounter.objects.get(user=client_user).unread == 1
+
+    def test_read_notification_starts_a_new_one(self, api_client, client_user, tender):
+        vendors = make_vendors(2)
+        place_bid(api_client, vendors[0], tender)
+        relay_pending()
+
+        api_client.force_authenticate(user=client_user)
+        notification = Notification.objects.get(recipient=client_user)
+        response = api_client.post(reverse('notification-read', args=[notification.pk]))
+        assert response.data == {'unread_count': 0}
+
+        place_bid(api_client, vendors[1], tender)
+        relay_pending()
+        unread = Notification.objects.get(recipient=client_user, read_at__isnull=True)
+        assert unread.message == f"1 new bid on {tender.title}"
+        assert NotificationCounter.objects.get(user=client_user).unread == 1
+
+    def test_project_activity_notifies_the_other_participant(self, api_client, client_user, vendor_user, tender):
+        project = Project.objects.create(
+            tender=tender, client=client_user, vendor=vendor_user, agreed_amount=2000, deadline=tender.deadline
+        )
+        api_client.force_authenticate(user=vendor_user)
+        for _ in range(2):
+            response = api_client.post(reverse('project-deliver-project', args=[project.pk]), {'description': 'Done'})
+            assert response.status_code == status.HTTP_201_CREATED
+        relay_pending()
+
+        notification = Notification.objects.get()
+        assert (notification.recipient_id, notification.kind, notification.count) == (client_user.id, 'project_update', 2)
+        assert notification.message == f"2 new updates on project {tender.title}"
+
+    def test_redelivered_events_are_not_counted_again(self, api_client, client_user, tender):
+        vendors = make_vendors(2)
+        for vendor in vendors:
+            place_bid(api_client, vendor, tender)
+        relay_pending()
+
+        # Relayed again, as after a failure of another handler, and passed to the handler again
+        OutboxEvent.objects.update(status='pending')
+        relay_pending()
+        fan_out(list(OutboxEvent.objects.filter(event_type='bid.placed')))
+
+        notification = Notification.objects.get(recipient=client_user)
+        assert notification.count == 2
+        assert notification.message == f"2 new bids on {tender.title}"
+        assert NotificationCounter.objects.get(user=client_user).unread == 1
+
+@pytest.mark.django_db
+class TestInbox:
+    def test_inbox_is_cursor_paginated_without_count(self, api_client, client_user):
+        Notification.objects.bulk_create([
+            Notification(recipient=client_user, kind='new_bid', target_type='tender', target_id=n, message=f"Bid {n}")
+            for n in range(25)
+        ])
+        NotificationCounter.objects.create(user=client_user, unread=25)
+        api_client.force_authenticate(user=client_user)
+        url = reverse('notification-list')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert not any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        assert len(response.data['results']) == 20
+        assert response.data['unread_count'] == 25
+
+        second_page = api_client.get(response.data['next'])
+        assert len(second_page.data['results']) == 5
+        assert second_page.data['next'] is None
+
+    def test_read_all(self, api_client, client_user, vendor_user):
+        Notification.objects.bulk_create([
+            Notification(recipient=client_user, kind='new_bid', target_type='tender', target_id=n, message=f"Bid {n}")
+            for n in range(3)
+        ])
+        Notification.objects.create(
+            recipient=vendor_user, kind='bid_accepted', target_type='tender', target_id=1, message="Accepted"
+        )
+        api_client.force_authenticate(user=client_user)
+        assert api_client.get(reverse('notification-unread-count')).data == {'unread_count': 3}
+
+        response = api_client.post(reverse('notification-read-all'))
+        assert response.data == {'unread_count': 0}
+        assert api_client.get(reverse('notification-list'), {'unread': 'true'}).data['results'] == []
+        assert Notification.objects.filter(recipient=vendor_user, read_at__isnull=True).count() == 1
+
+    def test_cannot_read_others_notifications(self, api_client, client_user, vendor_user):
+        notification = Notification.objects.create(
+            recipient=vendor_user, kind='bid_accepted', target_type='tender', target_id=1, message="Accepted"
+        )
+        api_client.force_authenticate(user=client_user)
+        response = api_client.post(reverse('notification-read', args=[notification.pk]))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+# The replica connection only sees committed rows
+@pytest.mark.django_db(transaction=True)
+class TestReplicaReads:
+    def test_missing_counter_is_rebuilt_from_the_primary(self, api_client, replica, client_user):
+        replica_connection = replica()
+        # The replica's snapshot predates the notification, like a replica that hasn't replayed it yet
+        with replica_connection.cursor() as cursor:
+            cursor.execute('BEGIN ISOLATION LEVEL REPEATABLE READ')
+            cursor.execute('SELECT 1')
+        Notification.objects.create(
+            recipient=client_user, kind='bid_accepted', target_type='tender', target_id=1, message="Accepted"
+        )
+        NotificationCounter.objects.create(user=client_user, unread=1)
+        api_client.force_authenticate(user=client_user)
+        with CaptureQueriesContext(replica_connection) as queries:
+            response = api_client.get(reverse('notification-unread-count'))
+        assert any('"notifications_notificationcounter"' in query['sql'] for query in queries.captured_queries)
+        assert response.data == {'unread_count': 1}
+        assert NotificationCounter.objects.get(user=client_user).unread == 1
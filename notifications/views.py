@@ -0,0 +1,56 @@
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .counters import get_unread_count
+from .models import Notification, NotificationCounter
+from .serializers import NotificationSerializer
+
+class InboxPagination(CursorPagination):
+    """Cursor pagination, so pages are read from the inbox index without a COUNT(*)."""
+    page_size = 20
+    ordering = ('-updated_at', '-notification_id')
+
+class NotificationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = InboxPagination
+    
+    def get_queryset(self):
+        queryset = Notification.objects.filter(recipient_id=self.request.user.id)
+        if self.request.query_params.get('unread') == 'true':
+            queryset = queryset.filter(read_at__isnull=True)
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.data['unread_count'] = get_unread_count(request.user.id)
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({"unread_count": get_unread_count(request.user.id)})
+    
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        read = Notification.objects.filter(
+            pk=pk, recipient_id=request.user.id, read_at__isnull=True
+        ).update(read_at=timezone.now())
+        if not read and not Notification.objects.filter(pk=pk, recipient_id=request.user.id).exists():
+            return Response({"error": "Notification not found"}, status=status.HTTP_404_NOT_FOUND)
+        if read:
+            NotificationCounter.objects.filter(pk=request.user.id).update(unread=F('unread') - read)
+        return Response({"unread_count": get_unread_count(request.user.id)})
+    
+    @action(detail=False, methods=['post'])
+    def read_all(self, request):
+        read = Notification.objects.filter(
+            recipient_id=request.user.id, read_at__isnull=True
+        ).update(read_at=timezone.now())
+        if read:
+            NotificationCounter.objects.filter(pk=request.user.id).update(unread=F('unread') - read)
+        return Response({"unread_count": get_unread_count(request.user.id)})
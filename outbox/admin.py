@@ -0,0 +1,25 @@
+from django.contrib import admin
+from django.utils import timezone
+from tenderhubapi.pagination import EstimatedCountPaginator
+from .models import OutboxEvent
+
+def requeue_events(modeladmin, request, queryset):
+    count = queryset.exclude(status='pending').update(
+        status='pending', attempts=0, available_at=timezone.now(), last_error=''
+    )
+    modeladmin.message_user(request, f"{count} events were queued again.")
+requeue_events.short_description = "Queue selected events again"
+
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'aggregate_type', 'aggregate_id', 'status', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('=event_id', '=aggregate_id')
+    readonly_fields = [field.name for field in OutboxEvent._meta.fields]
+    actions = [requeue_events]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+
+admin.site.register(OutboxEvent, OutboxEventAdmin)
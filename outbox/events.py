@@ -0,0 +1,26 @@
+"""
+Publishing of domain events.
+
+Call `publish()` inside the `transaction.atomic()` block of the state change,
+so the event is committed, or rolled back, together with it. Publishing is a
+single INSERT; the handlers run later in the relay process (see `outbox.relay`).
+"""
+from .models import OutboxEvent
+
+def make_event(event_type, model, pk, **payload):
+    return OutboxEvent(
+        event_type=event_type,
+        aggregate_type=model._meta.label_lower,
+        aggregate_id=str(pk),
+        payload=payload,
+    )
+
+def publish(event_type, instance, **payload):
+    """Records an event about a model instance, e.g. publish('bid.placed', bid, tender_id=...)."""
+    event = make_event(event_type, type(instance), instance.pk, **payload)
+    event.save()
+    return event
+
+def publish_many(events):
+    """Records the events built with `make_event()` in one INSERT."""
+    return OutboxEvent.objects.bulk_create(events)
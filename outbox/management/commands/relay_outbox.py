@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from outbox.relay import prune_processed, relay_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispatches pending outbox events to the handlers in settings.OUTBOX. "
+        "Polls every --interval seconds while idle unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Relay the pending events and exit.")
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="Seconds to wait when no event is pending (default: 1).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX['BATCH_SIZE'],
+            help="Events locked and dispatched per transaction.",
+        )
+        parser.add_argument(
+            '--keep-days', type=int, default=None,
+            help="Delete processed events older than this many days after each run.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            relayed = relay_pending(batch_size=max(1, options['batch_size']))
+            if relayed:
+                self.stdout.write(f"Relayed {relayed} events.")
+            if options['keep_days'] is not None:
+                prune_processed(timedelta(days=options['keep_days']))
+            if options['once']:
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
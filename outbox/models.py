@@ -0,0 +1,66 @@
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+class OutboxEvent(models.Model):
+    """
+    A domain event, written in the same transaction as the state change it
+    describes and dispatched to the handlers by `python manage.py relay_outbox`.
+    
+    Delivery is at-least-once: handlers can receive an event again after a
+    failure, and should use `event_id` to ignore the events they already applied.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    )
+    
+    id = models.BigAutoField(primary_key=True)
+    event_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    event_type = models.CharField(max_length=100)
+    aggregate_type = models.CharField(max_length=100)
+    aggregate_id = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        verbose_name = "Outbox Event"
+        verbose_name_plural = "Outbox Events"
+        ordering = ['id']
+        indexes = [
+            # Only the pending events are scanned by the relay, so the index stays small
+            models.Index(fields=['available_at', 'id'], condition=Q(status='pending'), name='outbox_pending_idx'),
+            models.Index(fields=['aggregate_type', 'aggregate_id', 'id'], name='outbox_aggregate_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} ({self.aggregate_type} {self.aggregate_id})"
+
+class HandledEvent(models.Model):
+    """
+    An event applied by one handler, written in the same transaction as the
+    handler's writes. The relay only calls a handler with the events it has no
+    row for, so a retry reruns the handlers that failed and no other.
+    """
+    event = models.ForeignKey(
+        OutboxEvent, on_delete=models.CASCADE, to_field='event_id', db_column='event_id', related_name='handled_by'
+    )
+    handler = models.CharField(max_length=200)
+    handled_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'handler'], name='outbox_handled_event_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_id} by {self.handler}"
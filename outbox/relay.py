@@ -0,0 +1,141 @@
+"""
+Dispatching of outbox events to the in-process handlers.
+
+Handlers are configured in `settings.OUTBOX['HANDLERS']`, which maps event type
+patterns ('bid.placed', 'project.*', '*') to dotted paths of callables. Each
+handler is called with the list of matching events of a batch, in id order.
+
+A batch is locked with SELECT ... FOR UPDATE SKIP LOCKED, so several relays can
+run side by side, and is marked processed in the same transaction. Database
+writes of a handler therefore commit together with the events it consumed.
+When a handler raises, its events are retried one by one so only the failing
+events are rescheduled, with an exponential backoff, until MAX_ATTEMPTS.
+
+Every handler records the events it applied as HandledEvent rows, in its own
+savepoint, and a rescheduled event is only passed again to the handlers that
+failed on it. Events are delivered in id order, except that a rescheduled event
+is delivered after the events that were relayed during its backoff.
+"""
+import fnmatch
+import logging
+import traceback
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import HandledEvent, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def get_handlers():
+    """Returns (pattern, dotted path, handler) triples, imported once per process."""
+    return tuple(
+        (pattern, path, import_string(path))
+        for pattern, paths in settings.OUTBOX['HANDLERS'].items()
+        for path in paths
+    )
+
+def record_handled(handler_name, events):
+    """
+    Records the events as applied by the handler, and returns the events it
+    hadn't applied yet. Call it in the transaction of the handler's writes.
+    """
+    handled = set(
+        HandledEvent.objects.filter(handler=handler_name, event__in=[event.event_id for event in events])
+        .values_list('event_id', flat=True)
+    )
+    new = [event for event in events if event.event_id not in handled]
+    HandledEvent.objects.bulk_create([HandledEvent(event=event, handler=handler_name) for event in new])
+    return new
+
+def retry_delay(attempts):
+    delay = settings.OUTBOX['RETRY_DELAY'] * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.OUTBOX['MAX_RETRY_DELAY']))
+
+def dispatch(handler_name, handler, events, errors):
+    """
+    Calls the handler with the events and records them as handled, or records
+    the error of every failing event in `errors` ({event id: [traceback]}).
+    """
+    try:
+        with transaction.atomic():
+            handler(events)
+            record_handled(handler_name, events)
+        return
+    except Exception:
+        if len(events) == 1:
+            logger.exception("Outbox handler %s failed on event %s", handler_name, events[0].event_id)
+            errors.setdefault(events[0].id, []).append(traceback.format_exc())
+            return
+
+    # Find the failing events, the others are still delivered
+    for event in events:
+        dispatch(handler_name, handler, [event], errors)
+
+def relay_batch(batch_size=None, now=None):
+    """Dispatches one batch of pending events and returns the number of events taken."""
+    batch_size = batch_size or settings.OUTBOX['BATCH_SIZE']
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', available_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        # Handlers that applied an event before a retry don't get it again
+        handled = set(
+            HandledEvent.objects.filter(event__in=[event.event_id for event in events])
+            .values_list('event_id', 'handler')
+        )
+        errors = {}
+        for pattern, handler_name, handler in get_handlers():
+            matching = [
+                event for event in events
+                if fnmatch.fnmatchcase(event.event_type, pattern) and (event.event_id, handler_name) not in handled
+            ]
+            if matching:
+                dispatch(handler_name, handler, matching, errors)
+                handled.update((event.event_id, handler_name) for event in matching)
+
+        for event in events:
+            event.attempts += 1
+            if event.id not in errors:
+                event.status = 'processed'
+                event.processed_at = now
+                event.last_error = ''
+            elif event.attempts >= settings.OUTBOX['MAX_ATTEMPTS']:
+                event.status = 'failed'
+                event.last_error = '\n'.join(errors[event.id])
+            else:
+                event.available_at = now + retry_delay(event.attempts)
+                event.last_error = '\n'.join(errors[event.id])
+        OutboxEvent.objects.bulk_update(
+            events, ['status', 'attempts', 'available_at', 'processed_at', 'last_error']
+        )
+    return len(events)
+
+def relay_pending(batch_size=None):
+    """Relays batches until no event is due, and returns the number of events taken."""
+    batch_size = batch_size or settings.OUTBOX['BATCH_SIZE']
+    relayed = 0
+    while True:
+        count = relay_batch(batch_size)
+        relayed += count
+        if count < batch_size:
+            return relayed
+
+def prune_processed(older_than):
+    """Deletes the processed events older than the given timedelta."""
+    deleted, _ = OutboxEvent.objects.filter(
+        status='processed', processed_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
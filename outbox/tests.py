@@ -0,0 +1,139 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from faker import Faker
+from tender.models import Tender
+from users.models import User
+from .events import publish
+from .models import HandledEvent, OutboxEvent
+from .relay import get_handlers, relay_batch, relay_pending
+
+fake = Faker()
+
+received = []
+
+def record_events(events):
+    received.append([event.event_id for event in events])
+
+def reject_poison(events):
+    if any(event.payload.get('poison') for event in events):
+        raise ValueError("poison event")
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def client_user():
+    return User.objects.create_user(
+        username=fake.user_name(),
+        password=fake.password(),
+        is_client=True
+    )
+
+@pytest.fixture
+def vendor_user():
+    return User.objects.create_user(
+        username=fake.user_name(),
+        password=fake.password(),
+        is_vendor=True
+    )
+
+@pytest.fixture
+def tender(client_user):
+    return Tender.objects.create(
+        client=client_user,
+        title=fake.sentence(),
+        description=fake.text(),
+        max_duration=30,
+        min_budget=1000,
+        max_budget=5000,
+        deadline=fake.future_date()
+    )
+
+@pytest.fixture
+def handlers(settings):
+    received.clear()
+    settings.OUTBOX = {
+        **settings.OUTBOX,
+        'HANDLERS': {
+            'tender.*': ['outbox.tests.record_events', 'outbox.tests.reject_poison'],
+        },
+        'MAX_ATTEMPTS': 2,
+    }
+    get_handlers.cache_clear()
+    yield
+    get_handlers.cache_clear()
+
+@pytest.mark.django_db
+class TestPublish:
+    def test_place_bid_publishes_event(self, api_client, vendor_user, tender):
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.post(reverse('tender-place-bid', args=[tender.tender_id]), {
+            'amount': 2000, 'proposal': fake.text(), 'delivery_time': 10
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+
+        event = OutboxEvent.objects.get(event_type='bid.placed')
+        assert (event.aggregate_type, event.aggregate_id) == ('tender.bid', str(response.data['bid_id']))
+        assert event.payload == {
+            'tender_id': tender.tender_id, 'client_id': tender.client_id, 'vendor_id': vendor_user.id, 'amount': '2000.00'
+        }
+        assert event.status == 'pending'
+
+    def test_event_is_rolled_back_with_the_change(self, tender):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                publish('tender.created', tender)
+                raise RuntimeError
+        assert not OutboxEvent.objects.exists()
+
+@pytest.mark.django_db
+class TestRelay:
+    def test_events_are_dispatched_in_order_and_marked_processed(self, handlers, tender):
+        events = [publish('tender.created', tender, n=n) for n in range(3)]
+        publish('bid.placed', tender)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert relay_batch(batch_size=10) == 4
+        assert any('FOR UPDATE SKIP LOCKED' in query['sql'] for query in queries.captured_queries)
+
+        assert received == [[event.event_id for event in events]]
+        assert set(OutboxEvent.objects.values_list('status', flat=True)) == {'processed'}
+        assert relay_batch() == 0
+
+    def test_failing_event_is_retried_then_failed(self, handlers, tender):
+        good = publish('tender.created', tender)
+        poison = publish('tender.created', tender, poison=True)
+
+        assert relay_pending() == 2
+        good.refresh_from_db()
+        poison.refresh_from_db()
+        assert good.status == 'processed'
+        assert (poison.status, poison.attempts) == ('pending', 1)
+        assert 'poison event' in poison.last_error
+        assert poison.available_at > poison.created_at
+
+        # Not due before its backoff has passed
+        assert relay_batch() == 0
+        relay_batch(now=poison.available_at)
+        poison.refresh_from_db()
+        assert (poison.status, poison.attempts) == ('failed', 2)
+
+    def test_retry_only_reruns_the_failing_handlers(self, handlers, tender):
+        poison = publish('tender.created', tender, poison=True)
+
+        relay_batch()
+        poison.refresh_from_db()
+        relay_batch(now=poison.available_at)
+        poison.refresh_from_db()
+        assert (poison.status, poison.attempts) == ('failed', 2)
+        # Applied by record_events on the first attempt, and not passed to it again
+        assert received == [[poison.event_id]]
+        assert list(HandledEvent.objects.values_list('event_id', 'handler')) == [
+            (poison.event_id, 'outbox.tests.record_events')
+        ]
+        assert poison.last_error.count('ValueError: poison event') == 1
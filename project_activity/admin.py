@@ -1,20 +1,24 @@
 from django.contrib import admin
 from django.utils.html import format_html, mark_safe
 from django.urls import reverse
-from django.db.models import Q
+from django.db.models import F, Q, TextField, Value
+from django.db.models.functions import Concat
 from django import forms
 from django.utils import timezone
 import datetime
 
+from tenderhubapi.admin_search import TrigramSearchMixin
+from tenderhubapi.pagination import EstimatedCountPaginator
 from .models import ProjectActivity
 
 # Custom admin actions
 def mark_as_important(modeladmin, request, queryset):
     """Custom action to add 'IMPORTANT: ' prefix to selected activities"""
-    for activity in queryset:
-        if not activity.description.startswith('IMPORTANT: '):
-            activity.description = f"IMPORTANT: {activity.description}"
-            activity.save()
+    # A single UPDATE instead of loading and saving every activity
+    updated = queryset.exclude(description__startswith='IMPORTANT: ').update(
+        description=Concat(Value('IMPORTANT: '), F('description'), output_field=TextField())
+    )
+    modeladmin.message_user(request, f"Marked {updated} activities as important")
 mark_as_important.short_description = "Mark selected activities as important"
 
 def download_all_attachments(modeladmin, request, queryset):
@@ -49,7 +53,8 @@ class ActivityTypeListFilter(admin.SimpleListFilter):
         if self.value() == 'project_status':
             return queryset.filter(Q(activity_type='delivery') | 
                                   Q(activity_type='revision_request') |
-                                  Q(activity_type='project_completion'))
+                                  Q(activity_type='project_completion') |
+                                  Q(activity_type='overdue'))
         return queryset
 
 class RecentActivityFilter(admin.SimpleListFilter):
@@ -83,16 +88,18 @@ class ProjectActivityAdminForm(forms.ModelForm):
             'description': forms.Textarea(attrs={'rows': 4, 'cols': 80}),
         }
 
-class ProjectActivityAdmin(admin.ModelAdmin):
+class ProjectActivityAdmin(TrigramSearchMixin, admin.ModelAdmin):
     form = ProjectActivityAdminForm
     list_display = ('activity_id', 'activity_icon', 'project_link', 'user_link', 'activity_type', 'activity_summary', 'time_ago')
     list_filter = ('activity_type', ActivityTypeListFilter, RecentActivityFilter, 'created_at', 'user__is_client', 'user__is_vendor')
     search_fields = ('description', 'project__tender__title', 'user__username', 'project__client__username', 'project__vendor__username')
     readonly_fields = ('created_at', 'attachment_preview', 'price_change_display', 'deadline_change_display', 'user_detail')
     list_per_page = 25
+    paginator = EstimatedCountPaginator
     date_hierarchy = 'created_at'
     save_on_top = True
     actions = [mark_as_important, download_all_attachments]
+    autocomplete_fields = ('project', 'user')
     
     fieldsets = (
         (None, {
@@ -151,6 +158,7 @@ class ProjectActivityAdmin(admin.ModelAdmin):
             'delivery': '📦',
             'revision_request': '🔄',
             'project_completion': '✅',
+            'overdue': '⏰',
         }
         return icons.get(obj.activity_type, '❓')
     activity_icon.short_description = ''
@@ -1,9 +1,10 @@
 from django.db import models
+from django.db.models import Q
 
-from tender.models import Project
+from tender.models import Project, TrackedFieldsMixin
 from users.models import User
 
-class ProjectActivity(models.Model):
+class ProjectActivity(TrackedFieldsMixin, models.Model):
     ACTIVITY_TYPE_CHOICES = (
         ('comment', 'Comment'),
         ('attachment', 'Attachment'),
@@ -12,6 +13,7 @@ class ProjectActivity(models.Model):
         ('delivery', 'Delivery'),
         ('revision_request', 'Revision Request'),
         ('project_completion', 'Project Completion'),
+        ('overdue', 'Overdue'),
     )
 
     activity_id = models.BigAutoField(primary_key=True)
@@ -30,10 +32,19 @@ class ProjectActivity(models.Model):
     old_deadline = models.DateField(null=True, blank=True)
     new_deadline = models.DateField(null=True, blank=True)
     
+    # Counted in VendorStats, and editable in the admin
+    tracked_fields = ('project_id', 'activity_type')
+    
     class Meta:
         verbose_name = "Project Activity"
         verbose_name_plural = "Project Activities"
         ordering = ['created_at']
+        constraints = [
+            # The overdue sweep records a project's missed deadline only once
+            models.UniqueConstraint(
+                fields=['project'], condition=Q(activity_type='overdue'), name='unique_overdue_activity'
+            ),
+        ]
         
     def __str__(self):
         return f"{self.activity_type} on {self.project}"
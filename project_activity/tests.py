@@ -1,11 +1,21 @@
 import pytest
+from functools import partial
+from django.contrib import admin
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import RequestFactory
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from faker import Faker
 from tender.models import Project, Tender
 from .models import ProjectActivity
 from users.models import User
+from tenderhubapi import pagination
+from tenderhubapi.pagination import EstimatedCountPaginator
+from tender.management.commands.create_search_indexes import trigram_index_sql, trigram_index_targets
 
 fake = Faker()
 
@@ -71,3 +81,205 @@ class TestProjectActivityEndpoints:
             data
         )
         assert response.status_code == status.HTTP_201_CREATED
+
+    def test_retrieve_activity(self, api_client, project):
+        activity = ProjectActivity.objects.create(
+            project=project, user=project.client, activity_type='comment', description=fake.text()
+        )
+        api_client.force_authenticate(user=project.vendor)
+        response = api_client.get(
+            reverse('project-activities-detail', kwargs={'project_pk': project.project_id, 'pk': activity.activity_id})
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['project'] == project.project_id
+
+    def test_non_participant_sees_no_activities(self, api_client, project):
+        ProjectActivity.objects.create(
+            project=project, user=project.client, activity_type='comment', description=fake.text()
+        )
+        outsider = User.objects.create_user(username=fake.unique.user_name(), password=fake.password())
+        api_client.force_authenticate(user=outsider)
+        response = api_client.get(
+            reverse('project-activities-list', kwargs={'project_pk': project.project_id})
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 0
+
+    def test_non_participant_cannot_create_activity(self, api_client, project):
+        outsider = User.objects.create_user(username=fake.unique.user_name(), password=fake.password())
+        api_client.force_authenticate(user=outsider)
+        response = api_client.post(
+            reverse('project-activities-list', kwargs={'project_pk': project.project_id}),
+            {'activity_type': 'comment', 'description': fake.text()}
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_list_activities_unknown_project(self, api_client, client_user):
+        api_client.force_authenticate(user=client_user)
+        response = api_client.get(reverse('project-activities-list', kwargs={'project_pk': 999999}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_list_reports_exact_count_for_small_projects(self, api_client, project):
+        ProjectActivity.objects.create(
+            project=project, user=project.client, activity_type='comment', description=fake.text()
+        )
+        api_client.force_authenticate(user=project.client)
+        response = api_client.get(
+            reverse('project-activities-list', kwargs={'project_pk': project.project_id})
+        )
+        assert response.data['count'] == 1
+        assert response.data['count_is_approximate'] is False
+
+    def test_authorization_does_not_load_users(self, api_client, project, django_assert_num_queries):
+        api_client.force_authenticate(user=project.client)
+        # Participant check and page count only, no user or project rows are loaded
+        with django_assert_num_queries(2):
+            response = api_client.get(
+                reverse('project-activities-list', kwargs={'project_pk': project.project_id})
+            )
+        assert response.status_code == status.HTTP_200_OK
+
+@pytest.mark.django_db
+def test_mark_as_important_action(admin_client, project):
+    activities = ProjectActivity.objects.bulk_create([
+        ProjectActivity(project=project, user=project.client, activity_type='comment', description='Plain'),
+        ProjectActivity(project=project, user=project.client, activity_type='comment', description='IMPORTANT: Already'),
+    ])
+    response = admin_client.post(reverse('admin:project_activity_projectactivity_changelist'), {
+        'action': 'mark_as_important',
+        '_selected_action': [activity.activity_id for activity in activities],
+    })
+    assert response.status_code == 302
+    assert sorted(ProjectActivity.objects.values_list('description', flat=True)) == [
+        'IMPORTANT: Already', 'IMPORTANT: Plain'
+    ]
+
+
+@pytest.mark.django_db
+class TestProjectActivityAdminSearch:
+    def search(self, admin_user, term):
+        model_admin = admin.site._registry[ProjectActivity]
+        request = RequestFactory().get('/', {'q': term})
+        request.user = admin_user
+        return model_admin.get_search_results(request, ProjectActivity.objects.all(), term)
+    
+    def test_search_matches_related_fields(self, admin_user, project):
+        project.tender.title = 'Harbour crane refit'
+        project.tender.save()
+        project.vendor.username = 'steelworks_vendor'
+        project.vendor.save()
+        matching = ProjectActivity.objects.create(
+            project=project, user=project.client, activity_type='comment', description=fake.text()
+        )
+        
+        for term in ('crane', 'STEELWORKS', '"crane refit" steel'):
+            queryset, may_have_duplicates = self.search(admin_user, term)
+            assert list(queryset) == [matching]
+            assert not may_have_duplicates
+        
+        queryset, _ = self.search(admin_user, 'crane nowhere')
+        assert not queryset.exists()
+    
+    def test_search_uses_subqueries_instead_of_joins(self, admin_user, project):
+        queryset, _ = self.search(admin_user, 'crane')
+        sql = str(queryset.query)
+        assert 'JOIN' not in sql
+        assert 'FROM "tender_tender"' in sql
+        assert '"title"::text) LIKE UPPER(' in sql
+    
+    def assert_no_activity_scan(self, admin_user, term):
+        queryset, _ = self.search(admin_user, term)
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        assert 'Seq Scan on project_activity_projectactivity' not in plan, plan
+    
+    def test_related_fields_are_searched_through_indexes(self, admin_user, project, monkeypatch):
+        # Each relation is followed back through the foreign key index of the activity table
+        model_admin = admin.site._registry[ProjectActivity]
+        monkeypatch.setattr(model_admin, 'search_fields', [
+            field for field in model_admin.search_fields if '__' in field
+        ])
+        self.assert_no_activity_scan(admin_user, 'crane')
+    
+    def test_search_never_scans_the_activity_table(self, admin_user, project):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                pytest.skip("pg_trgm is not available")
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for table, column in trigram_index_targets():
+                cursor.execute(trigram_index_sql(table, column).replace(' CONCURRENTLY', ''))
+        self.assert_no_activity_scan(admin_user, 'crane')
+    
+    def test_changelist_search_skips_full_count(self, admin_client, project):
+        response = admin_client.get(reverse('admin:project_activity_projectactivity_changelist'), {'q': 'crane'})
+        assert response.status_code == 200
+        assert response.context['cl'].full_result_count is None
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    @pytest.fixture
+    def activities(self, project):
+        activities = ProjectActivity.objects.bulk_create([
+            ProjectActivity(project=project, user=project.client, activity_type='comment', description=fake.text())
+            for _ in range(30)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE project_activity_projectactivity')
+        return activities
+    
+    def test_small_sets_are_counted_exactly(self, activities):
+        paginator = EstimatedCountPaginator(ProjectActivity.objects.all(), 10)
+        assert paginator.count == 30
+        assert not paginator.count_is_approximate
+    
+    def test_unfiltered_count_uses_table_statistics(self, activities, django_assert_num_queries):
+        paginator = EstimatedCountPaginator(ProjectActivity.objects.all(), 10, threshold=5)
+        with django_assert_num_queries(1) as context:
+            assert paginator.count == 30
+        assert 'pg_class' in context.captured_queries[0]['sql']
+        assert paginator.count_is_approximate
+    
+    def test_filtered_count_is_exact_up_to_threshold(self, activities, project):
+        queryset = ProjectActivity.objects.filter(project=project, activity_id__in=[a.activity_id for a in activities[:4]])
+        paginator = EstimatedCountPaginator(queryset, 10, threshold=5)
+        assert paginator.count == 4
+        assert not paginator.count_is_approximate
+    
+    def test_filtered_count_above_threshold_is_estimated(self, activities, project):
+        paginator = EstimatedCountPaginator(ProjectActivity.objects.filter(project=project), 10, threshold=5)
+        assert paginator.count > 5
+        assert paginator.count_is_approximate
+    
+    @pytest.mark.parametrize('estimate', [6, 1000])
+    def test_pages_follow_the_rows_when_the_estimate_is_off(self, activities, project, monkeypatch, estimate):
+        monkeypatch.setattr(pagination, 'query_row_estimate', lambda queryset: estimate)
+        paginator = EstimatedCountPaginator(ProjectActivity.objects.filter(project=project).order_by('pk'), 10, threshold=5)
+        assert paginator.count == estimate
+        
+        second, third = paginator.page(2), paginator.page(3)
+        assert second.has_next() and not third.has_next()
+        assert [activity.pk for activity in third] == [activity.pk for activity in activities[20:]]
+        assert (third.start_index(), third.end_index()) == (21, 30)
+        with pytest.raises(EmptyPage):
+            paginator.page(4)
+    
+    def test_api_links_follow_the_rows_when_the_estimate_is_off(self, activities, project, monkeypatch):
+        monkeypatch.setattr(pagination, 'query_row_estimate', lambda queryset: 6)
+        paginator = pagination.EstimatedCountPagination()
+        paginator.page_size = 10
+        paginator.django_paginator_class = partial(EstimatedCountPaginator, threshold=5)
+        queryset = ProjectActivity.objects.filter(project=project).order_by('pk')
+        
+        request = Request(APIRequestFactory().get('/activities/', {'page': 2}))
+        assert len(paginator.paginate_queryset(queryset, request)) == 10
+        assert paginator.get_next_link().endswith('page=3')
+        
+        request = Request(APIRequestFactory().get('/activities/', {'page': 3}))
+        assert len(paginator.paginate_queryset(queryset, request)) == 10
+        assert paginator.get_next_link() is None
+        
+        with pytest.raises(NotFound):
+            paginator.paginate_queryset(queryset, Request(APIRequestFactory().get('/activities/', {'page': 4})))
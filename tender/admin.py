@@ -1,13 +1,27 @@
-from django.contrib import admin
-from django.utils.html import format_html, mark_safe
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.utils.html import format_html, format_html_join
 from django.urls import reverse
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, QueryDict
 from django.utils import timezone
-from .models import Tag, Tender, Category, Comment, Bid, Project
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+from tenderhubapi.admin_search import AutocompleteSearchMixin, TrigramSearchMixin
+from tenderhubapi.pagination import EstimatedCountPaginator
+from .models import Tag, Tender, Category, Comment, Bid, Project, DeadlineSweep
+from .sla import annotate_sla, due_within_condition, overdue_condition
+from .stats import rebuild_client_stats, rebuild_vendor_stats
+
+# Number of activities shown on the project change page
+ACTIVITY_HISTORY_LIMIT = 20
 
 # Custom admin actions
 def mark_tenders_completed(modeladmin, request, queryset):
+    client_ids = set(queryset.values_list('client_id', flat=True))
     queryset.update(status='completed')
+    rebuild_client_stats(client_ids)
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('comment_id', 'tender_title', 'user', 'content_preview', 'created_at')
@@ -28,42 +42,150 @@ class CommentAdmin(admin.ModelAdmin):
 mark_tenders_completed.short_description = "Mark selected tenders as completed"
 
 def mark_tenders_cancelled(modeladmin, request, queryset):
+    client_ids = set(queryset.values_list('client_id', flat=True))
     queryset.update(status='cancelled')
+    rebuild_client_stats(client_ids)
 mark_tenders_cancelled.short_description = "Mark selected tenders as cancelled"
 
+# Maximum number of skipped bids listed in the admin message
+MAX_REPORTED_CONFLICTS = 20
+
 def mark_bids_accepted(modeladmin, request, queryset):
-    for bid in queryset:
-        if bid.tender.status == 'open':
-            bid.status = 'accepted'
-            bid.save()
-            
-            # Create a project
-            tender = bid.tender
-            Project.objects.create(
-                tender=tender,
-                client=tender.client,
-                vendor=bid.vendor,
-                agreed_amount=bid.amount,
-                deadline=tender.deadline
-            )
-            
-            # Update tender status
-            tender.status = 'in_progress'
-            tender.save()
+    with transaction.atomic():
+        # Lock the open tenders of the selected bids so a concurrent accept can't create a second project
+        open_tender_ids = set(
+            Tender.objects.select_for_update()
+            .filter(tender_id__in=queryset.values('tender_id'), status='open')
+            .exclude(Exists(Project.objects.filter(tender=OuterRef('pk'))))
+            .values_list('tender_id', flat=True)
+        )
+        
+        accepted_tender_ids = set()
+        accepted_bid_ids = []
+        projects = []
+        conflicts = []
+        for bid_id, tender_id, vendor_id, amount, client_id, deadline in queryset.values_list(
+            'bid_id', 'tender_id', 'vendor_id', 'amount', 'tender__client_id', 'tender__deadline'
+        ):
+            if tender_id in accepted_tender_ids:
+                conflicts.append(f"#{bid_id} (another selected bid was accepted for this tender)")
+            elif tender_id not in open_tender_ids:
+                conflicts.append(f"#{bid_id} (tender is not open or already has a project)")
+            else:
+                # Only the first selected bid of each tender can be accepted
+                accepted_tender_ids.add(tender_id)
+                accepted_bid_ids.append(bid_id)
+                projects.append(Project(
+                    tender_id=tender_id,
+                    client_id=client_id,
+                    vendor_id=vendor_id,
+                    agreed_amount=amount,
+                    deadline=deadline
+                ))
+        
+        Bid.objects.filter(bid_id__in=accepted_bid_ids).update(status='accepted')
+        Project.objects.bulk_create(projects)
+        Tender.objects.filter(tender_id__in=accepted_tender_ids).update(status='in_progress')
+        # The updates above send no signals, so the affected dashboards are rebuilt
+        rebuild_client_stats({project.client_id for project in projects})
+        rebuild_vendor_stats({project.vendor_id for project in projects})
+    
+    if accepted_bid_ids:
+        modeladmin.message_user(request, f"Accepted {len(accepted_bid_ids)} bids and created their projects.")
+    if conflicts:
+        skipped = ", ".join(conflicts[:MAX_REPORTED_CONFLICTS])
+        if len(conflicts) > MAX_REPORTED_CONFLICTS:
+            skipped += f" and {len(conflicts) - MAX_REPORTED_CONFLICTS} more"
+        modeladmin.message_user(request, f"Skipped {len(conflicts)} bids: {skipped}", messages.WARNING)
 mark_bids_accepted.short_description = "Accept selected bids and create projects"
 
 # Inline admin classes
-class CommentInline(admin.TabularInline):
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset that only loads one page of related rows.
+    
+    Unbound formsets show the page given by `?<prefix>-page=N`. Bound formsets
+    only load the rows whose primary keys were posted, so saving the change
+    page never touches the rows of the other pages.
+    """
+    per_page = 20
+    page_number = 1
+    query_params = None
+    
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            queryset = super().get_queryset()
+            if self.is_bound:
+                queryset = queryset.filter(pk__in=self.get_posted_pks())
+            else:
+                # Keep the pages stable when the model ordering has ties
+                ordering = queryset.query.order_by or self.model._meta.ordering
+                queryset = queryset.order_by(*ordering, 'pk')
+                self.paginator = Paginator(queryset, self.per_page)
+                self.page = self.paginator.get_page(self.page_number)
+                queryset = self.page.object_list
+            self._queryset = queryset
+        return self._queryset
+    
+    def get_posted_pks(self):
+        pk_field = self.model._meta.pk
+        try:
+            initial_forms = min(int(self.data.get(f'{self.prefix}-INITIAL_FORMS', 0)), self.absolute_max)
+        except ValueError:
+            return []
+        
+        pks = []
+        for i in range(initial_forms):
+            try:
+                pk = pk_field.to_python(self.data.get(f'{self.add_prefix(i)}-{pk_field.name}'))
+            except ValidationError:
+                continue
+            if pk is not None:
+                pks.append(pk)
+        return pks
+    
+    def page_links(self):
+        """
+        Yields (page number, query string) pairs around the current page, keeping the
+        other query parameters. Elided ranges are yielded with an empty query string.
+        """
+        params = self.query_params.copy() if self.query_params is not None else QueryDict(mutable=True)
+        for number in self.paginator.get_elided_page_range(self.page.number):
+            if number == self.paginator.ELLIPSIS:
+                yield number, ''
+                continue
+            params[f'{self.prefix}-page'] = number
+            yield number, params.urlencode()
+
+class PaginatedTabularInline(admin.TabularInline):
+    formset = PaginatedInlineFormSet
+    template = 'admin/tender/edit_inline/paginated_tabular.html'
+    
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.page_number = request.GET.get(f'{formset.get_default_prefix()}-page', 1)
+        formset.query_params = request.GET
+        return formset
+
+class CommentInline(PaginatedTabularInline):
     model = Comment
     extra = 0
     readonly_fields = ('created_at',)
     fields = ('user', 'content', 'created_at')
+    autocomplete_fields = ('user',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
 
-class BidInline(admin.TabularInline):
+class BidInline(PaginatedTabularInline):
     model = Bid
     extra = 0
     readonly_fields = ('created_at',)
     fields = ('vendor', 'amount', 'delivery_time', 'status', 'created_at')
+    autocomplete_fields = ('vendor',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('vendor')
 
 admin.site.site_header = "TenderHub Administration"
 admin.site.site_title = "TenderHub"
@@ -77,23 +199,27 @@ class TagAdmin(admin.ModelAdmin):
         return obj.tenders.count()
     get_tenders_count.short_description = 'Tenders using this tag'
 
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(AutocompleteSearchMixin, admin.ModelAdmin):
     list_display = ('name', 'description', 'get_tenders_count')
     search_fields = ('name', 'description')
+    autocomplete_search_fields = ('^name',)
     list_display_links = ('name',)
     
     def get_tenders_count(self, obj):
         return obj.tenders.count()
     get_tenders_count.short_description = 'Tenders in category'
 
-class TenderAdmin(admin.ModelAdmin):
+class TenderAdmin(AutocompleteSearchMixin, TrigramSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'client', 'status', 'budget_range', 'deadline', 'created_at', 'bid_count', 'days_remaining', 'view_project_link')
     list_filter = ('status', 'created_at', 'category')
     search_fields = ('title', 'description', 'client__username')
+    autocomplete_fields = ('client', 'category')
+    autocomplete_search_fields = ('^title',)
     readonly_fields = ('created_at', 'bid_count')
     filter_horizontal = ('tags',)
     actions = [mark_tenders_completed, mark_tenders_cancelled]
     list_per_page = 20
+    paginator = EstimatedCountPaginator
     save_on_top = True
     inlines = [BidInline, CommentInline]
     
@@ -114,6 +240,18 @@ class TenderAdmin(admin.ModelAdmin):
     )
     date_hierarchy = 'created_at'
     
+    def get_queryset(self, request):
+        # Bid counts and project ids are loaded with the page instead of once per row
+        return super().get_queryset(request).select_related('client').annotate(
+            num_bids=Count('bids'),
+            project_pk=F('project__project_id'),
+        )
+    
+    def bid_count(self, obj):
+        return obj.num_bids
+    bid_count.short_description = 'Bid count'
+    bid_count.admin_order_field = 'num_bids'
+    
     def budget_range(self, obj):
         return f"${obj.min_budget} - ${obj.max_budget}"
     budget_range.short_description = 'Budget Range'
@@ -131,8 +269,8 @@ class TenderAdmin(admin.ModelAdmin):
     days_remaining.short_description = 'Days Remaining'
     
     def view_project_link(self, obj):
-        if hasattr(obj, 'project'):
-            url = reverse('admin:tender_project_change', args=[obj.project.project_id])
+        if obj.project_pk:
+            url = reverse('admin:tender_project_change', args=[obj.project_pk])
             return format_html('<a href="{}">View Project</a>', url)
         return "-"
     view_project_link.short_description = 'Project'
@@ -143,6 +281,9 @@ class CommentAdmin(admin.ModelAdmin):
     search_fields = ('content', 'tender__title', 'user__username')
     readonly_fields = ('created_at',)
     date_hierarchy = 'created_at'
+    list_select_related = ('tender', 'user')
+    paginator = EstimatedCountPaginator
+    autocomplete_fields = ('tender', 'user')
     
     def tender_link(self, obj):
         url = reverse('admin:tender_tender_change', args=[obj.tender.tender_id])
@@ -153,25 +294,48 @@ class CommentAdmin(admin.ModelAdmin):
         return obj.content[:75] + '...' if len(obj.content) > 75 else obj.content
     truncated_content.short_description = 'Content'
 
-class BidAdmin(admin.ModelAdmin):
+class BidAdmin(TrigramSearchMixin, admin.ModelAdmin):
     list_display = ('bid_id', 'tender_link', 'vendor', 'amount', 'delivery_time', 'status', 'created_at')
     list_filter = ('status', 'created_at')
     search_fields = ('proposal', 'tender__title', 'vendor__username')
     readonly_fields = ('created_at',)
     date_hierarchy = 'created_at'
     actions = [mark_bids_accepted]
+    list_select_related = ('tender', 'vendor')
+    paginator = EstimatedCountPaginator
+    autocomplete_fields = ('tender', 'vendor')
     
     def tender_link(self, obj):
         url = reverse('admin:tender_tender_change', args=[obj.tender.tender_id])
         return format_html('<a href="{}">{}</a>', url, obj.tender.title)
     tender_link.short_description = 'Tender'
 
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectScheduleFilter(admin.SimpleListFilter):
+    title = 'schedule'
+    parameter_name = 'schedule'
+    
+    def lookups(self, request, model_admin):
+        return (
+            ('overdue', 'Overdue'),
+            ('due_7d', 'Due within 7 days'),
+        )
+    
+    def queryset(self, request, queryset):
+        if self.value() == 'overdue':
+            return queryset.filter(overdue_condition(timezone.localdate()))
+        if self.value() == 'due_7d':
+            return queryset.filter(due_within_condition(timezone.localdate(), 7))
+        return queryset
+
+class ProjectAdmin(AutocompleteSearchMixin, admin.ModelAdmin):
     list_display = ('project_id', 'tender_link', 'client', 'vendor', 'agreed_amount', 'deadline', 'status', 'days_since_start', 'completion_percentage')
-    list_filter = ('status', 'start_date')
+    list_filter = ('status', ProjectScheduleFilter, 'start_date')
     search_fields = ('tender__title', 'client__username', 'vendor__username')
     readonly_fields = ('start_date', 'get_activity_history')
     date_hierarchy = 'start_date'
+    list_select_related = ('tender', 'client', 'vendor')
+    autocomplete_fields = ('tender', 'client', 'vendor')
+    autocomplete_search_fields = ('^tender__title',)
     
     fieldsets = (
         (None, {
@@ -191,39 +355,66 @@ class ProjectAdmin(admin.ModelAdmin):
         return format_html('<a href="{}">{}</a>', url, obj.tender.title)
     tender_link.short_description = 'Tender'
     
+    def get_queryset(self, request):
+        # Schedule progress is computed by the database, see tender.sla
+        return annotate_sla(super().get_queryset(request))
+    
     def days_since_start(self, obj):
-        return (timezone.localdate() - obj.start_date).days
+        return obj.days_running
     days_since_start.short_description = 'Days Running'
+    days_since_start.admin_order_field = 'days_running'
     
     def completion_percentage(self, obj):
-        if obj.status == 'completed':
-            return format_html('<span style="color: green;">100%</span>')
-        
-        total_days = (obj.deadline - obj.start_date).days
-        if total_days <= 0:
+        if obj.progress is None:
             return "N/A"
-        
-        days_passed = (timezone.localdate() - obj.start_date).days
-        if days_passed < 0:
-            return "0%"
-        
-        percentage = min(round((days_passed / total_days) * 100), 99)
-        color = 'green' if percentage < 60 else ('orange' if percentage < 90 else 'red')
-        return format_html('<span style="color: {};">{}%</span>', color, percentage)
+        if obj.progress == 100:
+            color = 'green'
+        elif obj.is_overdue:
+            color = 'red'
+        else:
+            color = 'green' if obj.progress < 60 else ('orange' if obj.progress < 90 else 'red')
+        return format_html('<span style="color: {};">{}%</span>', color, obj.progress)
     completion_percentage.short_description = 'Completion'
+    completion_percentage.admin_order_field = 'progress'
     
     def get_activity_history(self, obj):
-        activities = obj.activities.all().order_by('-created_at')
+        # Only the latest activities are rendered, the full history is paginated in its own changelist
+        activities = list(
+            obj.activities.select_related('user').order_by('-created_at')[:ACTIVITY_HISTORY_LIMIT + 1]
+        )
         if not activities:
             return "No activities recorded"
         
-        html = '<ul style="list-style-type: none; padding-left: 0;">'
-        for activity in activities:
-            html += f'<li style="margin-bottom: 10px;"><b>{activity.created_at.strftime("%Y-%m-%d %H:%M")}</b>: <b>{activity.activity_type}</b> by <b>{activity.user.username}</b><br/>{activity.description}</li>'
-        html += '</ul>'
-        return mark_safe(html)
+        items = format_html_join(
+            '', 
+            '<li style="margin-bottom: 10px;"><b>{}</b>: <b>{}</b> by <b>{}</b><br/>{}</li>',
+            (
+                (activity.created_at.strftime("%Y-%m-%d %H:%M"), activity.activity_type, activity.user.username, activity.description)
+                for activity in activities[:ACTIVITY_HISTORY_LIMIT]
+            )
+        )
+        html = format_html('<ul style="list-style-type: none; padding-left: 0;">{}</ul>', items)
+        
+        if len(activities) > ACTIVITY_HISTORY_LIMIT:
+            url = reverse('admin:project_activity_projectactivity_changelist')
+            html += format_html(
+                '<p>Showing the latest {} activities. <a href="{}?project__project_id__exact={}">View all activities</a></p>',
+                ACTIVITY_HISTORY_LIMIT, url, obj.project_id
+            )
+        return html
     get_activity_history.short_description = 'Activity History'
 
+class DeadlineSweepAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'tenders_closed', 'batches', 'duration', 'longest_batch')
+    date_hierarchy = 'started_at'
+    
+    # Sweeps are only recorded by the close_expired_tenders command
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 # Register all models with their custom admin classes
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Category, CategoryAdmin)
@@ -231,6 +422,7 @@ admin.site.register(Tender, TenderAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Bid, BidAdmin)
 admin.site.register(Project, ProjectAdmin)
+admin.site.register(DeadlineSweep, DeadlineSweepAdmin)
 
 # Register the many-to-many through model
 admin.site.register(Tender.tags.through)
@@ -0,0 +1,35 @@
+"""
+Async versions of the busiest tender reads, see tenderhubapi.async_views.
+"""
+from django.shortcuts import aget_object_or_404
+
+from tenderhubapi.async_views import AsyncReadView
+
+from .serializers import CategorySerializer, TagSerializer, TenderDetailSerializer, TenderSerializer
+from .views import CategoryViewSet, TagViewSet, TenderViewSet, tender_queryset
+
+class AsyncTenderListView(AsyncReadView):
+    permission_classes = TenderViewSet.permission_classes
+
+    async def get(self, request):
+        return await self.paginate(request, tender_queryset(request.GET), TenderSerializer)
+
+class AsyncTenderDetailView(AsyncReadView):
+    permission_classes = TenderViewSet.permission_classes
+
+    async def get(self, request, pk):
+        tender = await aget_object_or_404(tender_queryset(request.GET, detail=True), pk=pk)
+        self.check_object_permissions(request, tender)
+        return TenderDetailSerializer(tender, context=self.serializer_context(request)).data
+
+class AsyncTagListView(AsyncReadView):
+    permission_classes = TagViewSet.permission_classes
+
+    async def get(self, request):
+        return await self.paginate(request, TagViewSet.queryset.all(), TagSerializer)
+
+class AsyncCategoryListView(AsyncReadView):
+    permission_classes = CategoryViewSet.permission_classes
+
+    async def get(self, request):
+        return await self.paginate(request, CategoryViewSet.queryset.all(), CategorySerializer)
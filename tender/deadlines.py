@@ -0,0 +1,64 @@
+import time
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from outbox.events import make_event, publish_many
+
+from .models import DeadlineSweep, Tender
+from .stats import bump_client_stats
+
+# Upper bound of the tenders closed per transaction, so row locks are held briefly
+MAX_BATCH_SIZE = 5000
+
+def close_expired_batch(today, batch_size):
+    """
+    Closes up to `batch_size` open tenders whose deadline has passed and returns
+    the number closed. Rows locked by other transactions are skipped and picked
+    up by a later batch or sweep.
+    """
+    with transaction.atomic():
+        expired = list(
+            Tender.objects.select_for_update(skip_locked=True)
+            .filter(status='open', deadline__lt=today)
+            .order_by('deadline')
+            .values_list('tender_id', 'client_id')[:batch_size]
+        )
+        if not expired:
+            return 0
+        
+        Tender.objects.filter(tender_id__in=[tender_id for tender_id, _ in expired]).update(status='closed')
+        # The update sends no signals, so the dashboards are adjusted here
+        for client_id, count in Counter(client_id for _, client_id in expired).items():
+            bump_client_stats(client_id, tenders_open=-count, tenders_closed=count)
+        publish_many([
+            make_event('tender.closed', Tender, tender_id, client_id=client_id)
+            for tender_id, client_id in expired
+        ])
+    return len(expired)
+
+def close_expired_tenders(batch_size=500, today=None):
+    """
+    Moves every open tender with a deadline before today to 'closed', in batches
+    of at most MAX_BATCH_SIZE, and records the sweep's metrics.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    today = today or timezone.localdate()
+    sweep = DeadlineSweep(started_at=timezone.now())
+    started = time.perf_counter()
+    
+    while True:
+        batch_started = time.perf_counter()
+        closed = close_expired_batch(today, batch_size)
+        if not closed:
+            break
+        sweep.batches += 1
+        sweep.tenders_closed += closed
+        sweep.longest_batch = max(sweep.longest_batch, time.perf_counter() - batch_started)
+        if closed < batch_size:
+            break
+    
+    sweep.duration = time.perf_counter() - started
+    sweep.save()
+    return sweep
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tender.deadlines import MAX_BATCH_SIZE, close_expired_tenders
+
+
+class Command(BaseCommand):
+    help = "Closes open tenders whose deadline has passed. Runs every --interval seconds unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run a single sweep and exit.")
+        parser.add_argument(
+            '--interval', type=int, default=300,
+            help="Seconds between two sweeps (default: 300).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help=f"Tenders closed per transaction (at most {MAX_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sweep = close_expired_tenders(batch_size=options['batch_size'])
+            self.stdout.write(
+                f"Closed {sweep.tenders_closed} tenders in {sweep.batches} batches "
+                f"({sweep.duration:.2f}s, slowest batch {sweep.longest_batch:.2f}s)."
+            )
+            if options['once']:
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from tender.market import CHUNK_SIZE, TOP_TAGS, compute_market_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the budget and bid price statistics of every category and of the most used tags."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-tags', type=int, default=TOP_TAGS,
+            help="Number of most used tags that get their own stats.",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help="Rows fetched per round trip while streaming the columns.",
+        )
+
+    def handle(self, *args, **options):
+        result = compute_market_stats(top_tags=options['top_tags'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed stats for {result['categories']} categories and {result['tags']} tags "
+            f"from {result['tenders']} tenders and {result['bids']} bids."
+        ))
+        self.stdout.write(
+            f"Load {result['load_seconds']:.2f}s, compute {result['compute_seconds']:.2f}s, "
+            f"save {result['save_seconds']:.2f}s."
+        )
@@ -0,0 +1,68 @@
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.utils import truncate_name
+from django.db.utils import DatabaseError
+
+from tenderhubapi.admin_search import TrigramSearchMixin, resolve_search_path, split_search_field
+
+
+def trigram_index_targets(site=admin.site):
+    """
+    Returns the sorted (table, column) pairs searched by the admins that use
+    TrigramSearchMixin, following relations to the table that owns the column.
+    """
+    targets = set()
+    for model, model_admin in site._registry.items():
+        if not isinstance(model_admin, TrigramSearchMixin):
+            continue
+        for search_field in model_admin.search_fields:
+            _, path = split_search_field(search_field)
+            _, field = resolve_search_path(model, path)
+            targets.add((field.model._meta.db_table, field.column))
+    return sorted(targets)
+
+
+def trigram_index_sql(table, column):
+    name = truncate_name(f'{table}_{column}_trgm_idx', connection.ops.max_name_length())
+    return (
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {connection.ops.quote_name(name)} '
+        f'ON {connection.ops.quote_name(table)} '
+        f'USING gin ((UPPER({connection.ops.quote_name(column)}::text)) gin_trgm_ops)'
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the pg_trgm extension and the trigram GIN indexes used by the admin search. "
+        "Indexes are built concurrently, so the command can run against a live database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--print-sql', action='store_true',
+            help="Print the statements instead of running them.",
+        )
+
+    def handle(self, *args, **options):
+        statements = ['CREATE EXTENSION IF NOT EXISTS pg_trgm']
+        statements += [trigram_index_sql(table, column) for table, column in trigram_index_targets()]
+
+        if options['print_sql']:
+            for statement in statements:
+                self.stdout.write(f'{statement};')
+            return
+
+        if connection.vendor != 'postgresql':
+            raise CommandError("Trigram indexes require PostgreSQL.")
+        if connection.in_atomic_block:
+            raise CommandError("CREATE INDEX CONCURRENTLY can't run inside a transaction.")
+
+        with connection.cursor() as cursor:
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except DatabaseError as e:
+                    raise CommandError(f"{statement} failed: {e}")
+                self.stdout.write(statement)
+        self.stdout.write(self.style.SUCCESS(f"Created {len(statements) - 1} trigram indexes."))
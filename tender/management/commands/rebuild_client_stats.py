@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from tender.stats import rebuild_client_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the client dashboard rollups from the tender, bid and project tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'client_ids', nargs='*', type=int,
+            help="Only rebuild these clients (default: every client).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of clients recomputed per query batch.",
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_client_stats(options['client_ids'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {written} clients."))
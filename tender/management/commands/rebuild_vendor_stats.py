@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from tender.stats import rebuild_vendor_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the vendor performance metrics from the bid, project and project activity tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'vendor_ids', nargs='*', type=int,
+            help="Only rebuild these vendors (default: every vendor).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of vendors recomputed per query batch.",
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_vendor_stats(options['vendor_ids'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {written} vendors."))
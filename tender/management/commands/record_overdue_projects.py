@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tender.sla import record_overdue_projects
+
+
+class Command(BaseCommand):
+    help = (
+        "Records an 'overdue' activity on active projects whose deadline has passed, once per project. "
+        "Runs every --interval seconds unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run a single sweep and exit.")
+        parser.add_argument(
+            '--interval', type=int, default=3600,
+            help="Seconds between two sweeps (default: 3600).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Projects flagged per insert (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            flagged = record_overdue_projects(batch_size=max(1, options['batch_size']))
+            self.stdout.write(f"Flagged {flagged} overdue projects.")
+            if options['once']:
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
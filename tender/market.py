@@ -0,0 +1,247 @@
+"""
+Market price statistics per category and per popular tag.
+
+The tender and bid columns are streamed from the database into NumPy arrays,
+and the percentiles and histograms of every group are computed in a
+vectorized pass: the values are sorted by (group, value), and each group's
+percentiles are then read from its contiguous slice by index arithmetic.
+"""
+import time
+
+import numpy as np
+from django.db import connections, router, transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Bid, MarketStats, Tender
+
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAM_BINS = 10
+TOP_TAGS = 50
+CHUNK_SIZE = 20000
+
+
+def stream_columns(queryset, dtypes, chunk_size=CHUNK_SIZE):
+    """
+    Reads a values_list() queryset into one NumPy array per column without
+    building the full list of rows in memory. `dtypes` gives the dtype of
+    each column, in order.
+    """
+    columns = [[] for _ in dtypes]
+    chunk = []
+
+    def flush():
+        for i, values in enumerate(zip(*chunk)):
+            columns[i].append(np.fromiter(values, dtype=dtypes[i], count=len(chunk)))
+        chunk.clear()
+
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return [
+        np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        for parts, dtype in zip(columns, dtypes)
+    ]
+
+
+def grouped_percentiles(groups, values, percentiles=PERCENTILES):
+    """
+    Returns (group ids, counts, percentiles) for every group, where the
+    percentiles are a (groups x percentiles) matrix using the same linear
+    interpolation as np.percentile.
+    """
+    if not len(values):
+        return np.empty(0, dtype=groups.dtype), np.empty(0, dtype=np.int64), np.empty((0, len(percentiles)))
+    # Sort by (group, value rank) as one integer key, much faster than np.lexsort
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[np.argsort(values)] = np.arange(len(values))
+    order = np.argsort((groups - groups.min()) * len(values) + ranks)
+    sorted_groups, sorted_values = groups[order], values[order]
+    # The groups are sorted, so each one starts where the group id changes
+    starts = np.concatenate(([0], np.flatnonzero(sorted_groups[1:] != sorted_groups[:-1]) + 1))
+    counts = np.diff(np.append(starts, len(sorted_groups)))
+    group_ids = sorted_groups[starts]
+
+    positions = starts[:, None] + np.asarray(percentiles) / 100 * (counts[:, None] - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    fraction = positions - lower
+    result = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    return group_ids, counts, result
+
+
+def grouped_histograms(groups, values, bins=HISTOGRAM_BINS):
+    """
+    Returns (group ids, edges, counts) with `bins` equal-width bins between each
+    group's min and max value.
+    """
+    if not len(values):
+        return np.empty(0, dtype=groups.dtype), np.empty((0, bins + 1)), np.empty((0, bins), dtype=np.int64)
+    group_ids, group_index = np.unique(groups, return_inverse=True)
+    low = np.full(len(group_ids), np.inf)
+    high = np.full(len(group_ids), -np.inf)
+    np.minimum.at(low, group_index, values)
+    np.maximum.at(high, group_index, values)
+
+    width = np.where(high > low, (high - low) / bins, 1.0)
+    bin_index = np.clip(((values - low[group_index]) / width[group_index]).astype(np.int64), 0, bins - 1)
+    counts = np.bincount(group_index * bins + bin_index, minlength=len(group_ids) * bins)
+    edges = low[:, None] + width[:, None] * np.arange(bins + 1)
+    return group_ids, edges, counts.reshape(len(group_ids), bins)
+
+
+def expand_by_tender(pair_tender_ids, pair_groups, row_tender_ids):
+    """
+    Joins (tender, group) pairs to rows sorted by tender id, returning the row
+    indices and the group of every joined row.
+    """
+    starts = np.searchsorted(row_tender_ids, pair_tender_ids, side='left')
+    counts = np.searchsorted(row_tender_ids, pair_tender_ids, side='right') - starts
+    offsets = np.cumsum(counts) - counts
+    indices = np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+    return indices, np.repeat(pair_groups, counts)
+
+
+def percentile_dict(row):
+    return {f'p{p}': round(float(value), 2) for p, value in zip(PERCENTILES, row)}
+
+
+def histogram_dict(edges, counts):
+    return {'edges': [round(float(edge), 2) for edge in edges], 'counts': [int(count) for count in counts]}
+
+
+def summarize(tender_groups, min_budgets, max_budgets, bid_groups, amounts, delivery_times, won):
+    """Computes the stats of every group, keyed by group id."""
+    stats = {}
+
+    def row(group_id):
+        return stats.setdefault(int(group_id), {
+            'tender_count': 0, 'bid_count': 0, 'winning_bid_count': 0,
+            'min_budget_percentiles': {}, 'max_budget_percentiles': {},
+            'bid_amount_percentiles': {}, 'winning_bid_percentiles': {},
+            'median_delivery_time': None,
+            'max_budget_histogram': {}, 'bid_amount_histogram': {},
+        })
+
+    for group_id, count, percentiles in zip(*grouped_percentiles(tender_groups, min_budgets)):
+        row(group_id).update(tender_count=int(count), min_budget_percentiles=percentile_dict(percentiles))
+    for group_id, _, percentiles in zip(*grouped_percentiles(tender_groups, max_budgets)):
+        row(group_id)['max_budget_percentiles'] = percentile_dict(percentiles)
+    for group_id, edges, counts in zip(*grouped_histograms(tender_groups, max_budgets)):
+        row(group_id)['max_budget_histogram'] = histogram_dict(edges, counts)
+
+    for group_id, count, percentiles in zip(*grouped_percentiles(bid_groups, amounts)):
+        row(group_id).update(bid_count=int(count), bid_amount_percentiles=percentile_dict(percentiles))
+    for group_id, edges, counts in zip(*grouped_histograms(bid_groups, amounts)):
+        row(group_id)['bid_amount_histogram'] = histogram_dict(edges, counts)
+    for group_id, _, medians in zip(*grouped_percentiles(bid_groups, delivery_times, percentiles=(50,))):
+        row(group_id)['median_delivery_time'] = float(medians[0])
+
+    for group_id, count, percentiles in zip(*grouped_percentiles(bid_groups[won], amounts[won])):
+        row(group_id).update(winning_bid_count=int(count), winning_bid_percentiles=percentile_dict(percentiles))
+    return stats
+
+
+def load_market_data(top_tags=TOP_TAGS, chunk_size=CHUNK_SIZE):
+    """
+    Streams the tender, bid and tag columns into NumPy arrays, from one
+    REPEATABLE READ snapshot so the bids and tags only refer to loaded tenders
+    (unless called in a transaction already, which then sets the isolation).
+    """
+    alias = router.db_for_read(Tender)
+    connection = connections[alias]
+    snapshot = connection.vendor == 'postgresql' and not connection.in_atomic_block
+    with transaction.atomic(using=alias):
+        if snapshot:
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+        return read_market_data(alias, top_tags, chunk_size)
+
+
+def read_market_data(alias, top_tags, chunk_size):
+    tenders = stream_columns(
+        Tender.objects.using(alias).order_by('tender_id').values_list(
+            # Tenders without a category get group -1, which is skipped when saving
+            'tender_id', Coalesce('category_id', -1), 'min_budget', 'max_budget'
+        ),
+        (np.int64, np.int64, np.float64, np.float64),
+        chunk_size,
+    )
+    bids = stream_columns(
+        Bid.objects.using(alias).order_by('tender_id').values_list(
+            'tender_id', 'amount', 'delivery_time',
+            ExpressionWrapper(Q(status='accepted'), output_field=BooleanField()),
+        ),
+        (np.int64, np.float64, np.float64, np.bool_),
+        chunk_size,
+    )
+    tag_ids = list(
+        Tender.tags.through.objects.using(alias).values('tag_id').annotate(count=Count('pk'))
+        .order_by('-count', 'tag_id').values_list('tag_id', flat=True)[:top_tags]
+    )
+    tag_pairs = stream_columns(
+        Tender.tags.through.objects.using(alias).filter(tag_id__in=tag_ids).order_by().values_list('tender_id', 'tag_id'),
+        (np.int64, np.int64),
+        chunk_size,
+    )
+    return tenders, bids, tag_pairs
+
+
+def compute_market_stats(top_tags=TOP_TAGS, chunk_size=CHUNK_SIZE):
+    """
+    Recomputes MarketStats for every category and for the `top_tags` most used
+    tags. Returns a dict with the row counts and the time spent loading,
+    computing and saving, in seconds.
+    """
+    started = time.perf_counter()
+    tenders, bids, tag_pairs = load_market_data(top_tags, chunk_size)
+    tender_ids, categories, min_budgets, max_budgets = tenders
+    loaded = time.perf_counter()
+
+    # Tender rows and bid rows are both sorted by tender id. Bids of a tender
+    # that wasn't loaded (outside of a snapshot) are left out.
+    bid_tender_index = np.searchsorted(tender_ids, bids[0])
+    known = bid_tender_index < len(tender_ids)
+    known[known] = tender_ids[bid_tender_index[known]] == bids[0][known]
+    bid_tender_ids, amounts, delivery_times, won = (column[known] for column in bids)
+    bid_tender_index = bid_tender_index[known]
+    by_category = summarize(
+        categories, min_budgets, max_budgets,
+        categories[bid_tender_index], amounts, delivery_times, won,
+    )
+
+    pair_tender_ids, pair_tags = tag_pairs
+    tender_index, tender_tags = expand_by_tender(pair_tender_ids, pair_tags, tender_ids)
+    bid_index, bid_tags = expand_by_tender(pair_tender_ids, pair_tags, bid_tender_ids)
+    by_tag = summarize(
+        tender_tags, min_budgets[tender_index], max_budgets[tender_index],
+        bid_tags, amounts[bid_index], delivery_times[bid_index], won[bid_index],
+    )
+    computed = time.perf_counter()
+
+    now = timezone.now()
+    rows = [
+        MarketStats(category_id=category_id, computed_at=now, **values)
+        for category_id, values in by_category.items() if category_id != -1
+    ] + [
+        MarketStats(tag_id=tag_id, computed_at=now, **values)
+        for tag_id, values in by_tag.items()
+    ]
+    with transaction.atomic():
+        MarketStats.objects.all().delete()
+        MarketStats.objects.bulk_create(rows, batch_size=1000)
+    saved = time.perf_counter()
+
+    return {
+        'tenders': len(tender_ids),
+        'bids': len(bid_tender_ids),
+        'categories': sum(1 for row in rows if row.category_id is not None),
+        'tags': len(by_tag),
+        'load_seconds': loaded - started,
+        'compute_seconds': computed - loaded,
+        'save_seconds': saved - computed,
+    }
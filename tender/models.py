@@ -1,8 +1,34 @@
 from django.utils import timezone
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 from users.models import User
 
+class TrackedFieldsMixin:
+    """
+    Remembers the values of `tracked_fields` as they were loaded from the database,
+    so the stats signal handlers can apply the change of a save as a delta.
+    """
+    tracked_fields = ()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.tracked_fields
+        }
+        return instance
+    
+    def get_loaded_value(self, name, default=None):
+        return getattr(self, '_loaded_values', {}).get(name, default)
+    
+    def has_loaded_values(self):
+        return set(getattr(self, '_loaded_values', {})) == set(self.tracked_fields)
+    
+    def remember_loaded_values(self):
+        self._loaded_values = {name: getattr(self, name) for name in self.tracked_fields}
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     
@@ -21,12 +47,13 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class Tender(models.Model):
+class Tender(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = (
         ('open', 'Open'),
         ('in_progress', 'In Progress'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
+        ('closed', 'Closed'),
     )
 
     tender_id = models.BigAutoField(primary_key=True)
@@ -47,18 +74,41 @@ class Tender(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
     tags = models.ManyToManyField(Tag, related_name='tenders', blank=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='tenders')
+    
+    # max_budget is summed over the tender's bids in ClientStats.bid_budget_total
+    tracked_fields = ('status', 'max_budget', 'client_id')
 
     class Meta:
         verbose_name = "Tender"
         verbose_name_plural = "Tenders"
         ordering = ['-created_at']
+        indexes = [
+            # Supports the admin's case-insensitive prefix search (title__istartswith)
+            models.Index(
+                OpClass(Upper('title'), name='text_pattern_ops'),
+                name='tender_title_prefix_idx',
+            ),
+            # Lets the deadline sweeper find expired open tenders without scanning closed ones
+            models.Index(
+                fields=['deadline'], condition=models.Q(status='open'), name='tender_open_deadline_idx'
+            ),
+        ]
     
     def __str__(self):
         return self.title
     
+    # Set by querysets annotated with bid_count=Count('bids'), see tender.views.tender_queryset
+    _bid_count = None
+    
     @property
     def bid_count(self):
-        return self.bids.count()
+        if self._bid_count is None:
+            return self.bids.count()
+        return self._bid_count
+    
+    @bid_count.setter
+    def bid_count(self, value):
+        self._bid_count = value
     
     @property
     def top_bid(self):
@@ -86,7 +136,7 @@ class Comment(models.Model):
     def __str__(self):
         return f"Comment by {self.user} on {self.tender.title}"
     
-class Bid(models.Model):
+class Bid(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
         ('accepted', 'Accepted'),
@@ -102,6 +152,8 @@ class Bid(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
+    tracked_fields = ('amount', 'status')
+    
     class Meta:
         verbose_name = "Bid"
         verbose_name_plural = "Bids"
@@ -110,7 +162,7 @@ class Bid(models.Model):
     def __str__(self):
         return f"Bid by {self.vendor.username} on {self.tender.title}"
     
-class Project(models.Model):
+class Project(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = (
         ('in_progress', 'In Progress'),
         ('revision_requested', 'Revision Requested'),
@@ -127,10 +179,151 @@ class Project(models.Model):
     deadline = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     
+    tracked_fields = ('status', 'agreed_amount')
+    
     class Meta:
         verbose_name = "Project"
         verbose_name_plural = "Projects"
         ordering = ['-start_date']
+        indexes = [
+            # Supports the overdue project count of the client dashboard
+            models.Index(fields=['client', 'status', 'deadline'], name='project_client_deadline_idx'),
+            # Supports the overdue and due soon filters and the overdue sweep
+            models.Index(fields=['status', 'deadline'], name='project_status_deadline_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Project: {self.tender.title}"
+
+class ClientStats(models.Model):
+    """
+    Dashboard rollup of a client's tenders, bids and projects.
+    
+    Kept up to date by the signal handlers in `tender.signals` and rebuilt from
+    scratch with `python manage.py rebuild_client_stats`. Overdue projects depend
+    on the current date, so they are counted when the dashboard is read.
+    """
+    client = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='client_stats')
+    tenders_open = models.IntegerField(default=0)
+    tenders_in_progress = models.IntegerField(default=0)
+    tenders_completed = models.IntegerField(default=0)
+    tenders_cancelled = models.IntegerField(default=0)
+    tenders_closed = models.IntegerField(default=0)
+    bids_received = models.IntegerField(default=0)
+    bid_amount_total = models.DecimalField(decimal_places=2, max_digits=16, default=0)
+    # Sum of the tenders' max budget for every bid received, for the average bid vs. budget
+    bid_budget_total = models.DecimalField(decimal_places=2, max_digits=16, default=0)
+    active_projects = models.IntegerField(default=0)
+    spend_to_date = models.DecimalField(decimal_places=2, max_digits=16, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Client stats"
+        verbose_name_plural = "Client stats"
+    
+    def __str__(self):
+        return f"Stats for {self.client_id}"
+
+class VendorStats(models.Model):
+    """
+    Track record of a vendor shown next to their bids and profile.
+    
+    Bid and project counts follow the bid and project signal handlers, deliveries
+    revision requests and completions follow the project activities written by
+    `ProjectViewSet`. A delivery or completion is on time when it's made on or
+    before the project deadline. `python manage.py rebuild_vendor_stats`
+    recomputes the rows against the current deadlines.
+    """
+    vendor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='vendor_stats')
+    bids_total = models.IntegerField(default=0)
+    bids_won = models.IntegerField(default=0)
+    deliveries = models.IntegerField(default=0)
+    on_time_deliveries = models.IntegerField(default=0)
+    revision_requests = models.IntegerField(default=0)
+    completions = models.IntegerField(default=0)
+    on_time_completions = models.IntegerField(default=0)
+    projects_completed = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Vendor stats"
+        verbose_name_plural = "Vendor stats"
+    
+    def __str__(self):
+        return f"Stats for {self.vendor_id}"
+    
+    @staticmethod
+    def ratio(part, whole):
+        return round(part / whole, 4) if whole else None
+    
+    @property
+    def win_rate(self):
+        return self.ratio(self.bids_won, self.bids_total)
+    
+    @property
+    def on_time_rate(self):
+        return self.ratio(self.on_time_deliveries, self.deliveries)
+    
+    @property
+    def on_time_completion_rate(self):
+        return self.ratio(self.on_time_completions, self.completions)
+    
+    @property
+    def revision_rate(self):
+        # Revision requests per delivery
+        return self.ratio(self.revision_requests, self.deliveries)
+
+class MarketStats(models.Model):
+    """
+    Budget and bid price distribution of a category or of a popular tag.
+    
+    Rows are replaced as a whole by `python manage.py compute_market_stats`.
+    Percentile fields map 'p10', 'p25', 'p50', 'p75' and 'p90' to values, and
+    histograms hold the bin 'edges' and the 'counts' per bin.
+    """
+    category = models.OneToOneField(
+        Category, on_delete=models.CASCADE, null=True, blank=True, related_name='market_stats'
+    )
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, null=True, blank=True, related_name='market_stats')
+    tender_count = models.IntegerField(default=0)
+    bid_count = models.IntegerField(default=0)
+    winning_bid_count = models.IntegerField(default=0)
+    min_budget_percentiles = models.JSONField(default=dict)
+    max_budget_percentiles = models.JSONField(default=dict)
+    bid_amount_percentiles = models.JSONField(default=dict)
+    winning_bid_percentiles = models.JSONField(default=dict)
+    median_delivery_time = models.FloatField(null=True, blank=True)
+    max_budget_histogram = models.JSONField(default=dict)
+    bid_amount_histogram = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = "Market stats"
+        verbose_name_plural = "Market stats"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(category__isnull=True) ^ models.Q(tag__isnull=True),
+                name='market_stats_category_xor_tag',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Market stats for {self.category or self.tag}"
+
+class DeadlineSweep(models.Model):
+    """
+    Metrics of one run of `python manage.py close_expired_tenders`.
+    """
+    started_at = models.DateTimeField(default=timezone.now)
+    duration = models.FloatField(help_text="Duration in seconds", default=0)
+    batches = models.IntegerField(default=0)
+    tenders_closed = models.IntegerField(default=0)
+    longest_batch = models.FloatField(help_text="Duration of the slowest batch in seconds", default=0)
+    
+    class Meta:
+        verbose_name = "Deadline sweep"
+        verbose_name_plural = "Deadline sweeps"
+        ordering = ['-started_at']
     
     def __str__(self):
-        return f"Project: {self.tender.title}"
\ No newline at end of file
+        return f"Sweep at {self.started_at:%Y-%m-%d %H:%M}: {self.tenders_closed} tenders closed"
@@ -1,5 +1,34 @@
+from django.db.models import Q
 from rest_framework import permissions
 
+# Foreign keys that identify the participants of a project. Views can override
+# this with a `participant_fields` attribute, e.g. ('project__client', 'project__vendor').
+DEFAULT_PARTICIPANT_FIELDS = ('client', 'vendor')
+
+def participant_filter(user, fields=DEFAULT_PARTICIPANT_FIELDS):
+    """
+    Returns a Q object matching the rows where the user is one of the participants.
+    Only the foreign key columns are compared, so no user rows are joined.
+    """
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}_id': user.id})
+    return condition
+
+def participant_ids(obj, fields=DEFAULT_PARTICIPANT_FIELDS):
+    """
+    Returns the user ids of the participants of an object, read from the foreign
+    key attributes so no related user rows are loaded.
+    """
+    ids = []
+    for field in fields:
+        *path, name = field.split('__')
+        target = obj
+        for attr in path:
+            target = getattr(target, attr)
+        ids.append(getattr(target, f'{name}_id'))
+    return ids
+
 class IsClientOrReadOnly(permissions.BasePermission):
     """
     Custom permission to only allow clients to create tenders.
@@ -18,7 +47,7 @@ class IsClientOrReadOnly(permissions.BasePermission):
             return True
         
         # Write permissions are only allowed to the client who owns the tender
-        return obj.client == request.user
+        return obj.client_id == request.user.id
 
 class IsVendorOrReadOnly(permissions.BasePermission):
     """
@@ -42,12 +71,23 @@ class IsVendorOrReadOnly(permissions.BasePermission):
             return True
         
         # Write permissions are only allowed to the vendor who placed the bid
-        return obj.vendor == request.user
+        return obj.vendor_id == request.user.id
 
 class IsProjectParticipant(permissions.BasePermission):
     """
     Custom permission to only allow project participants to view and edit.
+    
+    The participants are read from the view's `participant_fields`, and
+    `scope_queryset` applies the same rule to a queryset in SQL.
     """
+    @staticmethod
+    def get_participant_fields(view):
+        return getattr(view, 'participant_fields', DEFAULT_PARTICIPANT_FIELDS)
+    
+    @classmethod
+    def scope_queryset(cls, request, queryset, view):
+        return queryset.filter(participant_filter(request.user, cls.get_participant_fields(view)))
+    
     def has_object_permission(self, request, view, obj):
         # Permission is only allowed to client or vendor of the project
-        return obj.client == request.user or obj.vendor == request.user
\ No newline at end of file
+        return request.user.id in participant_ids(obj, self.get_participant_fields(view))
\ No newline at end of file
@@ -1,7 +1,11 @@
+from functools import cache
+
 from rest_framework import serializers
 
 from project_activity.models import ProjectActivity
-from .models import Bid, Project, Tag, Tender, Comment, Category
+from tenderhubapi.compiled_serializers import CompiledListSerializer, compile_serializer
+from tenderhubapi.reference_data import CachedPrimaryKeyRelatedField, categories
+from .models import Bid, ClientStats, MarketStats, Project, Tag, Tender, Comment, Category, VendorStats
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,6 +17,31 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name', 'description']
 
+class VendorStatsSerializer(serializers.ModelSerializer):
+    win_rate = serializers.ReadOnlyField()
+    on_time_rate = serializers.ReadOnlyField()
+    on_time_completion_rate = serializers.ReadOnlyField()
+    revision_rate = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = VendorStats
+        fields = ['bids_total', 'bids_won', 'win_rate', 'deliveries', 'on_time_deliveries', 'on_time_rate',
+                  'revision_requests', 'revision_rate', 'completions', 'on_time_completions',
+                  'on_time_completion_rate', 'projects_completed']
+
+@cache
+def vendor_stats_serializer():
+    # Compiled once, as it has no context; it runs for every serialized bid
+    return compile_serializer(VendorStatsSerializer())
+
+def get_vendor_stats(user):
+    """
+    Serializes the vendor's stats row, or returns None if it doesn't exist yet.
+    Querysets should `select_related('...vendor_stats')` to avoid a query per vendor.
+    """
+    stats = getattr(user, 'vendor_stats', None)
+    return vendor_stats_serializer()(stats) if stats is not None else None
+
 class BidSerializer(serializers.ModelSerializer):
     vendor_name = serializers.ReadOnlyField(source='vendor.username')
     vendor_profile = serializers.SerializerMethodField()
@@ -22,12 +51,14 @@ class BidSerializer(serializers.ModelSerializer):
         fields = ['bid_id', 'tender', 'vendor', 'vendor_name', 'vendor_profile', 
                   'amount', 'proposal', 'delivery_time', 'created_at', 'status']
         read_only_fields = ['tender', 'vendor', 'status']
+        list_serializer_class = CompiledListSerializer
     
     def get_vendor_profile(self, obj):
         return {
             'id': obj.vendor.id,
             'username': obj.vendor.username,
             'profile_picture': obj.vendor.profile_picture.url if obj.vendor.profile_picture else None,
+            'stats': get_vendor_stats(obj.vendor),
         }
     
 class CommentSerializer(serializers.ModelSerializer):
@@ -39,6 +70,7 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['comment_id', 'tender', 'user', 'user_name', 'user_picture', 'user_type', 'content', 'created_at']
         read_only_fields = ['tender', 'user']
+        list_serializer_class = CompiledListSerializer
     
     def get_user_picture(self, obj):
         return obj.user.profile_picture.url if obj.user.profile_picture else None
@@ -64,8 +96,8 @@ class TenderSerializer(serializers.ModelSerializer):
     tags_data = TagSerializer(many=True, read_only=True, source='tags')
     bid_count = serializers.ReadOnlyField()
     category = CategorySerializer(read_only=True)
-    category_id = serializers.PrimaryKeyRelatedField(
-        queryset=Category.objects.all(), source='category', write_only=True
+    category_id = CachedPrimaryKeyRelatedField(
+        reference_table=categories, queryset=Category.objects.all(), source='category', write_only=True
     )
     tender_category_id = serializers.IntegerField(source='category.id', read_only=True)
 
@@ -78,6 +110,7 @@ class TenderSerializer(serializers.ModelSerializer):
             'category', 'category_id', 'tender_category_id'
         ]
         read_only_fields = ['client', 'created_at', 'status']
+        list_serializer_class = CompiledListSerializer
 
     def get_client_picture(self, obj):
         return obj.client.profile_picture.url if obj.client.profile_picture else None
@@ -149,13 +182,19 @@ class ProjectSerializer(serializers.ModelSerializer):
     vendor_name = serializers.ReadOnlyField(source='vendor.username')
     client_profile = serializers.SerializerMethodField()
     vendor_profile = serializers.SerializerMethodField()
+    # Annotated by tender.sla.annotate_sla
+    days_running = serializers.IntegerField(read_only=True)
+    days_remaining = serializers.IntegerField(read_only=True)
+    progress = serializers.IntegerField(read_only=True, allow_null=True)
+    is_overdue = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = Project
         fields = [
             'project_id', 'tender', 'tender_title', 'client', 'client_name',
             'client_profile', 'vendor', 'vendor_name', 'vendor_profile',
-            'agreed_amount', 'start_date', 'deadline', 'status'
+            'agreed_amount', 'start_date', 'deadline', 'status',
+            'days_running', 'days_remaining', 'progress', 'is_overdue'
         ]
         read_only_fields = ['tender', 'client', 'vendor', 'agreed_amount', 'start_date']
     
@@ -187,4 +226,48 @@ class ProjectActivitySerializer(serializers.ModelSerializer):
         read_only_fields = ['project', 'user', 'created_at']
     
     def get_user_picture(self, obj):
-        return obj.user.profile_picture.url if obj.user.profile_picture else None
\ No newline at end of file
+        return obj.user.profile_picture.url if obj.user.profile_picture else None
+
+class ClientStatsSerializer(serializers.ModelSerializer):
+    tenders = serializers.SerializerMethodField()
+    average_bid = serializers.SerializerMethodField()
+    average_bid_to_budget = serializers.SerializerMethodField()
+    overdue_projects = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ClientStats
+        fields = ['client', 'tenders', 'bids_received', 'average_bid', 'average_bid_to_budget',
+                  'active_projects', 'overdue_projects', 'spend_to_date', 'updated_at']
+    
+    def get_tenders(self, obj):
+        tenders = {
+            'open': obj.tenders_open,
+            'in_progress': obj.tenders_in_progress,
+            'completed': obj.tenders_completed,
+            'cancelled': obj.tenders_cancelled,
+            'closed': obj.tenders_closed,
+        }
+        tenders['total'] = sum(tenders.values())
+        return tenders
+    
+    def get_average_bid(self, obj):
+        if not obj.bids_received:
+            return None
+        return str(round(obj.bid_amount_total / obj.bids_received, 2))
+    
+    def get_average_bid_to_budget(self, obj):
+        # Average bid as a fraction of the tenders' max budget
+        if not obj.bid_budget_total:
+            return None
+        return round(float(obj.bid_amount_total / obj.bid_budget_total), 4)
+    
+    def get_overdue_projects(self, obj):
+        return self.context.get('overdue_projects', 0)
+
+class MarketStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MarketStats
+        fields = ['category', 'tag', 'tender_count', 'bid_count', 'winning_bid_count',
+                  'min_budget_percentiles', 'max_budget_percentiles', 'bid_amount_percentiles',
+                  'winning_bid_percentiles', 'median_delivery_time', 'max_budget_histogram',
+                  'bid_amount_histogram', 'computed_at']
@@ -0,0 +1,217 @@
+from decimal import Decimal
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from project_activity.models import ProjectActivity
+from tenderhubapi.reference_data import categories, tags
+from .models import Bid, Category, Project, Tag, Tender
+from .stats import (
+    ACTIVE_PROJECT_STATUSES, TENDER_STATUS_FIELDS, VENDOR_ACTIVITY_TYPES, bump_client_stats, bump_vendor_stats,
+    rebuild_client_stats, rebuild_vendor_stats
+)
+
+# The handlers below keep ClientStats and VendorStats in step with single-object
+# saves and deletes. Queryset .update() and bulk_create() send no signals, so code
+# using them calls rebuild_client_stats()/rebuild_vendor_stats() instead.
+
+def as_decimal(value):
+    # Views may assign request data (strings) to decimal fields before saving
+    return Decimal(str(value)) if value is not None else Decimal('0')
+
+def tender_deltas(status, sign):
+    field = TENDER_STATUS_FIELDS.get(status)
+    return {field: sign} if field else {}
+
+def project_deltas(status, agreed_amount, sign):
+    deltas = {}
+    if status in ACTIVE_PROJECT_STATUSES:
+        deltas['active_projects'] = sign
+    if status == 'completed':
+        deltas['spend_to_date'] = sign * as_decimal(agreed_amount)
+    return deltas
+
+def merge_deltas(*all_deltas):
+    merged = {}
+    for deltas in all_deltas:
+        for field, delta in deltas.items():
+            merged[field] = merged.get(field, 0) + delta
+    return merged
+
+@receiver(post_save, sender=Tender)
+def update_stats_on_tender_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump_client_stats(instance.client_id, **tender_deltas(instance.status, 1))
+    elif instance.has_loaded_values() and instance.get_loaded_value('client_id') == instance.client_id:
+        deltas = merge_deltas(
+            tender_deltas(instance.get_loaded_value('status'), -1),
+            tender_deltas(instance.status, 1),
+        )
+        budget_change = as_decimal(instance.max_budget) - as_decimal(instance.get_loaded_value('max_budget'))
+        if budget_change:
+            # Every bid of the tender counts its budget once
+            deltas['bid_budget_total'] = budget_change * instance.bids.count()
+        bump_client_stats(instance.client_id, **deltas)
+    elif instance.has_loaded_values():
+        # Moved to another client, with its bids
+        rebuild_client_stats([instance.get_loaded_value('client_id'), instance.client_id])
+    else:
+        rebuild_client_stats([instance.client_id])
+    instance.remember_loaded_values()
+
+@receiver(post_delete, sender=Tender)
+def update_stats_on_tender_delete(sender, instance, **kwargs):
+    bump_client_stats(instance.client_id, rebuild_missing=False, **tender_deltas(instance.status, -1))
+
+def get_tender_budget(bid, cached=True):
+    if cached and Bid.tender.is_cached(bid):
+        return bid.tender.client_id, bid.tender.max_budget
+    return Tender.objects.filter(pk=bid.tender_id).values_list('client_id', 'max_budget').first()
+
+@receiver(post_save, sender=Bid)
+def update_stats_on_bid_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    client_id, max_budget = get_tender_budget(instance)
+    won = int(instance.status == 'accepted')
+    if created:
+        bump_client_stats(
+            client_id,
+            bids_received=1,
+            bid_amount_total=as_decimal(instance.amount),
+            bid_budget_total=as_decimal(max_budget),
+        )
+        bump_vendor_stats(instance.vendor_id, bids_total=1, bids_won=won)
+    elif instance.has_loaded_values():
+        bump_client_stats(
+            client_id,
+            bid_amount_total=as_decimal(instance.amount) - as_decimal(instance.get_loaded_value('amount')),
+        )
+        bump_vendor_stats(
+            instance.vendor_id, bids_won=won - int(instance.get_loaded_value('status') == 'accepted')
+        )
+    else:
+        rebuild_client_stats([client_id])
+        rebuild_vendor_stats([instance.vendor_id])
+    instance.remember_loaded_values()
+
+@receiver(post_delete, sender=Bid)
+def update_stats_on_bid_delete(sender, instance, **kwargs):
+    # The budget the bid is counted with now, which a tender cached by the bid may predate
+    tender = get_tender_budget(instance, cached=False)
+    if tender is None:
+        return
+    client_id, max_budget = tender
+    bump_client_stats(
+        client_id,
+        rebuild_missing=False,
+        bids_received=-1,
+        bid_amount_total=-as_decimal(instance.amount),
+        bid_budget_total=-as_decimal(max_budget),
+    )
+    bump_vendor_stats(
+        instance.vendor_id,
+        rebuild_missing=False,
+        bids_total=-1,
+        bids_won=-int(instance.status == 'accepted'),
+    )
+
+@receiver(post_save, sender=Project)
+def update_stats_on_project_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    completed = int(instance.status == 'completed')
+    if created:
+        bump_client_stats(instance.client_id, **project_deltas(instance.status, instance.agreed_amount, 1))
+        bump_vendor_stats(instance.vendor_id, projects_completed=completed)
+    elif instance.has_loaded_values():
+        bump_client_stats(instance.client_id, **merge_deltas(
+            project_deltas(instance.get_loaded_value('status'), instance.get_loaded_value('agreed_amount'), -1),
+            project_deltas(instance.status, instance.agreed_amount, 1),
+        ))
+        bump_vendor_stats(
+            instance.vendor_id,
+            projects_completed=completed - int(instance.get_loaded_value('status') == 'completed'),
+        )
+    else:
+        rebuild_client_stats([instance.client_id])
+        rebuild_vendor_stats([instance.vendor_id])
+    instance.remember_loaded_values()
+
+@receiver(post_delete, sender=Project)
+def update_stats_on_project_delete(sender, instance, **kwargs):
+    bump_client_stats(
+        instance.client_id,
+        rebuild_missing=False,
+        **project_deltas(instance.status, instance.agreed_amount, -1)
+    )
+    bump_vendor_stats(
+        instance.vendor_id, rebuild_missing=False, projects_completed=-int(instance.status == 'completed')
+    )
+
+def activity_deltas(activity, sign, project_id=None, activity_type=None):
+    """
+    Returns the vendor id and the VendorStats deltas of a project activity, or
+    of the activity with another project and type, such as those it was loaded with.
+    """
+    project_id = activity.project_id if project_id is None else project_id
+    activity_type = activity.activity_type if activity_type is None else activity_type
+    if activity_type not in VENDOR_ACTIVITY_TYPES:
+        return None, {}
+    if ProjectActivity.project.is_cached(activity) and activity.project.pk == project_id:
+        vendor_id, deadline = activity.project.vendor_id, activity.project.deadline
+    else:
+        project = Project.objects.filter(pk=project_id).values_list('vendor_id', 'deadline').first()
+        if project is None:
+            return None, {}
+        vendor_id, deadline = project
+    
+    if activity_type == 'revision_request':
+        return vendor_id, {'revision_requests': sign}
+    on_time = int(timezone.localdate(activity.created_at) <= Project._meta.get_field('deadline').to_python(deadline))
+    if activity_type == 'delivery':
+        return vendor_id, {'deliveries': sign, 'on_time_deliveries': sign * on_time}
+    return vendor_id, {'completions': sign, 'on_time_completions': sign * on_time}
+
+@receiver(post_save, sender=ProjectActivity)
+def update_stats_on_activity_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        vendor_id, deltas = activity_deltas(instance, 1)
+        if vendor_id is not None:
+            bump_vendor_stats(vendor_id, **deltas)
+    elif instance.has_loaded_values():
+        # Staff can change the type or project of an activity in the admin
+        loaded = {name: instance.get_loaded_value(name) for name in ProjectActivity.tracked_fields}
+        if loaded != {name: getattr(instance, name) for name in ProjectActivity.tracked_fields}:
+            old_vendor_id, old_deltas = activity_deltas(instance, -1, **loaded)
+            vendor_id, deltas = activity_deltas(instance, 1)
+            if old_vendor_id == vendor_id:
+                bump_vendor_stats(vendor_id, **merge_deltas(old_deltas, deltas))
+            else:
+                for changed_vendor_id, changes in ((old_vendor_id, old_deltas), (vendor_id, deltas)):
+                    if changed_vendor_id is not None:
+                        bump_vendor_stats(changed_vendor_id, **changes)
+    else:
+        rebuild_vendor_stats(Project.objects.filter(pk=instance.project_id).values_list('vendor_id', flat=True))
+    instance.remember_loaded_values()
+
+@receiver(post_delete, sender=ProjectActivity)
+def update_stats_on_activity_delete(sender, instance, **kwargs):
+    vendor_id, deltas = activity_deltas(instance, -1)
+    if vendor_id is not None:
+        bump_vendor_stats(vendor_id, rebuild_missing=False, **deltas)
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    categories.invalidate()
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    tags.invalidate()
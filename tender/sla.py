@@ -0,0 +1,100 @@
+"""
+Schedule tracking of projects.
+
+The progress and overdue state of a project depend on the current date, so they
+are computed in SQL with `annotate_sla()` instead of per row in Python, and can
+be filtered and ordered on like any other column.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Case, DateField, Exists, ExpressionWrapper, F, Func, IntegerField, OuterRef, Q, Value, When
+)
+from django.db.models.functions import Cast, Greatest, Least
+from django.utils import timezone
+
+from outbox.events import make_event, publish_many
+from project_activity.models import ProjectActivity
+
+from .models import Project
+from .stats import ACTIVE_PROJECT_STATUSES
+
+class DaysBetween(Func):
+    """Number of days from `start` to `end`. Subtracting two dates gives an integer in PostgreSQL."""
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+    output_field = IntegerField()
+
+    def __init__(self, end, start):
+        super().__init__(end, start)
+
+def overdue_condition(today):
+    return Q(status__in=ACTIVE_PROJECT_STATUSES, deadline__lt=today)
+
+def due_within_condition(today, days):
+    return Q(status__in=ACTIVE_PROJECT_STATUSES, deadline__gte=today, deadline__lte=today + timedelta(days=days))
+
+def annotate_sla(queryset, today=None):
+    """
+    Annotates projects with:
+
+    - `days_running`: days since the start date
+    - `days_remaining`: days until the deadline, negative once it has passed
+    - `progress`: elapsed share of the schedule in percent, 100 once completed,
+      capped at 99 before that and null when the deadline isn't after the start
+    - `is_overdue`: the project is still active and its deadline has passed
+    """
+    today = Value(today or timezone.localdate(), output_field=DateField())
+    days_passed = DaysBetween(today, F('start_date'))
+    total_days = DaysBetween(F('deadline'), F('start_date'))
+    return queryset.annotate(
+        days_running=days_passed,
+        days_remaining=DaysBetween(F('deadline'), today),
+        progress=Case(
+            When(status='completed', then=Value(100)),
+            When(deadline__lte=F('start_date'), then=Value(None)),
+            default=Least(Greatest(Cast(days_passed * Value(100.0) / total_days, IntegerField()), Value(0)), Value(99)),
+            output_field=IntegerField(),
+        ),
+        is_overdue=ExpressionWrapper(overdue_condition(today), output_field=BooleanField()),
+    )
+
+def record_overdue_projects(batch_size=500, today=None):
+    """
+    Records an 'overdue' activity on every active project whose deadline has
+    passed, once per project, and returns the number of projects flagged.
+    """
+    today = today or timezone.localdate()
+    already_recorded = ProjectActivity.objects.filter(project=OuterRef('pk'), activity_type='overdue')
+    flagged = 0
+
+    while True:
+        overdue = list(
+            Project.objects.filter(overdue_condition(today))
+            .exclude(Exists(already_recorded))
+            .order_by('deadline', 'project_id')
+            .values_list('project_id', 'client_id', 'vendor_id', 'deadline')[:batch_size]
+        )
+        if not overdue:
+            break
+
+        with transaction.atomic():
+            # The partial unique constraint turns a concurrent sweep's duplicates into no-ops
+            ProjectActivity.objects.bulk_create([
+                ProjectActivity(
+                    project_id=project_id,
+                    user_id=vendor_id,
+                    activity_type='overdue',
+                    description=f"Deadline of {deadline} has passed",
+                )
+                for project_id, _, vendor_id, deadline in overdue
+            ], ignore_conflicts=True)
+            publish_many([
+                make_event('project.overdue', Project, project_id, client_id=client_id, vendor_id=vendor_id, deadline=deadline)
+                for project_id, client_id, vendor_id, deadline in overdue
+            ])
+        flagged += len(overdue)
+        if len(overdue) < batch_size:
+            break
+    return flagged
@@ -0,0 +1,171 @@
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from project_activity.models import ProjectActivity
+from tenderhubapi.db_router import read_from_primary
+from users.models import User
+from .models import Bid, ClientStats, Project, Tender, VendorStats
+
+TENDER_STATUS_FIELDS = {
+    'open': 'tenders_open',
+    'in_progress': 'tenders_in_progress',
+    'completed': 'tenders_completed',
+    'cancelled': 'tenders_cancelled',
+    'closed': 'tenders_closed',
+}
+ACTIVE_PROJECT_STATUSES = ('in_progress', 'revision_requested')
+# The project activities counted in VendorStats
+VENDOR_ACTIVITY_TYPES = ('delivery', 'revision_request', 'project_completion')
+
+def bump_stats(model, owner_id, rebuild, rebuild_missing=True, **deltas):
+    """
+    Adds the deltas to the owner's stats row in a single UPDATE. An owner without
+    a row yet gets it rebuilt from the source tables, which includes this change.
+    
+    Deletions pass `rebuild_missing=False`: the row may already be gone because
+    the owner itself is being deleted.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = model.objects.filter(pk=owner_id).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated and rebuild_missing:
+        rebuild([owner_id])
+
+def bump_client_stats(client_id, rebuild_missing=True, **deltas):
+    bump_stats(ClientStats, client_id, rebuild_client_stats, rebuild_missing, **deltas)
+
+def bump_vendor_stats(vendor_id, rebuild_missing=True, **deltas):
+    bump_stats(VendorStats, vendor_id, rebuild_vendor_stats, rebuild_missing, **deltas)
+
+def rebuild_in_batches(owner_ids, rebuild_batch, batch_size):
+    written = 0
+    batch = []
+    # The rows are written to the primary, so they must be computed from it
+    with read_from_primary():
+        for owner_id in owner_ids:
+            batch.append(owner_id)
+            if len(batch) >= batch_size:
+                written += rebuild_batch(batch)
+                batch = []
+        if batch:
+            written += rebuild_batch(batch)
+    return written
+
+def save_rows(model, rows):
+    now = timezone.now()
+    for row in rows:
+        row.updated_at = now
+    update_fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+    model.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=[model._meta.pk.name], update_fields=update_fields
+    )
+    return len(rows)
+
+def rebuild_client_stats(client_ids=None, batch_size=1000):
+    """
+    Recomputes the stats of the given clients, or of every client, from the
+    tender, bid and project tables. Returns the number of rows written.
+    """
+    if client_ids is None:
+        client_ids = (
+            User.objects.filter(Q(is_client=True) | Q(tenders__isnull=False))
+            .distinct().order_by('pk').values_list('pk', flat=True)
+            .iterator(chunk_size=batch_size)
+        )
+    return rebuild_in_batches(client_ids, _rebuild_client_batch, batch_size)
+
+def rebuild_vendor_stats(vendor_ids=None, batch_size=1000):
+    """
+    Recomputes the stats of the given vendors, or of every vendor, from the
+    bid, project and project activity tables. Returns the number of rows written.
+    """
+    if vendor_ids is None:
+        vendor_ids = (
+            User.objects.filter(Q(is_vendor=True) | Q(bids__isnull=False))
+            .distinct().order_by('pk').values_list('pk', flat=True)
+            .iterator(chunk_size=batch_size)
+        )
+    return rebuild_in_batches(vendor_ids, _rebuild_vendor_batch, batch_size)
+
+def _rebuild_client_batch(client_ids):
+    rows = {client_id: ClientStats(client_id=client_id) for client_id in set(client_ids)}
+    
+    for client_id, status, count in (
+        Tender.objects.filter(client_id__in=rows).order_by()
+        .values_list('client_id', 'status').annotate(count=Count('pk'))
+    ):
+        if status in TENDER_STATUS_FIELDS:
+            setattr(rows[client_id], TENDER_STATUS_FIELDS[status], count)
+    
+    for client_id, count, amount, budget in (
+        Bid.objects.filter(tender__client_id__in=rows).order_by()
+        .values_list('tender__client_id')
+        .annotate(count=Count('pk'), amount=Sum('amount'), budget=Sum('tender__max_budget'))
+    ):
+        rows[client_id].bids_received = count
+        rows[client_id].bid_amount_total = amount
+        rows[client_id].bid_budget_total = budget
+    
+    for client_id, active, spend in (
+        Project.objects.filter(client_id__in=rows).order_by()
+        .values_list('client_id')
+        .annotate(
+            active=Count('pk', filter=Q(status__in=ACTIVE_PROJECT_STATUSES)),
+            spend=Sum('agreed_amount', filter=Q(status='completed')),
+        )
+    ):
+        rows[client_id].active_projects = active
+        rows[client_id].spend_to_date = spend or Decimal('0')
+    
+    return save_rows(ClientStats, list(rows.values()))
+
+def _rebuild_vendor_batch(vendor_ids):
+    rows = {vendor_id: VendorStats(vendor_id=vendor_id) for vendor_id in set(vendor_ids)}
+    
+    for vendor_id, total, won in (
+        Bid.objects.filter(vendor_id__in=rows).order_by()
+        .values_list('vendor_id')
+        .annotate(total=Count('pk'), won=Count('pk', filter=Q(status='accepted')))
+    ):
+        rows[vendor_id].bids_total = total
+        rows[vendor_id].bids_won = won
+    
+    for vendor_id, completed in (
+        Project.objects.filter(vendor_id__in=rows).order_by()
+        .values_list('vendor_id')
+        .annotate(completed=Count('pk', filter=Q(status='completed')))
+    ):
+        rows[vendor_id].projects_completed = completed
+    
+    on_time = Q(created_at__date__lte=F('project__deadline'))
+    for vendor_id, deliveries, on_time_deliveries, revisions, completions, on_time_completions in (
+        ProjectActivity.objects.filter(
+            project__vendor_id__in=rows, activity_type__in=VENDOR_ACTIVITY_TYPES
+        ).order_by()
+        .values_list('project__vendor_id')
+        .annotate(
+            deliveries=Count('pk', filter=Q(activity_type='delivery')),
+            on_time_deliveries=Count('pk', filter=Q(activity_type='delivery') & on_time),
+            revisions=Count('pk', filter=Q(activity_type='revision_request')),
+            completions=Count('pk', filter=Q(activity_type='project_completion')),
+            on_time_completions=Count('pk', filter=Q(activity_type='project_completion') & on_time),
+        )
+    ):
+        rows[vendor_id].deliveries = deliveries
+        rows[vendor_id].on_time_deliveries = on_time_deliveries
+        rows[vendor_id].revision_requests = revisions
+        rows[vendor_id].completions = completions
+        rows[vendor_id].on_time_completions = on_time_completions
+    
+    return save_rows(VendorStats, list(rows.values()))
+
+def count_overdue_projects(client_id):
+    return Project.objects.filter(
+        client_id=client_id, status__in=ACTIVE_PROJECT_STATUSES, deadline__lt=timezone.localdate()
+    ).count()
@@ -0,0 +1,7 @@
+from jobs.registry import task
+
+from .market import TOP_TAGS, compute_market_stats as compute
+
+@task(priority=-1)
+def compute_market_stats(top_tags=TOP_TAGS):
+    compute(top_tags=top_tags)
@@ -1,9 +1,51 @@
+import gzip
+import importlib.util
+import json
+import re
+import uuid
+import numpy as np
 import pytest
+import runpy
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.forms.models import model_to_dict
+from django.http import HttpResponse, StreamingHttpResponse
+from django.middleware.cache import FetchFromCacheMiddleware, UpdateCacheMiddleware
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework import status
-from rest_framework.test import APIClient
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers, status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 from faker import Faker
-from .models import Tender, Tag, Bid, Category
+from .admin import ACTIVITY_HISTORY_LIMIT
+from . import market as market_module
+from .market import PERCENTILES, grouped_percentiles
+from .models import (
+    Tender, Tag, Bid, Category, ClientStats, Comment, DeadlineSweep, MarketStats, Project, VendorStats
+)
+from .serializers import BidSerializer, CommentSerializer, TenderDetailSerializer, TenderSerializer
+from .views import tender_queryset
+from .stats import rebuild_client_stats, rebuild_vendor_stats
+from project_activity.models import ProjectActivity
+from asgiref.sync import async_to_sync
+from tenderhubapi import compression
+from tenderhubapi import settings as settings_module
+from tenderhubapi.compiled_serializers import CompiledListSerializer
+from tenderhubapi.db_router import PIN_COOKIE, replica_health
+from tenderhubapi.reference_data import categories, check_shared_cache
+from tenderhubapi.renderers import MessagePackParser, MessagePackRenderer, ORJSONParser, ORJSONRenderer
 from users.models import User
 
 fake = Faker()
@@ -251,3 +293,1334 @@ class TestCategoryEndpoints:
         }
         response = api_client.post(reverse('category-list'), data)
         assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def make_tenders(client_user, count):
+    return Tender.objects.bulk_create([
+        Tender(
+            client=client_user,
+            title=fake.sentence(),
+            description=fake.text(),
+            max_duration=30,
+            min_budget=1000,
+            max_budget=5000,
+            deadline=fake.future_date()
+        )
+        for _ in range(count)
+    ])
+
+def make_vendors(count):
+    return User.objects.bulk_create([
+        User(username=f'{fake.unique.user_name()}_vendor', is_vendor=True) for _ in range(count)
+    ])
+
+def count_changelist_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+@pytest.mark.django_db
+class TestAdminChangelistQueries:
+    """
+    The number of queries of a changelist page must not grow with the number of rows.
+    """
+    def populate(self, client_user, count):
+        tenders = make_tenders(client_user, count)
+        vendors = make_vendors(count)
+        Bid.objects.bulk_create([
+            Bid(tender=tender, vendor=vendor, amount=2000, proposal=fake.text(), delivery_time=20)
+            for tender, vendor in zip(tenders, vendors)
+        ])
+        Comment.objects.bulk_create([
+            Comment(tender=tender, user=vendor, content=fake.text())
+            for tender, vendor in zip(tenders, vendors)
+        ])
+        Project.objects.bulk_create([
+            Project(tender=tender, client=client_user, vendor=vendor, agreed_amount=2000, deadline=tender.deadline)
+            for tender, vendor in zip(tenders, vendors)
+        ])
+    
+    @pytest.mark.parametrize('url_name', [
+        'admin:tender_tender_changelist',
+        'admin:tender_bid_changelist',
+        'admin:tender_comment_changelist',
+        'admin:tender_project_changelist',
+    ])
+    def test_changelist_query_count_is_constant(self, admin_client, client_user, url_name, monkeypatch):
+        monkeypatch.setattr(admin.site._registry[Tender], 'list_per_page', 100)
+        url = reverse(url_name)
+        
+        self.populate(client_user, 1)
+        single_row_queries = count_changelist_queries(admin_client, url)
+        
+        self.populate(client_user, 99)
+        full_page_queries = count_changelist_queries(admin_client, url)
+        
+        assert full_page_queries == single_row_queries
+    
+    def test_activity_history_is_capped(self, client_user, vendor_user, tender):
+        project = Project.objects.create(
+            tender=tender, client=client_user, vendor=vendor_user, agreed_amount=2000, deadline=tender.deadline
+        )
+        ProjectActivity.objects.bulk_create([
+            ProjectActivity(project=project, user=vendor_user, activity_type='comment', description=fake.text())
+            for _ in range(ACTIVITY_HISTORY_LIMIT + 5)
+        ])
+        
+        html = admin.site._registry[Project].get_activity_history(project)
+        assert html.count('<li') == ACTIVITY_HISTORY_LIMIT
+        assert f'project__project_id__exact={project.project_id}' in html
+
+@pytest.mark.django_db
+class TestAdminBulkActions:
+    def accept_bids(self, admin_client, bids):
+        return admin_client.post(reverse('admin:tender_bid_changelist'), {
+            'action': 'mark_bids_accepted',
+            '_selected_action': [bid.bid_id for bid in bids],
+        }, follow=True)
+    
+    def test_accept_bids_creates_projects(self, admin_client, client_user):
+        tenders = make_tenders(client_user, 3)
+        vendors = make_vendors(3)
+        bids = Bid.objects.bulk_create([
+            Bid(tender=tender, vendor=vendor, amount=2000 + i, proposal=fake.text(), delivery_time=20)
+            for i, (tender, vendor) in enumerate(zip(tenders, vendors))
+        ])
+        
+        response = self.accept_bids(admin_client, bids)
+        assert response.status_code == 200
+        assert Bid.objects.filter(status='accepted').count() == 3
+        assert Tender.objects.filter(status='in_progress').count() == 3
+        for bid in bids:
+            project = Project.objects.get(tender_id=bid.tender_id)
+            assert project.vendor_id == bid.vendor_id
+            assert project.client_id == client_user.id
+            assert project.agreed_amount == bid.amount
+    
+    def test_accept_bids_reports_conflicts(self, admin_client, client_user):
+        open_tender, closed_tender = make_tenders(client_user, 2)
+        closed_tender.status = 'completed'
+        closed_tender.save()
+        vendors = make_vendors(3)
+        cheapest, second, on_closed = Bid.objects.bulk_create([
+            Bid(tender=open_tender, vendor=vendors[0], amount=1000, proposal=fake.text(), delivery_time=20),
+            Bid(tender=open_tender, vendor=vendors[1], amount=1500, proposal=fake.text(), delivery_time=20),
+            Bid(tender=closed_tender, vendor=vendors[2], amount=1000, proposal=fake.text(), delivery_time=20),
+        ])
+        
+        response = self.accept_bids(admin_client, [cheapest, second, on_closed])
+        messages = [str(message) for message in response.context['messages']]
+        assert any('Skipped 2 bids' in message for message in messages)
+        assert list(Bid.objects.filter(status='accepted').values_list('bid_id', flat=True)) == [cheapest.bid_id]
+        assert Project.objects.count() == 1
+        assert not Project.objects.filter(tender=closed_tender).exists()
+    
+    def test_accept_bids_query_count_is_constant(self, admin_client, client_user):
+        def run(count):
+            tenders = make_tenders(client_user, count)
+            bids = Bid.objects.bulk_create([
+                Bid(tender=tender, vendor=vendor, amount=2000, proposal=fake.text(), delivery_time=20)
+                for tender, vendor in zip(tenders, make_vendors(count))
+            ])
+            with CaptureQueriesContext(connection) as context:
+                admin_client.post(reverse('admin:tender_bid_changelist'), {
+                    'action': 'mark_bids_accepted',
+                    '_selected_action': [bid.bid_id for bid in bids],
+                })
+            return len(context.captured_queries)
+        
+        assert run(1) == run(50)
+
+@pytest.mark.django_db
+class TestAdminAutocomplete:
+    def test_foreign_keys_use_autocomplete_widgets(self, admin_client, tender):
+        response = admin_client.get(reverse('admin:tender_tender_change', args=[tender.tender_id]))
+        assert response.status_code == 200
+        form = response.context['adminform'].form
+        assert type(form.fields['client'].widget.widget).__name__ == 'AutocompleteSelect'
+        assert type(form.fields['category'].widget.widget).__name__ == 'AutocompleteSelect'
+    
+    def test_user_autocomplete_matches_username_prefix(self, admin_client, client_user):
+        matching = User.objects.create_user(username='zz_prefix_user', password=fake.password())
+        User.objects.create_user(username='other_zz_prefix', password=fake.password(), bio='zz_prefix')
+        response = admin_client.get(reverse('admin:autocomplete'), {
+            'term': 'ZZ_PREF',
+            'app_label': 'tender',
+            'model_name': 'tender',
+            'field_name': 'client',
+        })
+        assert response.status_code == 200
+        assert [result['id'] for result in response.json()['results']] == [str(matching.id)]
+    
+    def test_prefix_indexes_match_the_search_expression(self):
+        # Whether the planner picks an index depends on the table's statistics, so the
+        # test checks that the index and the search use the same expression instead
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE indexname IN (%s, %s)",
+                ['users_username_prefix_idx', 'tender_title_prefix_idx'],
+            )
+            indexes = dict(cursor.fetchall())
+        assert 'upper((username)::text) text_pattern_ops' in indexes['users_username_prefix_idx']
+        assert 'upper((title)::text) text_pattern_ops' in indexes['tender_title_prefix_idx']
+    
+    def test_autocomplete_searches_with_an_anchored_pattern(self, admin_client):
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.get(reverse('admin:autocomplete'), {
+                'term': 'abc', 'app_label': 'tender', 'model_name': 'tender', 'field_name': 'client',
+            })
+        assert response.status_code == 200
+        assert any(
+            re.search(r'UPPER\([\w"]+\."username"::text\) LIKE UPPER\(\'abc%\'\)', query['sql'])
+            for query in queries.captured_queries
+        )
+
+@pytest.mark.django_db
+class TestPaginatedInlines:
+    def make_bids(self, tender, count):
+        return Bid.objects.bulk_create([
+            Bid(tender=tender, vendor=vendor, amount=1000 + i, proposal=fake.text(), delivery_time=20)
+            for i, vendor in enumerate(make_vendors(count))
+        ])
+    
+    def get_bid_formset(self, response):
+        for inline_admin_formset in response.context['inline_admin_formsets']:
+            if inline_admin_formset.formset.model is Bid:
+                return inline_admin_formset.formset
+    
+    def test_change_page_renders_one_page_of_bids(self, admin_client, tender):
+        bids = self.make_bids(tender, 45)
+        url = reverse('admin:tender_tender_change', args=[tender.tender_id])
+        
+        formset = self.get_bid_formset(admin_client.get(url))
+        assert formset.initial_form_count() == formset.per_page
+        assert formset.paginator.count == 45
+        
+        response = admin_client.get(url, {'bids-page': 3})
+        formset = self.get_bid_formset(response)
+        assert [form.instance.pk for form in formset.initial_forms] == [bid.bid_id for bid in bids[40:]]
+        assert 'bids-page=2' in response.content.decode()
+    
+    def test_change_page_query_count_does_not_grow_with_bids(self, admin_client, tender):
+        url = reverse('admin:tender_tender_change', args=[tender.tender_id])
+        self.make_bids(tender, 25)
+        with CaptureQueriesContext(connection) as small:
+            admin_client.get(url)
+        self.make_bids(tender, 100)
+        with CaptureQueriesContext(connection) as large:
+            admin_client.get(url)
+        assert len(large.captured_queries) == len(small.captured_queries)
+    
+    def test_post_only_binds_submitted_rows(self, admin_client, tender):
+        bids = self.make_bids(tender, 30)
+        edited = bids[25]
+        data = {
+            'client': tender.client_id,
+            'title': tender.title,
+            'description': tender.description,
+            'status': tender.status,
+            'created_at_0': tender.created_at.strftime('%Y-%m-%d'),
+            'created_at_1': tender.created_at.strftime('%H:%M:%S'),
+            'min_budget': tender.min_budget,
+            'max_budget': tender.max_budget,
+            'max_duration': tender.max_duration,
+            'deadline': tender.deadline,
+            'bids-TOTAL_FORMS': 1,
+            'bids-INITIAL_FORMS': 1,
+            'bids-0-bid_id': edited.bid_id,
+            'bids-0-tender': tender.tender_id,
+            'bids-0-vendor': edited.vendor_id,
+            'bids-0-amount': 4321,
+            'bids-0-delivery_time': 10,
+            'bids-0-status': 'pending',
+            'comments-TOTAL_FORMS': 0,
+            'comments-INITIAL_FORMS': 0,
+        }
+        url = reverse('admin:tender_tender_change', args=[tender.tender_id])
+        response = admin_client.post(url, data)
+        assert response.status_code == 302
+        
+        edited.refresh_from_db()
+        assert edited.amount == 4321
+        assert Bid.objects.filter(tender=tender).count() == 30
+        assert Bid.objects.filter(tender=tender, amount=4321).count() == 1
+
+def test_create_search_indexes_prints_trigram_indexes():
+    output = StringIO()
+    call_command('create_search_indexes', '--print-sql', stdout=output)
+    statements = output.getvalue().splitlines()
+    assert statements[0] == 'CREATE EXTENSION IF NOT EXISTS pg_trgm;'
+    assert (
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS "tender_tender_title_trgm_idx" ON "tender_tender" '
+        'USING gin ((UPPER("title"::text)) gin_trgm_ops);'
+    ) in statements
+    # Joined search fields are indexed once, on the table that owns the column
+    assert sum('"users_user_username_trgm_idx"' in statement for statement in statements) == 1
+
+@pytest.mark.django_db
+class TestClientDashboard:
+    def get_stats(self, client_user):
+        return ClientStats.objects.get(client=client_user)
+    
+    def rebuilt_values(self, client_user):
+        stats = self.get_stats(client_user)
+        incremental = model_to_dict(stats, exclude=['updated_at'])
+        call_command('rebuild_client_stats', client_user.id, stdout=StringIO())
+        stats.refresh_from_db()
+        return incremental, model_to_dict(stats, exclude=['updated_at'])
+    
+    def test_stats_follow_the_tender_lifecycle(self, api_client, client_user, vendor_user, tender):
+        stats = self.get_stats(client_user)
+        assert stats.tenders_open == 1
+        
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.post(reverse('tender-place-bid', args=[tender.tender_id]), {
+            'amount': '2500.00', 'proposal': fake.text(), 'delivery_time': 10
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+        stats.refresh_from_db()
+        assert stats.bids_received == 1
+        assert stats.bid_amount_total == Decimal('2500.00')
+        assert stats.bid_budget_total == Decimal('5000.00')
+        
+        api_client.force_authenticate(user=client_user)
+        api_client.post(reverse('tender-accept-bid', args=[tender.tender_id]), {'bid_id': response.data['bid_id']})
+        stats.refresh_from_db()
+        assert (stats.tenders_open, stats.tenders_in_progress, stats.active_projects) == (0, 1, 1)
+        
+        project = Project.objects.get(tender=tender)
+        api_client.post(reverse('project-update-price', args=[project.project_id]), {'new_price': '2700.00'})
+        api_client.post(reverse('project-complete-project', args=[project.project_id]))
+        stats.refresh_from_db()
+        assert (stats.tenders_in_progress, stats.tenders_completed, stats.active_projects) == (0, 1, 0)
+        assert stats.spend_to_date == Decimal('2700.00')
+        
+        incremental, rebuilt = self.rebuilt_values(client_user)
+        assert incremental == rebuilt
+    
+    def test_deletes_and_admin_actions_keep_stats_consistent(self, admin_client, client_user, tender_with_bid):
+        tender, bid = tender_with_bid
+        other_tenders = make_tenders(client_user, 3)
+        admin_client.post(reverse('admin:tender_tender_changelist'), {
+            'action': 'mark_tenders_cancelled',
+            '_selected_action': [other_tenders[0].tender_id, other_tenders[1].tender_id],
+        })
+        bid.delete()
+        
+        stats = self.get_stats(client_user)
+        assert (stats.tenders_open, stats.tenders_cancelled, stats.bids_received) == (2, 2, 0)
+        incremental, rebuilt = self.rebuilt_values(client_user)
+        assert incremental == rebuilt
+        
+        tender.delete()
+        stats.refresh_from_db()
+        assert stats.tenders_open == 1
+    
+    def test_budget_and_client_changes_keep_stats_consistent(self, api_client, client_user, tender_with_bid):
+        tender, bid = tender_with_bid
+        Bid.objects.create(tender=tender, vendor=make_vendors(1)[0], amount=3000, proposal='', delivery_time=5)
+        api_client.force_authenticate(user=client_user)
+        response = api_client.patch(reverse('tender-detail', args=[tender.tender_id]), {'max_budget': '6000.00'})
+        assert response.status_code == status.HTTP_200_OK
+        assert self.get_stats(client_user).bid_budget_total == Decimal('12000.00')
+        incremental, rebuilt = self.rebuilt_values(client_user)
+        assert incremental == rebuilt
+        
+        # Deleting a bid afterwards takes out the budget it was counted with
+        bid.delete()
+        incremental, rebuilt = self.rebuilt_values(client_user)
+        assert incremental == rebuilt
+        
+        other_client = User.objects.create_user(username=fake.unique.user_name(), password='secret', is_client=True)
+        tender = Tender.objects.get(pk=tender.pk)
+        tender.client = other_client
+        tender.save()
+        assert self.get_stats(client_user).bids_received == 0
+        assert self.get_stats(other_client).bids_received == 1
+        for user in (client_user, other_client):
+            incremental, rebuilt = self.rebuilt_values(user)
+            assert incremental == rebuilt
+    
+    def test_deleting_a_client_removes_their_stats(self, client_user, tender_with_bid):
+        client_user.delete()
+        assert not ClientStats.objects.exists()
+    
+    def test_dashboard_endpoint(self, api_client, client_user, vendor_user, tender_with_bid, django_assert_num_queries):
+        tender, bid = tender_with_bid
+        Project.objects.create(
+            tender=tender, client=client_user, vendor=vendor_user,
+            agreed_amount=bid.amount, deadline=timezone.localdate() - timedelta(days=1)
+        )
+        
+        api_client.force_authenticate(user=client_user)
+        # Stats row and the overdue project count
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse('client-dashboard'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['tenders'] == {
+            'open': 1, 'in_progress': 0, 'completed': 0, 'cancelled': 0, 'closed': 0, 'total': 1
+        }
+        assert response.data['bids_received'] == 1
+        assert response.data['average_bid'] == '2000.00'
+        assert response.data['average_bid_to_budget'] == 0.4
+        assert response.data['active_projects'] == 1
+        assert response.data['overdue_projects'] == 1
+    
+    def test_dashboard_is_only_for_clients(self, api_client, vendor_user):
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.get(reverse('client-dashboard'))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_dashboard_builds_missing_stats(self, api_client, client_user):
+        ClientStats.objects.all().delete()
+        api_client.force_authenticate(user=client_user)
+        response = api_client.get(reverse('client-dashboard'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['tenders']['total'] == 0
+
+@pytest.mark.django_db
+class TestVendorStats:
+    def test_stats_follow_bids_and_project_activities(self, api_client, client_user, vendor_user, tender):
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.post(reverse('tender-place-bid', args=[tender.tender_id]), {
+            'amount': '2500.00', 'proposal': fake.text(), 'delivery_time': 10
+        })
+        api_client.force_authenticate(user=client_user)
+        api_client.post(reverse('tender-accept-bid', args=[tender.tender_id]), {'bid_id': response.data['bid_id']})
+        project = Project.objects.get(tender=tender)
+        
+        api_client.force_authenticate(user=vendor_user)
+        api_client.post(reverse('project-deliver-project', args=[project.project_id]))
+        api_client.force_authenticate(user=client_user)
+        api_client.post(reverse('project-request-revision', args=[project.project_id]))
+        
+        # The second delivery is late
+        Project.objects.filter(pk=project.pk).update(deadline=timezone.localdate() - timedelta(days=1))
+        api_client.force_authenticate(user=vendor_user)
+        api_client.post(reverse('project-deliver-project', args=[project.project_id]))
+        api_client.force_authenticate(user=client_user)
+        api_client.post(reverse('project-complete-project', args=[project.project_id]))
+        
+        stats = VendorStats.objects.get(vendor=vendor_user)
+        assert (stats.bids_total, stats.bids_won) == (1, 1)
+        assert (stats.deliveries, stats.on_time_deliveries, stats.revision_requests) == (2, 1, 1)
+        assert (stats.completions, stats.on_time_completions, stats.on_time_completion_rate) == (1, 0, 0.0)
+        assert stats.projects_completed == 1
+        assert (stats.win_rate, stats.on_time_rate, stats.revision_rate) == (1.0, 0.5, 0.5)
+        
+        # A rebuild judges the first delivery against the moved deadline
+        incremental = model_to_dict(stats, exclude=['updated_at', 'on_time_deliveries'])
+        call_command('rebuild_vendor_stats', vendor_user.id, stdout=StringIO())
+        stats.refresh_from_db()
+        assert model_to_dict(stats, exclude=['updated_at', 'on_time_deliveries']) == incremental
+        assert stats.on_time_deliveries == 0
+    
+    def test_edited_activities_move_between_counts(self, admin_client, client_user, vendor_user, tender):
+        other_vendor = make_vendors(1)[0]
+        project = Project.objects.create(
+            tender=tender, client=client_user, vendor=vendor_user, agreed_amount=2000, deadline=tender.deadline
+        )
+        other_tender = Tender.objects.create(
+            client=client_user, title=fake.sentence(), description=fake.text(), max_duration=30,
+            min_budget=1000, max_budget=5000, deadline=fake.future_date()
+        )
+        other_project = Project.objects.create(
+            tender=other_tender, client=client_user, vendor=other_vendor, agreed_amount=2000, deadline=other_tender.deadline
+        )
+        delivery = ProjectActivity.objects.create(
+            project=project, user=vendor_user, activity_type='delivery', description=fake.text()
+        )
+        
+        def stats(vendor):
+            return model_to_dict(VendorStats.objects.get(vendor=vendor), exclude=['updated_at'])
+        
+        # Edited in the admin, which saves an instance loaded from the database
+        response = admin_client.post(reverse('admin:project_activity_projectactivity_change', args=[delivery.pk]), {
+            'project': other_project.pk, 'user': vendor_user.pk,
+            'activity_type': 'project_completion', 'description': delivery.description,
+        })
+        assert response.status_code == 302
+        edited = stats(vendor_user), stats(other_vendor)
+        assert (edited[0]['deliveries'], edited[1]['completions'], edited[1]['on_time_completions']) == (0, 1, 1)
+        
+        activity = ProjectActivity.objects.get(pk=delivery.pk)
+        activity.activity_type = 'comment'
+        activity.save()
+        edited = stats(vendor_user), stats(other_vendor)
+        assert edited[1]['completions'] == 0
+        
+        rebuild_vendor_stats([vendor_user.id, other_vendor.id])
+        assert (stats(vendor_user), stats(other_vendor)) == edited
+    
+    def test_admin_accept_rebuilds_vendor_stats(self, admin_client, tender_with_bid):
+        tender, bid = tender_with_bid
+        admin_client.post(reverse('admin:tender_bid_changelist'), {
+            'action': 'mark_bids_accepted',
+            '_selected_action': [bid.bid_id],
+        })
+        assert VendorStats.objects.get(vendor=bid.vendor).bids_won == 1
+    
+    def test_bid_list_includes_stats_without_extra_queries(self, api_client, client_user, tender):
+        vendors = make_vendors(5)
+        for vendor in vendors[:1]:
+            Bid.objects.create(tender=tender, vendor=vendor, amount=2000, proposal=fake.text(), delivery_time=20)
+        api_client.force_authenticate(user=client_user)
+        with CaptureQueriesContext(connection) as one_bid:
+            response = api_client.get(reverse('bid-list'))
+        assert response.data['results'][0]['vendor_profile']['stats']['bids_total'] == 1
+        
+        for vendor in vendors[1:]:
+            Bid.objects.create(tender=tender, vendor=vendor, amount=2000, proposal=fake.text(), delivery_time=20)
+        with CaptureQueriesContext(connection) as five_bids:
+            response = api_client.get(reverse('bid-list'))
+        assert len(response.data['results']) == 5
+        assert len(five_bids.captured_queries) == len(one_bid.captured_queries)
+
+def test_grouped_percentiles_match_numpy():
+    rng = np.random.default_rng(1)
+    groups = rng.integers(0, 7, 1000)
+    values = rng.normal(100, 20, 1000).round(2)
+    group_ids, counts, result = grouped_percentiles(groups, values)
+    for group, count, row in zip(group_ids, counts, result):
+        assert count == (groups == group).sum()
+        assert np.allclose(row, np.percentile(values[groups == group], PERCENTILES))
+
+@pytest.mark.django_db
+class TestMarketStats:
+    @pytest.fixture
+    def market(self, client_user, category):
+        tag = Tag.objects.create(name='design')
+        tenders = make_tenders(client_user, 4)
+        for tender, budget in zip(tenders[:3], (1000, 2000, 3000)):
+            tender.category = category
+            tender.min_budget = budget
+            tender.max_budget = budget * 2
+            tender.save()
+        tenders[0].tags.add(tag)
+        vendors = make_vendors(3)
+        Bid.objects.bulk_create([
+            Bid(tender=tenders[0], vendor=vendors[0], amount=1500, proposal='', delivery_time=10, status='accepted'),
+            Bid(tender=tenders[0], vendor=vendors[1], amount=1800, proposal='', delivery_time=20),
+            Bid(tender=tenders[1], vendor=vendors[2], amount=2500, proposal='', delivery_time=40),
+            # The last tender has no category and is left out
+            Bid(tender=tenders[3], vendor=vendors[2], amount=99999, proposal='', delivery_time=99),
+        ])
+        return category, tag
+    
+    def test_compute_market_stats(self, market):
+        category, tag = market
+        output = StringIO()
+        call_command('compute_market_stats', '--chunk-size', 2, stdout=output)
+        assert 'Computed stats for 1 categories and 1 tags from 4 tenders and 4 bids' in output.getvalue()
+        
+        stats = MarketStats.objects.get(category=category)
+        assert (stats.tender_count, stats.bid_count, stats.winning_bid_count) == (3, 3, 1)
+        assert stats.min_budget_percentiles['p50'] == 2000
+        assert stats.max_budget_percentiles['p90'] == 5600
+        assert stats.bid_amount_percentiles['p50'] == 1800
+        assert stats.winning_bid_percentiles == {f'p{p}': 1500 for p in PERCENTILES}
+        assert stats.median_delivery_time == 20
+        assert sum(stats.bid_amount_histogram['counts']) == 3
+        assert stats.bid_amount_histogram['edges'][0] == 1500
+        assert stats.bid_amount_histogram['edges'][-1] == 2500
+        
+        tag_stats = MarketStats.objects.get(tag=tag)
+        assert (tag_stats.tender_count, tag_stats.bid_count) == (1, 2)
+        assert tag_stats.bid_amount_percentiles['p50'] == 1650
+    
+    def test_bids_of_tenders_not_loaded_are_skipped(self, market, monkeypatch):
+        category, _ = market
+        load_market_data = market_module.load_market_data
+
+        def load_with_new_tenders(*args):
+            # Bids of tenders created after the tenders were read, as outside of a snapshot
+            tenders, bids, tag_pairs = load_market_data(*args)
+            tender_ids = tenders[0]
+            extra = np.array([tender_ids[0] - 1, tender_ids[-1] + 1, tender_ids[-1] + 2])
+            bids = [
+                np.concatenate((bids[0], extra)), np.concatenate((bids[1], [1e6] * 3)),
+                np.concatenate((bids[2], [1.0] * 3)), np.concatenate((bids[3], [False] * 3)),
+            ]
+            order = np.argsort(bids[0], kind='stable')
+            return tenders, [column[order] for column in bids], tag_pairs
+
+        monkeypatch.setattr(market_module, 'load_market_data', load_with_new_tenders)
+        result = market_module.compute_market_stats()
+        assert result['bids'] == 4
+        assert MarketStats.objects.get(category=category).bid_count == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_market_data_is_read_from_one_snapshot(self):
+        with CaptureQueriesContext(connection) as queries:
+            market_module.load_market_data()
+        statements = [query['sql'] for query in queries.captured_queries if query['sql'] != 'BEGIN']
+        assert 'REPEATABLE READ' in statements[0]
+
+    def test_market_stats_endpoint(self, api_client, client_user, market):
+        category, tag = market
+        api_client.force_authenticate(user=client_user)
+        url = reverse('category-market-stats', args=[category.id])
+        assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+        
+        call_command('compute_market_stats', stdout=StringIO())
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['tender_count'] == 3
+        
+        response = api_client.get(reverse('tag-market-stats', args=[tag.id]))
+        assert response.data['bid_count'] == 2
+
+@pytest.mark.django_db
+class TestDeadlineSweep:
+    def test_sweep_closes_expired_open_tenders_in_batches(self, client_user):
+        tenders = make_tenders(client_user, 7)
+        today = timezone.localdate()
+        Tender.objects.filter(pk__in=[t.pk for t in tenders[:5]]).update(deadline=today - timedelta(days=1))
+        Tender.objects.filter(pk=tenders[5].pk).update(deadline=today)
+        Tender.objects.filter(pk=tenders[6].pk).update(deadline=today - timedelta(days=3), status='completed')
+        rebuild_client_stats([client_user.id])
+        
+        output = StringIO()
+        call_command('close_expired_tenders', '--once', '--batch-size', 2, stdout=output)
+        assert 'Closed 5 tenders in 3 batches' in output.getvalue()
+        
+        assert Tender.objects.filter(status='closed').count() == 5
+        assert Tender.objects.get(pk=tenders[5].pk).status == 'open'
+        assert Tender.objects.get(pk=tenders[6].pk).status == 'completed'
+        
+        sweep = DeadlineSweep.objects.get()
+        assert (sweep.tenders_closed, sweep.batches) == (5, 3)
+        stats = ClientStats.objects.get(client=client_user)
+        assert (stats.tenders_open, stats.tenders_closed) == (1, 5)
+    
+    def test_sweep_uses_partial_index(self):
+        queryset = Tender.objects.filter(status='open', deadline__lt=timezone.localdate()).order_by('deadline')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        assert 'tender_open_deadline_idx' in queryset.explain()
+    
+    def test_cannot_bid_after_deadline(self, api_client, vendor_user, tender):
+        Tender.objects.filter(pk=tender.pk).update(deadline=timezone.localdate() - timedelta(days=1))
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.post(reverse('tender-place-bid', args=[tender.tender_id]), {
+            'amount': 2000, 'proposal': fake.text(), 'delivery_time': 10
+        })
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Bid.objects.exists()
+
+@pytest.mark.django_db
+class TestProjectSla:
+    @pytest.fixture
+    def projects(self, client_user):
+        today = timezone.localdate()
+        vendors = make_vendors(3)
+        projects = Project.objects.bulk_create([
+            Project(tender=tender, client=client_user, vendor=vendor, agreed_amount=2000, deadline=deadline)
+            for tender, vendor, deadline in zip(
+                make_tenders(client_user, 3), vendors,
+                [today - timedelta(days=2), today + timedelta(days=3), today + timedelta(days=30)],
+            )
+        ])
+        Project.objects.filter(pk__in=[project.pk for project in projects]).update(start_date=today - timedelta(days=8))
+        return projects
+    
+    def test_list_includes_schedule_progress(self, api_client, client_user, projects):
+        overdue, due_soon, _ = projects
+        api_client.force_authenticate(user=client_user)
+        response = api_client.get(reverse('project-list'))
+        assert response.status_code == status.HTTP_200_OK
+        
+        rows = {row['project_id']: row for row in response.data['results']}
+        assert rows[overdue.pk]['is_overdue'] is True
+        assert rows[overdue.pk]['progress'] == 99
+        assert rows[overdue.pk]['days_remaining'] == -2
+        assert rows[due_soon.pk]['is_overdue'] is False
+        assert rows[due_soon.pk]['progress'] == round(8 / 11 * 100)
+        assert rows[due_soon.pk]['days_running'] == 8
+    
+    def test_overdue_and_due_within_filters(self, api_client, client_user, projects):
+        overdue, due_soon, later = projects
+        api_client.force_authenticate(user=client_user)
+        url = reverse('project-list')
+        
+        def project_ids(params):
+            response = api_client.get(url, params)
+            assert response.status_code == status.HTTP_200_OK
+            return {row['project_id'] for row in response.data['results']}
+        
+        assert project_ids({'overdue': 'true'}) == {overdue.pk}
+        assert project_ids({'overdue': 'false'}) == {due_soon.pk, later.pk}
+        assert project_ids({'due_within': 7}) == {due_soon.pk}
+        
+        Project.objects.filter(pk=overdue.pk).update(status='completed')
+        assert project_ids({'overdue': 'true'}) == set()
+        
+        assert api_client.get(url, {'overdue': 'yes'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'due_within': '-1'}).status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_deadline_update_refreshes_progress(self, api_client, client_user, projects):
+        overdue = projects[0]
+        api_client.force_authenticate(user=client_user)
+        new_deadline = timezone.localdate() + timedelta(days=2)
+        response = api_client.post(reverse('project-update-deadline', args=[overdue.pk]), {
+            'new_deadline': new_deadline.isoformat()
+        })
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['is_overdue'] is False
+        assert response.data['progress'] == 80
+    
+    def test_update_moving_the_project_out_of_the_filters(self, api_client, client_user, projects):
+        overdue = projects[0]
+        api_client.force_authenticate(user=client_user)
+        new_deadline = timezone.localdate() + timedelta(days=2)
+        url = reverse('project-update-deadline', args=[overdue.pk])
+        response = api_client.post(f'{url}?overdue=true', {'new_deadline': new_deadline.isoformat()})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['is_overdue'] is False
+        
+        url = reverse('project-detail', args=[overdue.pk])
+        response = api_client.patch(f'{url}?due_within=2', {'deadline': (new_deadline + timedelta(days=10)).isoformat()})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['days_remaining'] == 12
+    
+    def test_sweep_records_overdue_activity_once(self, projects):
+        for _ in range(2):
+            call_command('record_overdue_projects', '--once', '--batch-size', 1, stdout=StringIO())
+        
+        activity = ProjectActivity.objects.get(activity_type='overdue')
+        assert activity.project_id == projects[0].pk
+        assert activity.user_id == projects[0].vendor_id
+    
+    def test_admin_changelist_shows_progress(self, admin_client, projects):
+        url = reverse('admin:tender_project_changelist')
+        response = admin_client.get(url, {'schedule': 'overdue'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.context['cl'].result_count == 1
+        assert '<span style="color: red;">99%</span>' in response.content.decode()
+
+# The replica connection only sees committed rows
+@pytest.mark.django_db(transaction=True)
+class TestReadReplicas:
+    def test_safe_requests_read_from_the_replica(self, api_client, replica, client_user, tender):
+        api_client.force_authenticate(user=client_user)
+        with CaptureQueriesContext(replica()) as queries:
+            response = api_client.get(reverse('tender-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['tender_id'] for row in response.data['results']] == [tender.tender_id]
+        assert any('"tender_tender"' in query['sql'] for query in queries.captured_queries)
+
+    def test_writer_is_pinned_to_the_primary(self, api_client, replica, vendor_user, tender):
+        replica_connection = replica()
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.post(reverse('tender-place-bid', args=[tender.tender_id]), {
+            'amount': 2000, 'proposal': fake.text(), 'delivery_time': 10
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.cookies[PIN_COOKIE]['max-age'] == 10
+
+        # Pinned by the cookie, and by the user for clients that drop cookies
+        for client in (api_client, APIClient()):
+            client.force_authenticate(user=vendor_user)
+            with CaptureQueriesContext(replica_connection) as queries:
+                response = client.get(reverse('bid-list'))
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data['results']) == 1
+            assert queries.captured_queries == []
+
+    def test_get_that_writes_reads_its_writes_from_the_primary(self, api_client, replica, client_user):
+        replica_connection = replica()
+        api_client.force_authenticate(user=client_user)
+        # The dashboard looks the stats row up, builds it, then reads it back from the primary
+        with CaptureQueriesContext(replica_connection) as queries:
+            response = api_client.get(reverse('client-dashboard'))
+        assert response.status_code == status.HTTP_200_OK
+        assert sum('"tender_clientstats"' in query['sql'] for query in queries.captured_queries) == 1
+        assert PIN_COOKIE in response.cookies
+
+    def test_missing_stats_are_rebuilt_from_the_primary(self, api_client, replica, client_user):
+        replica_connection = replica()
+        # The replica's snapshot predates the tender, like a replica that hasn't replayed it yet
+        with replica_connection.cursor() as cursor:
+            cursor.execute('BEGIN ISOLATION LEVEL REPEATABLE READ')
+            cursor.execute('SELECT 1')
+        Tender.objects.create(
+            client=client_user, title=fake.sentence(), description=fake.text(), max_duration=30,
+            min_budget=1000, max_budget=5000, deadline=fake.future_date()
+        )
+        api_client.force_authenticate(user=client_user)
+        with CaptureQueriesContext(replica_connection) as queries:
+            response = api_client.get(reverse('client-dashboard'))
+        assert response.status_code == status.HTTP_200_OK
+        assert any('"tender_clientstats"' in query['sql'] for query in queries.captured_queries)
+        assert not any('"tender_tender"' in query['sql'] for query in queries.captured_queries)
+        assert response.data['tenders']['open'] == 1
+        assert ClientStats.objects.get(client=client_user).tenders_open == 1
+    
+    def test_lagging_replica_is_skipped(self, api_client, replica, client_user, tender, settings):
+        replica_connection = replica()
+        settings.READ_REPLICAS = {**settings.READ_REPLICAS, 'MAX_LAG': -1}
+        api_client.force_authenticate(user=client_user)
+        with CaptureQueriesContext(replica_connection) as queries:
+            response = api_client.get(reverse('tender-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert not any('"tender_tender"' in query['sql'] for query in queries.captured_queries)
+
+    def test_unreachable_replica_is_skipped(self, api_client, replica, client_user, tender):
+        replica(PORT='1')
+        api_client.force_authenticate(user=client_user)
+        response = api_client.get(reverse('tender-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 1
+        assert replica_health.healthy_replicas() == []
+
+@pytest.mark.django_db
+class TestDatabaseConnectionStats:
+    def test_admin_sees_connection_usage(self, api_client, admin_user, settings):
+        api_client.force_authenticate(user=admin_user)
+        url = reverse('database-connection-stats')
+        first = api_client.get(url)
+        assert first.status_code == status.HTTP_200_OK
+        assert first.data['mode'] == settings.DB_CONNECTIONS['MODE'] == 'persistent'
+        assert first.data['databases']['default']['max_age'] == settings.DB_CONNECTIONS['MAX_AGE']
+        assert 'pool' not in first.data['databases']['default']
+
+        second = api_client.get(url)
+        assert second.data['requests'] == first.data['requests'] + 1
+
+    def test_requires_admin(self, api_client, client_user):
+        api_client.force_authenticate(user=client_user)
+        response = api_client.get(reverse('database-connection-stats'))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_pool_mode_requires_psycopg_pool(self, monkeypatch):
+        find_spec = importlib.util.find_spec
+        monkeypatch.setattr(importlib.util, 'find_spec', lambda name, *args: None if name == 'psycopg_pool' else find_spec(name, *args))
+        monkeypatch.setenv('DB_CONNECTION_MODE', 'pool')
+        with pytest.raises(ImproperlyConfigured, match='psycopg_pool'):
+            runpy.run_path(settings_module.__file__)
+
+@pytest.mark.django_db
+class TestAsyncReads:
+    """The async views answer exactly like the DRF views they mirror."""
+    @pytest.fixture
+    def tenders(self, client_user, vendor_user, category):
+        tags = [Tag.objects.create(name=f'{fake.unique.word()}-tag') for _ in range(2)]
+        tenders = []
+        for index in range(12):
+            tender = Tender.objects.create(
+                client=client_user, title=fake.sentence(), description=fake.text(), max_duration=30,
+                min_budget=1000, max_budget=5000, deadline=fake.future_date(), category=category,
+                status='open' if index % 3 else 'closed',
+            )
+            tender.tags.set(tags[:index % 3])
+            Bid.objects.create(tender=tender, vendor=vendor_user, amount=2000, proposal=fake.text(), delivery_time=10)
+            Comment.objects.create(tender=tender, user=vendor_user, content=fake.sentence())
+            tenders.append(tender)
+        return tenders
+
+    @pytest.fixture
+    def jwt_client(self, vendor_user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(vendor_user)}')
+        return client
+
+    def assert_same_response(self, client, sync_url, async_url):
+        sync_response = client.get(sync_url)
+        async_response = client.get(async_url)
+        assert async_response.status_code == sync_response.status_code
+        assert async_response['Content-Type'] == 'application/json'
+        # Only the page links differ, by their path
+        assert async_response.content == sync_response.content.replace(
+            reverse('tender-list').encode(), reverse('async-tender-list').encode()
+        )
+        return async_response
+
+    @pytest.mark.parametrize('query', ['', '?page=2', '?status=open', '?status=open&page=2', '?page=3'])
+    def test_tender_list(self, jwt_client, tenders, query):
+        self.assert_same_response(jwt_client, reverse('tender-list') + query, reverse('async-tender-list') + query)
+
+    def test_tender_list_queries_do_not_grow_with_the_page(self, jwt_client, tenders):
+        with CaptureQueriesContext(connection) as queries:
+            response = jwt_client.get(reverse('async-tender-list'))
+        assert len(response.json()['results']) == 10
+        # User, count, page, tags
+        assert len(queries.captured_queries) == 4
+
+    def test_tender_detail(self, jwt_client, tenders):
+        tender = tenders[4]
+        response = self.assert_same_response(
+            jwt_client, reverse('tender-detail', args=[tender.pk]), reverse('async-tender-detail', args=[tender.pk])
+        )
+        assert response.json()['bid_count'] == 1
+        assert len(response.json()['comments']) == 1
+
+        self.assert_same_response(
+            jwt_client, reverse('tender-detail', args=[0]), reverse('async-tender-detail', args=[0])
+        )
+
+    def test_tag_and_category_lists(self, jwt_client, tenders):
+        for name in ('tag', 'category'):
+            sync_response = jwt_client.get(reverse(f'{name}-list'))
+            async_response = jwt_client.get(reverse(f'async-{name}-list'))
+            assert async_response.json() == sync_response.json()
+
+    def test_authentication_errors(self, tenders):
+        client = APIClient()
+        sync_response = client.get(reverse('tender-list'))
+        async_response = client.get(reverse('async-tender-list'))
+        assert async_response.status_code == sync_response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert async_response.json() == sync_response.json()
+        assert async_response['WWW-Authenticate'] == sync_response['WWW-Authenticate']
+
+        client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        async_response = client.get(reverse('async-tender-list'))
+        assert async_response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert async_response.json()['code'] == 'token_not_valid'
+
+    def test_session_authentication(self, client_user, tenders):
+        client = APIClient()
+        client.force_login(client_user)
+        response = client.get(reverse('async-tender-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['count'] == 12
+
+
+@pytest.mark.django_db
+class TestCompiledSerializers:
+    """The compiled list serializers render the same bytes as DRF's serializers."""
+    @pytest.fixture
+    def tenders(self, client_user, vendor_user, category):
+        other_vendor = User.objects.create_user(username=fake.user_name(), password=fake.password(), is_vendor=True)
+        tags = [Tag.objects.create(name=f'{fake.unique.word()}-tag') for _ in range(2)]
+        tenders = []
+        for index in range(6):
+            tender = Tender.objects.create(
+                client=client_user, title=fake.sentence(), description=fake.text(), max_duration=30,
+                min_budget=Decimal('1000.50'), max_budget=5000, deadline=fake.future_date(),
+                category=category if index % 2 else None, status='open' if index % 3 else 'closed',
+            )
+            tender.tags.set(tags[:index % 3])
+            Bid.objects.create(tender=tender, vendor=vendor_user, amount=2000, proposal=fake.text(), delivery_time=10)
+            Bid.objects.create(
+                tender=tender, vendor=other_vendor, amount=Decimal('1999.99'), proposal=fake.text(), delivery_time=5
+            )
+            Comment.objects.create(tender=tender, user=vendor_user if index % 2 else client_user, content=fake.sentence())
+            tenders.append(tender)
+        # A vendor without a stats row yet
+        VendorStats.objects.filter(vendor=other_vendor).delete()
+        return tenders
+
+    def render(self, serializer_class, rows, compiled, monkeypatch):
+        request = APIRequestFactory().get('/')
+        with monkeypatch.context() as patch:
+            if not compiled:
+                patch.setattr(CompiledListSerializer, 'to_representation', serializers.ListSerializer.to_representation)
+            data = serializer_class(rows, many=True, context={'request': request}).data
+        return JSONRenderer().render(data)
+
+    def assert_same_rendering(self, serializer_class, rows, monkeypatch):
+        rendered = self.render(serializer_class, rows, True, monkeypatch)
+        assert rendered == self.render(serializer_class, rows, False, monkeypatch)
+        return rendered
+
+    @pytest.mark.parametrize('time_zone', ['UTC', 'Asia/Jakarta'])
+    def test_tenders(self, tenders, monkeypatch, time_zone):
+        with timezone.override(time_zone):
+            for serializer_class, detail in ((TenderSerializer, False), (TenderDetailSerializer, True)):
+                rows = list(tender_queryset({}, detail=detail))
+                self.assert_same_rendering(serializer_class, rows, monkeypatch)
+
+    def test_null_category_is_skipped(self, tenders, monkeypatch):
+        rendered = self.assert_same_rendering(TenderSerializer, list(tender_queryset({})), monkeypatch)
+        assert rendered.count(b'"tender_category_id"') == 3
+        assert rendered.count(b'"category":null') == 3
+
+    def test_bids_and_comments(self, tenders, monkeypatch):
+        bids = list(Bid.objects.select_related('vendor__vendor_stats'))
+        rendered = self.assert_same_rendering(BidSerializer, bids, monkeypatch)
+        assert b'"stats":null' in rendered
+        assert b'"amount":"1999.99"' in rendered
+
+        comments = list(Comment.objects.select_related('user'))
+        self.assert_same_rendering(CommentSerializer, comments, monkeypatch)
+
+    def test_list_endpoints_are_compiled(self, api_client, vendor_user, tenders):
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.get(reverse('tender-list'))
+        assert isinstance(response.renderer_context['view'].get_serializer(many=True), CompiledListSerializer)
+        assert response.json()['count'] == 6
+
+
+class TestRenderers:
+    """The orjson renderer and parser are drop-in replacements of DRF's JSON ones."""
+    payload = {
+        'amount': Decimal('1999.99'),
+        'created_at': datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        'jakarta': datetime(2025, 1, 2, 3, 4, 5, tzinfo=dt_timezone(timedelta(hours=7))),
+        'deadline': datetime(2025, 1, 2).date(),
+        'at': time(10, 30, 15, 123456),
+        'duration': timedelta(days=1, seconds=5),
+        'label': gettext_lazy('Open'),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'scores': np.array([1.5, 2.0]),
+        1: ['non-string key', None, True, 0.1, 10 ** 19],
+        'text': 'Unicode \u00e9\u2028\u2029',
+        'nested': serializers.ReturnDict({'tags': serializers.ReturnList([{'id': 1}], serializer=None)}, serializer=None),
+    }
+
+    @pytest.mark.parametrize('accepted_media_type', [None, 'application/json', 'application/json; indent=2'])
+    def test_renders_like_drf(self, accepted_media_type):
+        expected = JSONRenderer().render(self.payload, accepted_media_type)
+        assert ORJSONRenderer().render(self.payload, accepted_media_type) == expected
+        assert ORJSONRenderer().render(None) == b''
+
+    def test_floats_parse_to_the_same_values(self):
+        payload = {'small': 1e-05, 'large': 1e+16, 'scores': np.array([2.5e-07, 3e+21])}
+        rendered = ORJSONRenderer().render(payload)
+        assert rendered != JSONRenderer().render(payload)
+        assert json.loads(rendered) == json.loads(JSONRenderer().render(payload))
+
+    @pytest.mark.parametrize('value', [float('nan'), float('inf'), np.array([1.0, -np.inf])])
+    def test_non_finite_floats_are_rejected_like_drf(self, value):
+        payload = {'median': value, 'budget': None}
+        with pytest.raises(ValueError) as expected:
+            JSONRenderer().render(payload)
+        with pytest.raises(ValueError) as error:
+            ORJSONRenderer().render(payload)
+        assert str(error.value) == str(expected.value)
+
+    def test_parses_like_drf(self):
+        content = json.dumps({'title': 'Caf\u00e9', 'budget': 10 ** 30, 'tags': [{'name': 'a'}]}).encode()
+        assert ORJSONParser().parse(BytesIO(content)) == JSONParser().parse(BytesIO(content))
+
+        for content in (b'{"title": ', b'{"budget": NaN}'):
+            with pytest.raises(ParseError) as expected:
+                JSONParser().parse(BytesIO(content))
+            with pytest.raises(ParseError) as error:
+                ORJSONParser().parse(BytesIO(content))
+            assert str(error.value) == str(expected.value)
+
+    def test_message_pack_round_trip(self):
+        msgpack = pytest.importorskip('msgpack')
+        # MessagePack keeps the integer keys
+        payload = {key: value for key, value in self.payload.items() if key != 1}
+        rendered = MessagePackRenderer().render(payload)
+        assert msgpack.unpackb(rendered, raw=False) == json.loads(JSONRenderer().render(payload))
+        assert MessagePackParser().parse(BytesIO(msgpack.packb({'title': 'x'}))) == {'title': 'x'}
+        with pytest.raises(ParseError):
+            MessagePackParser().parse(BytesIO(b'\xc1'))
+
+@pytest.mark.django_db
+class TestContentNegotiation:
+    @pytest.fixture
+    def tenders(self, client_user, vendor_user, category):
+        for _ in range(3):
+            tender = Tender.objects.create(
+                client=client_user, title=fake.sentence(), description=fake.text(), max_duration=30,
+                min_budget=1000, max_budget=5000, deadline=fake.future_date(), category=category,
+            )
+            Bid.objects.create(tender=tender, vendor=vendor_user, amount=2000, proposal=fake.text(), delivery_time=10)
+
+    @pytest.mark.parametrize('url_name', ['tender-list', 'async-tender-list'])
+    def test_message_pack_responses(self, api_client, client_user, tenders, url_name):
+        msgpack = pytest.importorskip('msgpack')
+        api_client.force_login(client_user)
+        response = api_client.get(reverse(url_name), HTTP_ACCEPT='application/msgpack')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/msgpack'
+        data = msgpack.unpackb(response.content, raw=False)
+        assert data == api_client.get(reverse(url_name), HTTP_ACCEPT='application/json').json()
+        assert data['count'] == 3
+
+    @pytest.mark.parametrize('url_name', ['tender-list', 'async-tender-list'])
+    def test_unsupported_media_type_is_not_acceptable(self, api_client, client_user, tenders, url_name):
+        api_client.force_login(client_user)
+        response = api_client.get(reverse(url_name), HTTP_ACCEPT='text/csv')
+        assert response.status_code == status.HTTP_406_NOT_ACCEPTABLE
+
+    def test_message_pack_requests(self, api_client, client_user, category):
+        msgpack = pytest.importorskip('msgpack')
+        api_client.force_authenticate(user=client_user)
+        data = {
+            'title': fake.sentence(), 'description': fake.text(), 'max_duration': 30, 'min_budget': 1000,
+            'max_budget': 5000, 'deadline': fake.future_date().isoformat(), 'category_id': category.id,
+            'tags': [{'name': 'mobile'}],
+        }
+        response = api_client.post(
+            reverse('tender-list'), msgpack.packb(data), content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert msgpack.unpackb(response.content, raw=False)['tags_data'][0]['name'] == 'mobile'
+        assert Tender.objects.filter(title=data['title'], tags__name='mobile').exists()
+
+
+needs_brotli = pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+
+class TestCompression:
+    body = json.dumps([{'title': fake.sentence(), 'description': fake.text()} for _ in range(50)]).encode()
+
+    def respond(self, request):
+        return HttpResponse(self.body, content_type='application/json')
+
+    def get(self, accept_encoding, get_response=None):
+        middleware = compression.CompressionMiddleware(get_response or self.respond)
+        return middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    @pytest.mark.parametrize('header, coding', [
+        ('gzip, deflate', 'gzip'),
+        ('GZip;q=0.5, identity', 'gzip'),
+        ('*', 'gzip'),
+        ('gzip;q=0, *;q=0.5', ''),
+        ('identity', ''),
+        ('deflate', ''),
+        ('', ''),
+    ])
+    def test_preferred_encoding(self, header, coding, monkeypatch):
+        monkeypatch.delitem(compression.CODINGS, 'br', raising=False)
+        assert compression.preferred_encoding(header) == coding
+
+    @needs_brotli
+    @pytest.mark.parametrize('header, coding', [
+        ('gzip, deflate, br', 'br'),
+        ('gzip;q=1.0, br;q=0.5', 'gzip'),
+        ('br;q=0, *', 'gzip'),
+        ('*', 'br'),
+    ])
+    def test_preferred_encoding_with_brotli(self, header, coding):
+        assert compression.preferred_encoding(header) == coding
+
+    def test_gzip(self):
+        response = self.get('gzip, deflate')
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['Vary'] == 'Accept-Encoding'
+        assert int(response['Content-Length']) == len(response.content) < len(self.body)
+        assert gzip.decompress(response.content) == self.body
+
+    @needs_brotli
+    def test_brotli(self):
+        response = self.get('gzip, deflate, br')
+        assert response['Content-Encoding'] == 'br'
+        assert compression.brotli.decompress(response.content) == self.body
+
+    def test_uncompressed_responses(self, settings):
+        response = self.get('')
+        assert not response.has_header('Content-Encoding')
+        assert response['Vary'] == 'Accept-Encoding'
+        assert response.content == self.body
+
+        settings.COMPRESSION = {**settings.COMPRESSION, 'MIN_SIZE': len(self.body) + 1}
+        response = self.get('gzip')
+        assert not response.has_header('Content-Encoding')
+        assert not response.has_header('Vary')
+
+    @pytest.mark.parametrize('accept_encoding', ['gzip', pytest.param('br', marks=needs_brotli)])
+    def test_html_is_not_compressed(self, accept_encoding):
+        response = self.get(accept_encoding, lambda request: HttpResponse(self.body, content_type='text/html; charset=utf-8'))
+        assert not response.has_header('Content-Encoding')
+        assert response.content == self.body
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('accept_encoding', ['gzip', pytest.param('br', marks=needs_brotli)])
+    def test_admin_search_is_not_compressed(self, admin_client, accept_encoding):
+        response = admin_client.get(
+            reverse('admin:tender_tender_changelist'), {'q': 'csrfmiddlewaretoken'},
+            HTTP_ACCEPT_ENCODING=accept_encoding,
+        )
+        assert response.status_code == 200
+        assert b'csrfmiddlewaretoken' in response.content
+        assert not response.has_header('Content-Encoding')
+
+    def test_etag_is_weakened(self):
+        def respond(request):
+            response = self.respond(request)
+            response['ETag'] = '"abc"'
+            return response
+        assert self.get('gzip', respond)['ETag'] == 'W/"abc"'
+
+    def test_streaming(self):
+        consumed = []
+
+        def rows():
+            for row in json.loads(self.body):
+                consumed.append(row)
+                yield json.dumps(row).encode() + b'\n'
+
+        response = self.get('gzip', lambda request: StreamingHttpResponse(rows(), content_type='application/x-ndjson'))
+        assert response['Content-Encoding'] == 'gzip'
+        assert not response.has_header('Content-Length')
+        chunks = iter(response.streaming_content)
+        # Every row is sent as soon as it's produced
+        first = next(chunks)
+        assert len(consumed) == 1
+        assert gzip.decompress(first + b''.join(chunks)).splitlines() == [
+            json.dumps(row).encode() for row in json.loads(self.body)
+        ]
+
+    def test_async_streaming(self):
+        async def rows():
+            for row in json.loads(self.body):
+                yield json.dumps(row).encode() + b'\n'
+
+        async def respond(request):
+            return StreamingHttpResponse(rows(), content_type='application/x-ndjson')
+
+        async def content():
+            response = await self.get('gzip', respond)
+            assert response['Content-Encoding'] == 'gzip'
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        assert len(gzip.decompress(async_to_sync(content)()).splitlines()) == 50
+
+    def test_cached_responses_are_stored_compressed(self, settings, monkeypatch):
+        settings.CACHE_MIDDLEWARE_SECONDS = 60
+        cache.clear()
+        calls = {'views': 0, 'compressions': 0}
+
+        def view(request):
+            calls['views'] += 1
+            return self.respond(request)
+
+        def gzip_compress(content):
+            calls['compressions'] += 1
+            return compression.gzip_compress(content)
+
+        monkeypatch.setitem(compression.CODINGS, 'gzip', (gzip_compress, compression.GzipCompressor))
+        monkeypatch.delitem(compression.CODINGS, 'br', raising=False)
+        stack = UpdateCacheMiddleware(compression.CompressionMiddleware(FetchFromCacheMiddleware(view)))
+
+        responses = [
+            stack(RequestFactory().get('/cached/', HTTP_ACCEPT_ENCODING=header))
+            for header in ('gzip, deflate', 'deflate, gzip;q=0.9', 'gzip')
+        ]
+        # The different headers share the entry of their coding
+        assert calls == {'views': 1, 'compressions': 1}
+        assert all(gzip.decompress(response.content) == self.body for response in responses)
+
+        response = stack(RequestFactory().get('/cached/'))
+        assert response.content == self.body
+        assert calls['views'] == 2
+
+@pytest.mark.django_db
+def test_api_responses_are_compressed(api_client, client_user, tender):
+    Tender.objects.bulk_create([
+        Tender(client=client_user, title=fake.sentence(), description=fake.text(), max_duration=30,
+               min_budget=1000, max_budget=5000, deadline=fake.future_date())
+        for _ in range(5)
+    ])
+    api_client.force_authenticate(user=client_user)
+    plain = api_client.get(reverse('tender-list'))
+    response = api_client.get(reverse('tender-list'), HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.content) == plain.content
+
+@pytest.mark.django_db
+class TestReferenceData:
+    def test_list_is_served_from_the_cache(self, api_client, client_user, category):
+        api_client.force_authenticate(user=client_user)
+        api_client.get(reverse('category-list'))
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(reverse('category-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['id'] for row in response.data['results']] == [category.id]
+        assert not [query for query in queries if 'tender_category' in query['sql']]
+
+    def test_caching_headers(self, api_client, client_user, category, settings):
+        api_client.force_authenticate(user=client_user)
+        response = api_client.get(reverse('tag-list'))
+        assert response['ETag'].startswith('"')
+        assert response['Cache-Control'] == f"max-age={settings.REFERENCE_DATA['MAX_AGE']}, public"
+        assert 'Accept' in response['Vary']
+
+        settings.REFERENCE_DATA = {**settings.REFERENCE_DATA, 'PUBLIC': False}
+        response = api_client.get(reverse('tag-list'))
+        assert 'private' in response['Cache-Control']
+
+    def test_not_modified(self, api_client, client_user, category):
+        api_client.force_authenticate(user=client_user)
+        etag = api_client.get(reverse('category-list'))['ETag']
+        response = api_client.get(reverse('category-list'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+
+    def test_etag_depends_on_the_format(self, api_client, client_user, category):
+        api_client.force_authenticate(user=client_user)
+        json_etag = api_client.get(reverse('category-list'))['ETag']
+        msgpack_etag = api_client.get(reverse('category-list'), HTTP_ACCEPT='application/msgpack')['ETag']
+        assert json_etag != msgpack_etag
+
+    def test_saving_a_row_reloads_the_table(self, api_client, admin_user, category):
+        api_client.force_authenticate(user=admin_user)
+        etag = api_client.get(reverse('category-list'))['ETag']
+        api_client.post(reverse('category-list'), {'name': fake.word(), 'description': fake.text()})
+        response = api_client.get(reverse('category-list'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert response.data['count'] == 2
+
+        category.delete()
+        response = api_client.get(reverse('category-list'))
+        assert category.id not in [row['id'] for row in response.data['results']]
+
+    def test_version_changed_by_another_process(self, api_client, client_user, category, settings):
+        settings.REFERENCE_DATA = {**settings.REFERENCE_DATA, 'CHECK_INTERVAL': 0}
+        api_client.force_authenticate(user=client_user)
+        api_client.get(reverse('category-list'))
+        # Sends no signal, so the table is stale until the shared version changes
+        new_name = fake.word()
+        Category.objects.filter(pk=category.pk).update(name=new_name)
+        assert api_client.get(reverse('category-list')).data['results'][0]['name'] == category.name
+        cache.set(categories.version_key, uuid.uuid4().hex, None)
+        assert api_client.get(reverse('category-list')).data['results'][0]['name'] == new_name
+
+    def test_retrieve(self, api_client, client_user, category):
+        api_client.force_authenticate(user=client_user)
+        response = api_client.get(reverse('category-detail', kwargs={'pk': category.id}))
+        assert response.data['name'] == category.name
+        response = api_client.get(reverse('category-detail', kwargs={'pk': category.id + 1}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        response = api_client.get(reverse('category-detail', kwargs={'pk': 'abc'}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_rows_are_not_shared(self, category):
+        row = categories.get(category.id)
+        row.name = 'changed'
+        assert categories.get(category.id).name == category.name
+
+    def test_category_id_is_validated_from_the_cache(self, category):
+        categories.rows()
+        field = TenderSerializer().fields['category_id']
+        with CaptureQueriesContext(connection) as queries:
+            assert field.to_internal_value(category.id).pk == category.id
+            assert field.to_internal_value(str(category.id)).pk == category.id
+        assert len(queries) == 0
+
+        with pytest.raises(serializers.ValidationError) as error:
+            field.to_internal_value(category.id + 1)
+        assert error.value.detail == [f'Invalid pk "{category.id + 1}" - object does not exist.']
+        with pytest.raises(serializers.ValidationError) as error:
+            field.to_internal_value('abc')
+        assert error.value.detail == ['Incorrect type. Expected pk value, received str.']
+        with pytest.raises(serializers.ValidationError):
+            field.to_internal_value(True)
+
+    def test_rows_missing_from_the_cache_are_looked_up(self, api_client, client_user, category):
+        categories.rows()
+        # Created without a signal, as by a process whose version change isn't seen yet
+        created, = Category.objects.bulk_create([Category(name=fake.word(), description=fake.text())])
+        assert TenderSerializer().fields['category_id'].to_internal_value(created.id).pk == created.id
+        api_client.force_authenticate(user=client_user)
+        response = api_client.get(reverse('category-detail', kwargs={'pk': created.id}))
+        assert response.data['name'] == created.name
+
+    def test_per_process_cache_fails_the_checks(self, settings):
+        settings.DEBUG = False
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        assert [error.id for error in check_shared_cache(None)] == ['reference_data.E001']
+        settings.DEBUG = True
+        assert check_shared_cache(None) == []
+        settings.DEBUG = False
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'}}
+        assert check_shared_cache(None) == []
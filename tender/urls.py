@@ -4,7 +4,7 @@ from rest_framework_nested import routers
 from .views import (
     TenderViewSet, BidViewSet, ProjectViewSet, 
     ProjectActivityViewSet, TagViewSet, CategoryViewSet,
-    CommentViewSet
+    CommentViewSet, ClientDashboardView
 )
 
 router = DefaultRouter()
@@ -20,6 +20,7 @@ projects_router = routers.NestedSimpleRouter(router, r'projects', lookup='projec
 projects_router.register(r'activities', ProjectActivityViewSet, basename='project-activities')
 
 urlpatterns = [
+    path('dashboard/client/', ClientDashboardView.as_view(), name='client-dashboard'),
     path('', include(router.urls)),
     path('', include(projects_router.urls)),
 ]
\ No newline at end of file
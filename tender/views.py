@@ -3,40 +3,101 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import ValidationError, PermissionDenied
+from django.db import transaction
+from django.db.models import Count, Prefetch
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.utils import timezone
 
-from .models import Tender, Comment, Bid, Project, Tag, Category
+from outbox.events import make_event, publish, publish_many
+from tenderhubapi.pagination import EstimatedCountPagination
+from tenderhubapi.reference_data import ReferenceDataViewMixin, categories, tags
+
+from .models import Tender, Comment, Bid, Project, Tag, Category, ClientStats, MarketStats
 from .serializers import (
     TenderSerializer, TenderDetailSerializer, CommentSerializer, 
-    BidSerializer, ProjectSerializer, TagSerializer, CategorySerializer
+    BidSerializer, ProjectSerializer, TagSerializer, CategorySerializer,
+    ClientStatsSerializer, MarketStatsSerializer
 )
 from project_activity.models import ProjectActivity
 from project_activity.serializers import ProjectActivitySerializer
 from .permissions import IsClientOrReadOnly, IsVendorOrReadOnly, IsProjectParticipant
+from .sla import annotate_sla, due_within_condition, overdue_condition
+from .stats import count_overdue_projects, rebuild_client_stats
+
+def publish_bid_placed(bid, tender):
+    publish(
+        'bid.placed', bid,
+        tender_id=tender.tender_id, client_id=tender.client_id, vendor_id=bid.vendor_id, amount=bid.amount
+    )
+
+def publish_comment_added(comment, tender):
+    publish(
+        'comment.added', comment,
+        tender_id=tender.tender_id, client_id=tender.client_id, user_id=comment.user_id
+    )
+
+def publish_project_event(event_type, project, activity, **payload):
+    # Project events are published on the project, so they are ordered per project
+    publish(
+        event_type, project,
+        activity_id=activity.activity_id, activity_type=activity.activity_type, user_id=activity.user_id,
+        client_id=project.client_id, vendor_id=project.vendor_id, **payload
+    )
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Tag.objects.all()
+def market_stats_response(**lookup):
+    # Precomputed by `manage.py compute_market_stats`, so this is a single row lookup
+    stats = MarketStats.objects.filter(**lookup).first()
+    if stats is None:
+        return Response({"error": "No market stats computed yet"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(MarketStatsSerializer(stats).data)
+
+class TagViewSet(ReferenceDataViewMixin, viewsets.ReadOnlyModelViewSet):
+    # Listed and retrieved from the reference data cache, in the same order
+    queryset = Tag.objects.order_by('pk')
+    reference_table = tags
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticated]
+    
+    @action(detail=True, methods=['get'], url_path='market-stats')
+    def market_stats(self, request, pk=None):
+        return market_stats_response(tag_id=self.get_object().pk)
+
+def tender_queryset(params, detail=False):
+    """
+    Tenders filtered by the `status` and `tag` query parameters, loading all the
+    rows TenderSerializer (or TenderDetailSerializer with `detail`) reads, so
+    serializing them runs no query. Shared by TenderViewSet and the async views.
+    """
+    queryset = (
+        Tender.objects.select_related('client', 'category')
+        .prefetch_related('tags')
+        .annotate(bid_count=Count('bids', distinct=True))
+        # Meta.ordering doesn't apply to aggregated querysets
+        .order_by(*Tender._meta.ordering)
+    )
+    status = params.get('status')
+    tag = params.get('tag')
+    
+    if status:
+        queryset = queryset.filter(status=status)
+    
+    if tag:
+        queryset = queryset.filter(tags__name=tag)
+    
+    if detail:
+        queryset = queryset.prefetch_related(
+            Prefetch('bids', queryset=Bid.objects.select_related('vendor__vendor_stats')),
+            Prefetch('comments', queryset=Comment.objects.select_related('user')),
+        )
+    
+    return queryset
 
 class TenderViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsClientOrReadOnly]
     
     def get_queryset(self):
-        # Filter based on status, tags, etc. if provided in query params
-        queryset = Tender.objects.all()
-        status = self.request.query_params.get('status')
-        tag = self.request.query_params.get('tag')
-        
-        if status:
-            queryset = queryset.filter(status=status)
-        
-        if tag:
-            queryset = queryset.filter(tags__name=tag)
-            
-        return queryset
+        return tender_queryset(self.request.query_params, detail=self.action == 'retrieve')
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -44,7 +105,9 @@ class TenderViewSet(viewsets.ModelViewSet):
         return TenderSerializer
     
     def perform_create(self, serializer):
-        serializer.save(client=self.request.user)
+        with transaction.atomic():
+            tender = serializer.save(client=self.request.user)
+            publish('tender.created', tender, client_id=tender.client_id, category_id=tender.category_id)
     
     @action(detail=True, methods=['post'])
     def add_comment(self, request, pk=None):
@@ -52,7 +115,9 @@ class TenderViewSet(viewsets.ModelViewSet):
         serializer = CommentSerializer(data=request.data)
         
         if serializer.is_valid():
-            serializer.save(tender=tender, user=request.user)
+            with transaction.atomic():
+                comment = serializer.save(tender=tender, user=request.user)
+                publish_comment_added(comment, tender)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -68,13 +133,19 @@ class TenderViewSet(viewsets.ModelViewSet):
         if tender.status != 'open':
             return Response({"error": "Bids can only be placed on open tenders"}, status=status.HTTP_400_BAD_REQUEST)
         
+        # The sweeper closes expired tenders periodically, so the deadline is checked as well
+        if tender.deadline < timezone.localdate():
+            return Response({"error": "The deadline of this tender has passed"}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Check if vendor already placed a bid
         if Bid.objects.filter(tender=tender, vendor=request.user).exists():
             return Response({"error": "You already placed a bid on this tender"}, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = BidSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(tender=tender, vendor=request.user)
+            with transaction.atomic():
+                bid = serializer.save(tender=tender, vendor=request.user)
+                publish_bid_placed(bid, tender)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -84,7 +155,7 @@ class TenderViewSet(viewsets.ModelViewSet):
         bid_id = request.data.get('bid_id')
         
         # Ensure the tender belongs to the requesting user
-        if tender.client != request.user:
+        if tender.client_id != request.user.id:
             return Response({"error": "You can only accept bids on your own tenders"}, status=status.HTTP_403_FORBIDDEN)
         
         # Ensure tender is still open
@@ -92,78 +163,125 @@ class TenderViewSet(viewsets.ModelViewSet):
             return Response({"error": "Can only accept bids on open tenders"}, status=status.HTTP_400_BAD_REQUEST)
         
         bid = get_object_or_404(Bid, bid_id=bid_id, tender=tender)
-        bid.status = 'accepted'
-        bid.save()
-        
-        # Create a project
-        project = Project.objects.create(
-            tender=tender,
-            client=tender.client,
-            vendor=bid.vendor,
-            agreed_amount=bid.amount,
-            deadline=tender.deadline
-        )
         
-        # Change tender status
-        tender.status = 'in_progress'
-        tender.save()
+        with transaction.atomic():
+            bid.status = 'accepted'
+            bid.save()
+            
+            # Create a project
+            project = Project.objects.create(
+                tender=tender,
+                client=tender.client,
+                vendor=bid.vendor,
+                agreed_amount=bid.amount,
+                deadline=tender.deadline
+            )
+            
+            # Change tender status
+            tender.status = 'in_progress'
+            tender.save()
+            
+            publish(
+                'bid.accepted', bid,
+                tender_id=tender.tender_id, client_id=tender.client_id, vendor_id=bid.vendor_id,
+                project_id=project.project_id, amount=bid.amount
+            )
         
+        project = annotate_sla(Project.objects.all()).get(pk=project.pk)
         return Response(ProjectSerializer(project).data, status=status.HTTP_201_CREATED)
 
 class BidViewSet(viewsets.ModelViewSet):
     serializer_class = BidSerializer
+    pagination_class = EstimatedCountPagination
     permission_classes = [IsAuthenticated, IsVendorOrReadOnly]
     
     def get_queryset(self):
         user = self.request.user
         
+        # The vendor's stats are part of every serialized bid
+        queryset = Bid.objects.select_related('vendor__vendor_stats')
+        
         # Vendors can only see their own bids
         if user.is_vendor:
-            return Bid.objects.filter(vendor=user)
+            return queryset.filter(vendor=user)
         
         # Clients can see all bids on their tenders
         if user.is_client:
-            return Bid.objects.filter(tender__client=user)
+            return queryset.filter(tender__client=user)
         
         return Bid.objects.none()
     
     def perform_create(self, serializer):
         tender_id = self.request.data.get('tender')
         tender = get_object_or_404(Tender, tender_id=tender_id)
-        serializer.save(tender=tender, vendor=self.request.user)
+        with transaction.atomic():
+            bid = serializer.save(tender=tender, vendor=self.request.user)
+            publish_bid_placed(bid, tender)
 
 class ProjectViewSet(viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated, IsProjectParticipant]
     
     def get_queryset(self):
-        user = self.request.user
         # Users can see projects where they are either the client or the vendor
-        return Project.objects.filter(Q(client=user) | Q(vendor=user))
+        queryset = IsProjectParticipant.scope_queryset(self.request, Project.objects.all(), self)
+        today = timezone.localdate()
+        overdue = self.request.query_params.get('overdue')
+        due_within = self.request.query_params.get('due_within')
+        
+        if overdue is not None:
+            if overdue not in ('true', 'false'):
+                raise ValidationError({"overdue": "Must be either 'true' or 'false'"})
+            condition = overdue_condition(today)
+            queryset = queryset.filter(condition) if overdue == 'true' else queryset.exclude(condition)
+        
+        if due_within is not None:
+            try:
+                days = int(due_within)
+            except ValueError:
+                days = -1
+            if days < 0:
+                raise ValidationError({"due_within": "Must be a non-negative number of days"})
+            queryset = queryset.filter(due_within_condition(today, days))
+        
+        # Schedule progress and overdue state are computed by the database
+        return annotate_sla(queryset, today)
+    
+    def get_updated_project(self, project):
+        # Re-reads the project so the schedule annotations reflect the update. Not through
+        # get_queryset(), as the update may have moved it out of the request's filters.
+        return annotate_sla(Project.objects.filter(pk=project.pk), timezone.localdate()).get()
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_updated_project(serializer.instance)
     
     @action(detail=True, methods=['post'])
     def request_revision(self, request, pk=None):
         project = self.get_object()
         
         # Only clients can request revisions
-        if request.user != project.client:
+        if request.user.id != project.client_id:
             return Response({"error": "Only clients can request revisions"}, status=status.HTTP_403_FORBIDDEN)
         
         if project.status != 'in_progress':
             return Response({"error": "Revisions can only be requested for in-progress projects"}, 
                             status=status.HTTP_400_BAD_REQUEST)
         
-        # Update project status
-        project.status = 'revision_requested'
-        project.save()
-        
-        # Record activity
-        activity = ProjectActivity.objects.create(
-            project=project,
-            user=request.user,
-            activity_type='revision_request',
-            description=request.data.get('description', 'Revision requested')
-        )
+        with transaction.atomic():
+            # Update project status
+            project.status = 'revision_requested'
+            project.save()
+            
+            # Record activity
+            activity = ProjectActivity.objects.create(
+                project=project,
+                user=request.user,
+                activity_type='revision_request',
+                description=request.data.get('description', 'Revision requested')
+            )
+            
+            publish_project_event('project.revision_requested', project, activity)
         
         return Response(ProjectActivitySerializer(activity).data, status=status.HTTP_201_CREATED)
     
@@ -172,17 +290,20 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project = self.get_object()
         
         # Only vendors can deliver projects
-        if request.user != project.vendor:
+        if request.user.id != project.vendor_id:
             return Response({"error": "Only vendors can deliver projects"}, status=status.HTTP_403_FORBIDDEN)
         
-        # Create delivery activity
-        activity = ProjectActivity.objects.create(
-            project=project,
-            user=request.user,
-            activity_type='delivery',
-            description=request.data.get('description', 'Project delivered'),
-            attachment=request.FILES.get('attachment')
-        )
+        with transaction.atomic():
+            # Create delivery activity
+            activity = ProjectActivity.objects.create(
+                project=project,
+                user=request.user,
+                activity_type='delivery',
+                description=request.data.get('description', 'Project delivered'),
+                attachment=request.FILES.get('attachment')
+            )
+            
+            publish_project_event('project.delivered', project, activity)
         
         return Response(ProjectActivitySerializer(activity).data, status=status.HTTP_201_CREATED)
     
@@ -191,26 +312,29 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project = self.get_object()
         
         # Only clients can complete projects
-        if request.user != project.client:
+        if request.user.id != project.client_id:
             return Response({"error": "Only clients can complete projects"}, status=status.HTTP_403_FORBIDDEN)
         
-        # Update project status
-        project.status = 'completed'
-        project.save()
-        
-        # Update tender status
-        project.tender.status = 'completed'
-        project.tender.save()
-        
-        # Record activity
-        activity = ProjectActivity.objects.create(
-            project=project,
-            user=request.user,
-            activity_type='project_completion',
-            description=request.data.get('description', 'Project marked as completed')
-        )
+        with transaction.atomic():
+            # Update project status
+            project.status = 'completed'
+            project.save()
+            
+            # Update tender status
+            project.tender.status = 'completed'
+            project.tender.save()
+            
+            # Record activity
+            activity = ProjectActivity.objects.create(
+                project=project,
+                user=request.user,
+                activity_type='project_completion',
+                description=request.data.get('description', 'Project marked as completed')
+            )
+            
+            publish_project_event('project.completed', project, activity)
         
-        return Response(ProjectSerializer(project).data)
+        return Response(ProjectSerializer(self.get_updated_project(project)).data)
     
     @action(detail=True, methods=['post'])
     def update_price(self, request, pk=None):
@@ -223,19 +347,22 @@ class ProjectViewSet(viewsets.ModelViewSet):
         # Record old price
         old_price = project.agreed_amount
         
-        # Update price
-        project.agreed_amount = new_price
-        project.save()
-        
-        # Record activity
-        activity = ProjectActivity.objects.create(
-            project=project,
-            user=request.user,
-            activity_type='price_change',
-            description=f"Price updated from {old_price} to {new_price}",
-            old_price=old_price,
-            new_price=new_price
-        )
+        with transaction.atomic():
+            # Update price
+            project.agreed_amount = new_price
+            project.save()
+            
+            # Record activity
+            activity = ProjectActivity.objects.create(
+                project=project,
+                user=request.user,
+                activity_type='price_change',
+                description=f"Price updated from {old_price} to {new_price}",
+                old_price=old_price,
+                new_price=new_price
+            )
+            
+            publish_project_event('project.price_changed', project, activity, old_price=old_price, new_price=new_price)
         
         return Response(ProjectSerializer(project).data)
     
@@ -250,46 +377,65 @@ class ProjectViewSet(viewsets.ModelViewSet):
         # Record old deadline
         old_deadline = project.deadline
         
-        # Update deadline
-        project.deadline = new_deadline
-        project.save()
-        
-        # Record activity
-        activity = ProjectActivity.objects.create(
-            project=project,
-            user=request.user,
-            activity_type='deadline_change',
-            description=f"Deadline updated from {old_deadline} to {new_deadline}",
-            old_deadline=old_deadline,
-            new_deadline=new_deadline
-        )
+        with transaction.atomic():
+            # Update deadline
+            project.deadline = new_deadline
+            project.save()
+            
+            # Record activity
+            activity = ProjectActivity.objects.create(
+                project=project,
+                user=request.user,
+                activity_type='deadline_change',
+                description=f"Deadline updated from {old_deadline} to {new_deadline}",
+                old_deadline=old_deadline,
+                new_deadline=new_deadline
+            )
+            
+            publish_project_event(
+                'project.deadline_changed', project, activity, old_deadline=old_deadline, new_deadline=new_deadline
+            )
         
-        return Response(ProjectSerializer(project).data)
+        return Response(ProjectSerializer(self.get_updated_project(project)).data)
 
 class ProjectActivityViewSet(viewsets.ModelViewSet):
     serializer_class = ProjectActivitySerializer
     permission_classes = [IsAuthenticated, IsProjectParticipant]
+    pagination_class = EstimatedCountPagination
+    participant_fields = ('project__client', 'project__vendor')
+    
+    def get_project_participants(self, project_id):
+        # Only the participant ids are needed to authorize the request
+        return get_object_or_404(
+            Project.objects.values_list('client_id', 'vendor_id'), project_id=project_id
+        )
     
     def get_queryset(self):
         project_id = self.kwargs.get('project_pk')
         if project_id:
-            project = get_object_or_404(Project, project_id=project_id)
-            if project.client == self.request.user or project.vendor == self.request.user:
-                return ProjectActivity.objects.filter(project=project)
+            if self.request.user.id in self.get_project_participants(project_id):
+                return ProjectActivity.objects.filter(project_id=project_id).select_related('project')
         return ProjectActivity.objects.none()
     
     def perform_create(self, serializer):
         project_id = self.kwargs.get('project_pk')
-        project = get_object_or_404(Project, project_id=project_id)
         
         # Check if user is part of this project
-        if project.client != self.request.user and project.vendor != self.request.user:
-            raise permissions.PermissionDenied("You're not part of this project")
-        
-        serializer.save(project=project, user=self.request.user)
+        client_id, vendor_id = self.get_project_participants(project_id)
+        if self.request.user.id not in (client_id, vendor_id):
+            raise PermissionDenied("You're not part of this project")
+        
+        with transaction.atomic():
+            activity = serializer.save(project_id=int(project_id), user=self.request.user)
+            publish_many([make_event(
+                'project.activity_added', Project, activity.project_id,
+                activity_id=activity.activity_id, activity_type=activity.activity_type, user_id=activity.user_id,
+                client_id=client_id, vendor_id=vendor_id
+            )])
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ReferenceDataViewMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
+    reference_table = categories
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -297,9 +443,14 @@ class CategoryViewSet(viewsets.ModelViewSet):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAdminUser()]
         return super().get_permissions()
+    
+    @action(detail=True, methods=['get'], url_path='market-stats')
+    def market_stats(self, request, pk=None):
+        return market_stats_response(category_id=self.get_object().pk)
 
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    pagination_class = EstimatedCountPagination
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
@@ -311,11 +462,13 @@ class CommentViewSet(viewsets.ModelViewSet):
         user = self.request.user
         tender_id = self.request.query_params.get('tender_id', None)
         
+        # The author is part of every serialized comment
+        queryset = Comment.objects.select_related('user')
         if tender_id:
-            return Comment.objects.filter(tender__tender_id=tender_id)
+            return queryset.filter(tender__tender_id=tender_id)
         
         # Default: tampilkan komentar yang dibuat oleh pengguna saat ini
-        return Comment.objects.filter(user=user)
+        return queryset.filter(user=user)
     
     def perform_create(self, serializer):
         """
@@ -326,14 +479,16 @@ class CommentViewSet(viewsets.ModelViewSet):
             raise ValidationError({"tender_id": "Parameter tender_id wajib diisi"})
             
         tender = get_object_or_404(Tender, tender_id=tender_id)
-        serializer.save(tender=tender, user=self.request.user)
+        with transaction.atomic():
+            comment = serializer.save(tender=tender, user=self.request.user)
+            publish_comment_added(comment, tender)
     
     def update(self, request, *args, **kwargs):
         """
         Pastikan pengguna hanya dapat mengedit komentar mereka sendiri
         """
         comment = self.get_object()
-        if comment.user != request.user:
+        if comment.user_id != request.user.id:
             return Response(
                 {"error": "Anda hanya dapat mengedit komentar Anda sendiri"}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -345,9 +500,29 @@ class CommentViewSet(viewsets.ModelViewSet):
         Pastikan pengguna hanya dapat menghapus komentar mereka sendiri
         """
         comment = self.get_object()
-        if comment.user != request.user:
+        if comment.user_id != request.user.id:
             return Response(
                 {"error": "Anda hanya dapat menghapus komentar Anda sendiri"}, 
                 status=status.HTTP_403_FORBIDDEN
             )
-        return super().destroy(request, *args, **kwargs)
\ No newline at end of file
+        return super().destroy(request, *args, **kwargs)
+
+class ClientDashboardView(APIView):
+    """
+    Dashboard stats of the requesting client, read from the ClientStats rollup.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        if not request.user.is_client:
+            return Response({"error": "Only clients have a dashboard"}, status=status.HTTP_403_FORBIDDEN)
+        
+        stats = ClientStats.objects.filter(client_id=request.user.id).first()
+        if stats is None:
+            rebuild_client_stats([request.user.id])
+            stats = ClientStats.objects.get(client_id=request.user.id)
+        
+        serializer = ClientStatsSerializer(
+            stats, context={'overdue_projects': count_overdue_projects(request.user.id)}
+        )
+        return Response(serializer.data)
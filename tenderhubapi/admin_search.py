@@ -0,0 +1,99 @@
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.text import smart_split, unescape_string_literal
+
+
+class AutocompleteSearchMixin:
+    """
+    ModelAdmin mixin that uses `autocomplete_search_fields` for the admin's
+    autocomplete lookups instead of `search_fields`.
+
+    Autocomplete widgets search on every keystroke, so these fields should be
+    prefix lookups (`^field`) backed by an index on `UPPER(field::text)` with
+    `text_pattern_ops`, which is what PostgreSQL needs for `istartswith`.
+    These are plain btree indexes declared on the models, while the substring
+    search of `TrigramSearchMixin` needs the trigram indexes of
+    `create_search_indexes`.
+    """
+    autocomplete_search_fields = ()
+
+    def get_search_fields(self, request):
+        resolver_match = getattr(request, 'resolver_match', None)
+        if self.autocomplete_search_fields and resolver_match and resolver_match.view_name == 'admin:autocomplete':
+            return self.autocomplete_search_fields
+        return super().get_search_fields(request)
+
+
+def split_search_field(field_name):
+    """Returns the (lookup, path) of an admin search field such as '^tender__title'."""
+    lookups = {'^': 'istartswith', '=': 'iexact'}
+    if field_name[:1] in lookups:
+        return lookups[field_name[0]], field_name[1:]
+    return 'icontains', field_name
+
+
+def resolve_search_path(model, path):
+    """
+    Follows a search path like 'project__tender__title' and returns the list of
+    relation fields that were traversed and the model field it ends on.
+    """
+    relations = []
+    *relation_names, field_name = path.split(LOOKUP_SEP)
+    for name in relation_names:
+        field = model._meta.get_field(name)
+        relations.append(field)
+        model = field.related_model
+    return relations, model._meta.get_field(field_name)
+
+
+def matching_pks(model, path, lookup, term):
+    """
+    Returns a values('pk') queryset of the rows of `model` matching one search
+    field and term.
+
+    Instead of joining the related tables, every relation is turned into an
+    `__in` subquery on that table, so each table is searched with its own
+    trigram index and each step back is an index lookup on the foreign key.
+    """
+    manager = model._default_manager
+    name, _, rest = path.partition(LOOKUP_SEP)
+    if not rest:
+        return manager.filter(**{f'{name}__{lookup}': term}).order_by().values('pk')
+
+    field = model._meta.get_field(name)
+    matches = matching_pks(field.related_model, rest, lookup, term)
+    if field.many_to_one or (field.one_to_one and field.concrete):
+        return manager.filter(**{f'{field.attname}__in': matches}).order_by().values('pk')
+    # Multi-valued relations would duplicate rows, the UNION below removes them
+    return manager.filter(**{f'{name}__in': matches}).order_by().values('pk')
+
+class TrigramSearchMixin:
+    """
+    ModelAdmin mixin for searching large tables through `pg_trgm` GIN indexes.
+
+    Every `search_fields` entry that crosses a relation is searched through a
+    subquery on the related table instead of a join, so `ILIKE '%term%'` can use
+    the `UPPER(column::text) gin_trgm_ops` index of each table. The indexes are
+    created with `python manage.py create_search_indexes`.
+
+    The primary keys matching a term are the UNION of one lookup per search
+    field, each answered by an index. OR-ing the fields' conditions instead
+    makes PostgreSQL scan the whole table, as it can't combine `IN (subquery)`
+    conditions with a BitmapOr.
+
+    The changelist also skips the unfiltered "N total" count, which is a full
+    table count on every search.
+    """
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = self.get_search_fields(request)
+        if not search_fields or not search_term:
+            return queryset, False
+
+        fields = [split_search_field(str(field)) for field in search_fields]
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            first, *others = [matching_pks(queryset.model, path, lookup, bit) for lookup, path in fields]
+            queryset = queryset.filter(pk__in=first.union(*others) if others else first)
+        return queryset, False
@@ -0,0 +1,129 @@
+"""
+Native async read endpoints, served under /api/v1/async/.
+
+DRF views are synchronous, so under ASGI each of their requests is handed to a
+worker thread. `AsyncReadView` answers in the event loop instead, and behaves
+like the DRF view it mirrors:
+- it authenticates with the same JWT, or the session
+- it applies the same permission classes
+- it renders the same serializers with the same renderers, chosen from the
+  Accept header
+- it paginates like PageNumberPagination
+
+Lazy loading isn't allowed in async code, so the querysets must load every row
+their serializer reads (see e.g. tender.views.tender_queryset).
+"""
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework.utils.mediatypes import media_type_matches, order_by_precedence
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import exception_handler
+
+from users.authentication import AsyncJWTAuthentication
+
+class AsyncReadView(View):
+    http_method_names = ['get', 'head']
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    authentication = AsyncJWTAuthentication()
+    # The browsable API needs a DRF view
+    renderers = [
+        renderer_class() for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES
+        if renderer_class.media_type != 'text/html'
+    ]
+    page_size = api_settings.PAGE_SIZE
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.renderer = self.renderers[0]
+        try:
+            request.renderer = self.select_renderer(request)
+            await self.authenticate(request)
+            self.check_permissions(request)
+            if request.method.lower() not in self.http_method_names:
+                raise exceptions.MethodNotAllowed(request.method)
+            data = await self.get(request, *args, **kwargs)
+        except (exceptions.APIException, Http404) as exc:
+            return self.handle_exception(request, exc)
+        return self.render(request, data)
+
+    def select_renderer(self, request):
+        """Returns the renderer of the Accept header, like DRF's DefaultContentNegotiation."""
+        accepts = [token.strip() for token in request.META.get('HTTP_ACCEPT', '*/*').split(',')]
+        for media_type_set in order_by_precedence(accepts):
+            for renderer in self.renderers:
+                for media_type in media_type_set:
+                    if media_type_matches(renderer.media_type, media_type):
+                        return renderer
+        raise exceptions.NotAcceptable(available_renderers=self.renderers)
+
+    async def authenticate(self, request):
+        result = await self.authentication.aauthenticate(request)
+        if result is not None:
+            request.user, request.auth = result
+        else:
+            # Session authentication, as set up by AuthenticationMiddleware
+            request.user, request.auth = await request.auser(), None
+
+    def check_permissions(self, request):
+        for permission_class in self.permission_classes:
+            permission = permission_class()
+            if not permission.has_permission(request, self):
+                self.permission_denied(request, permission)
+
+    def check_object_permissions(self, request, obj):
+        for permission_class in self.permission_classes:
+            permission = permission_class()
+            if not permission.has_object_permission(request, self, obj):
+                self.permission_denied(request, permission)
+
+    def permission_denied(self, request, permission):
+        if not request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        raise exceptions.PermissionDenied(
+            getattr(permission, 'message', None), code=getattr(permission, 'code', None)
+        )
+
+    def handle_exception(self, request, exc):
+        headers = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            headers['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+        response = exception_handler(exc, {'view': self, 'request': request})
+        return self.render(request, response.data, status=response.status_code, headers=headers)
+
+    def render(self, request, data, status=200, headers=None):
+        renderer = request.renderer
+        return HttpResponse(
+            renderer.render(data, renderer.media_type), status=status, headers=headers,
+            content_type=renderer.media_type,
+        )
+
+    def serializer_context(self, request):
+        return {'request': request, 'view': self}
+
+    async def paginate(self, request, queryset, serializer_class):
+        """Returns the page of the `page` query parameter, like PageNumberPagination."""
+        try:
+            number = int(request.GET.get('page', 1))
+        except ValueError:
+            number = 0
+        count = await queryset.acount()
+        last = max((count + self.page_size - 1) // self.page_size, 1)
+        if not 1 <= number <= last:
+            raise exceptions.NotFound("Invalid page.")
+
+        offset = (number - 1) * self.page_size
+        rows = [row async for row in queryset[offset:offset + self.page_size]]
+        url = request.build_absolute_uri()
+        if number == 1:
+            previous = None
+        elif number == 2:
+            previous = remove_query_param(url, 'page')
+        else:
+            previous = replace_query_param(url, 'page', number - 1)
+        return {
+            'count': count,
+            'next': replace_query_param(url, 'page', number + 1) if number < last else None,
+            'previous': previous,
+            'results': serializer_class(rows, many=True, context=self.serializer_context(request)).data,
+        }
@@ -0,0 +1,244 @@
+"""
+Compiled read path of serializers, for the rows of hot list endpoints.
+
+DRF serializes each field of each row through `field.get_attribute()` and
+`field.to_representation()`, which walk the source path, handle defaults and
+dispatch on the field type every time. `compile_serializer()` does that work
+once per serializer and returns a plain function of a model instance, which
+reads every field with a pre-resolved getter and converts it only when the
+field type requires it. Its output is the same as `serializer.data`.
+
+Fields are compiled when their behaviour is known:
+- read-only, char, integer, boolean, choice, decimal, date and datetime fields
+- primary key related fields, read from the foreign key column
+- method fields, bound to the serializer once
+- nested serializers and lists of them, compiled in turn; prefetched rows are
+  read from the prefetch cache
+
+Any other field, and any source that is a method or that cannot be read (a
+null relation, a missing one-to-one row), goes through DRF's own
+`get_attribute()` and `to_representation()`, so the result never differs.
+
+Set `CompiledListSerializer` as the `list_serializer_class` of a
+ModelSerializer to use the compiled function wherever it is serialized with
+`many=True`. Querysets should still select and prefetch the related rows the
+serializer reads, as the compiled function reads them the same way.
+"""
+import inspect
+from datetime import date
+from decimal import Decimal
+from operator import attrgetter
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.settings import ISO_8601, api_settings
+
+def slow_getter(field):
+    """Reads the field like DRF does, raising SkipField when it's omitted."""
+    return field.get_attribute
+
+def path_getter(field, path):
+    """Reads a plain attribute path, falling back to DRF when a step is missing or null."""
+    get = attrgetter(path)
+    fallback = field.get_attribute
+
+    def getter(instance):
+        try:
+            return get(instance)
+        except (AttributeError, ObjectDoesNotExist):
+            return fallback(instance)
+    return getter
+
+def prefetched_getter(field, attr):
+    """Reads the rows prefetched for a to-many relation, without creating its manager."""
+    fallback = path_getter(field, attr)
+
+    def getter(instance):
+        try:
+            return instance._prefetched_objects_cache[attr]
+        except (AttributeError, KeyError):
+            return fallback(instance)
+    return getter
+
+def is_to_many(model, attr):
+    try:
+        model_field = model._meta.get_field(attr)
+    except Exception:
+        return False
+    # Reverse many-to-many relations are prefetched under their query name instead
+    return model_field.one_to_many or (model_field.many_to_many and not model_field.auto_created)
+
+def is_plain_path(model, attrs):
+    """
+    True if every attribute of the source path is a stored value or a relation
+    of `model`, i.e. none of them is a method DRF would call.
+    """
+    for index, attr in enumerate(attrs):
+        if model is None:
+            return False
+        static = inspect.getattr_static(model, attr, None)
+        if callable(static):
+            return False
+        if index == len(attrs) - 1:
+            return True
+        try:
+            model = model._meta.get_field(attr).related_model
+        except Exception:
+            return False
+    return bool(attrs)
+
+def datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+    slow = field.to_representation
+
+    def convert(value):
+        if not value or isinstance(value, str) or value.utcoffset() is None:
+            return slow(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+def date_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    slow = field.to_representation
+
+    def convert(value):
+        if value.__class__ is date:
+            return value.isoformat()
+        return slow(value)
+    return convert
+
+def decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+    exponent = -field.decimal_places
+    max_digits = field.max_digits
+    slow = field.to_representation
+
+    def convert(value):
+        # Values read from a column of the field's precision need no rounding
+        if value.__class__ is Decimal:
+            sign, digits, value_exponent = value.as_tuple()
+            if value_exponent == exponent and (max_digits is None or len(digits) <= max_digits):
+                return '{:f}'.format(value)
+        return slow(value)
+    return convert
+
+def choice_converter(field):
+    lookup = field.choice_strings_to_values.get
+    slow = field.to_representation
+
+    def convert(value):
+        if value.__class__ is str and value:
+            return lookup(value, value)
+        return slow(value)
+    return convert
+
+def boolean_converter(field):
+    slow = field.to_representation
+
+    def convert(value):
+        if value.__class__ is bool:
+            return value
+        return slow(value)
+    return convert
+
+CONVERTERS = {
+    serializers.ReadOnlyField: lambda field: None,
+    serializers.CharField: lambda field: str,
+    serializers.IntegerField: lambda field: int,
+    serializers.BooleanField: boolean_converter,
+    serializers.ChoiceField: choice_converter,
+    serializers.DecimalField: decimal_converter,
+    serializers.DateTimeField: datetime_converter,
+    serializers.DateField: date_converter,
+}
+
+def has_default_representation(field, *bases):
+    return any(type(field).to_representation is base.to_representation for base in bases)
+
+def compile_field(field, model):
+    """Returns (getter, converter) of a readable field; the converter is None when the value is used as is."""
+    attrs = field.source_attrs
+
+    if isinstance(field, serializers.SerializerMethodField):
+        # The method gets the whole instance, and its result is used as is
+        return getattr(field.parent, field.method_name), None
+
+    if isinstance(field, serializers.ListSerializer) and has_default_representation(
+        field, serializers.ListSerializer, CompiledListSerializer
+    ):
+        serialize = compile_serializer(field.child)
+
+        def convert(data):
+            iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+            return [serialize(item) for item in iterable]
+        if len(attrs) == 1 and is_plain_path(model, attrs) and is_to_many(model, attrs[0]):
+            return prefetched_getter(field, attrs[0]), convert
+    elif isinstance(field, serializers.Serializer) and has_default_representation(field, serializers.Serializer):
+        convert = compile_serializer(field)
+    elif (
+        type(field) is serializers.PrimaryKeyRelatedField and field.pk_field is None
+        and len(attrs) == 1 and is_plain_path(model, attrs)
+    ):
+        try:
+            model_field = model._meta.get_field(attrs[0])
+        except Exception:
+            model_field = None
+        if isinstance(model_field, models.ForeignKey):
+            # The primary key is the foreign key column, no related row is read
+            return attrgetter(model_field.attname), None
+        return slow_getter(field), field.to_representation
+    elif type(field) in CONVERTERS:
+        convert = CONVERTERS[type(field)](field)
+    else:
+        convert = field.to_representation
+
+    if not attrs:
+        # source='*' passes the whole instance
+        return (lambda instance: instance), convert
+    if is_plain_path(model, attrs):
+        return path_getter(field, '.'.join(attrs)), convert
+    return slow_getter(field), convert
+
+def compile_serializer(serializer):
+    """
+    Returns a function serializing one instance like `serializer.to_representation()`.
+    The serializer must be bound to its context already, as it's read once.
+    """
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    fields = []
+    for field in serializer._readable_fields:
+        getter, convert = compile_field(field, model)
+        fields.append((field.field_name, getter, convert))
+    fields = tuple(fields)
+
+    def serialize(instance):
+        data = {}
+        for name, getter, convert in fields:
+            try:
+                value = getter(instance)
+            except SkipField:
+                continue
+            data[name] = value if value is None or convert is None else convert(value)
+        return data
+    return serialize
+
+class CompiledListSerializer(serializers.ListSerializer):
+    """A ListSerializer that serializes its rows with `compile_serializer()`."""
+    def to_representation(self, data):
+        if not hasattr(self, '_serialize'):
+            self._serialize = compile_serializer(self.child)
+        serialize = self._serialize
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return [serialize(item) for item in iterable]
@@ -0,0 +1,196 @@
+"""
+Compression of responses, with brotli or gzip.
+
+`CompressionMiddleware` replaces Django's GZipMiddleware:
+- brotli is preferred when the client accepts it and brotli is installed
+  (pinned in requirements.txt), else gzip
+- responses under COMPRESSION['MIN_SIZE'] bytes are sent as is
+- streaming responses, sync or async, are compressed chunk by chunk and each
+  chunk is flushed, so the client receives the rows as they are produced
+
+The middleware normalizes the request's Accept-Encoding header to the coding
+it chose ('br', 'gzip' or ''). Behind a response cache, such as Django's
+UpdateCacheMiddleware/FetchFromCacheMiddleware placed around it, that keeps
+one cache entry per coding instead of one per distinct browser header. The
+entry holds the compressed response, so a cache hit is not compressed again.
+
+HTML responses are sent uncompressed. The admin's pages carry the CSRF token
+next to reflected input, such as the changelist search, which is what the
+BREACH attack needs to recover the token from the compressed size. The API's
+JSON and MessagePack responses carry no such secret. gzip output still gets
+the same random padding as Django's GZipMiddleware.
+"""
+import secrets
+from gzip import GzipFile
+from io import BytesIO
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# As in Django's GZipMiddleware
+MAX_RANDOM_BYTES = 100
+
+def accepted_encodings(header):
+    """Returns {coding: quality} of an Accept-Encoding header."""
+    encodings = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[coding] = quality
+    return encodings
+
+def preferred_encoding(header):
+    """
+    Returns the coding to compress with: the supported coding of highest quality
+    in the header, brotli winning ties, or '' when none is accepted.
+    """
+    encodings = accepted_encodings(header)
+    wildcard = encodings.get('*', 0.0)
+    best, best_quality = '', 0.0
+    for coding in PREFERENCE:
+        if coding not in CODINGS:
+            continue
+        quality = encodings.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+class GzipCompressor:
+    """Compresses a stream into one gzip member, flushed after every chunk."""
+    def __init__(self):
+        self.buffer = BytesIO()
+        # The random-length file name is Django's mitigation of BREACH
+        self.file = GzipFile(
+            filename='a' * secrets.randbelow(MAX_RANDOM_BYTES), mode='wb', compresslevel=6,
+            fileobj=self.buffer, mtime=0,
+        )
+
+    def read(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def compress(self, chunk):
+        self.file.write(chunk)
+        self.file.flush()
+        return self.read()
+
+    def finish(self):
+        self.file.close()
+        return self.read()
+
+class BrotliCompressor:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=settings.COMPRESSION['BROTLI_QUALITY'])
+
+    def compress(self, chunk):
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+def gzip_compress(content):
+    return compress_string(content, max_random_bytes=MAX_RANDOM_BYTES)
+
+def brotli_compress(content):
+    return brotli.compress(content, quality=settings.COMPRESSION['BROTLI_QUALITY'])
+
+PREFERENCE = ('br', 'gzip')
+
+# {coding: (compress, compressor class)} of the available codings
+CODINGS = {}
+if brotli is not None:
+    CODINGS['br'] = (brotli_compress, BrotliCompressor)
+CODINGS['gzip'] = (gzip_compress, GzipCompressor)
+
+def compress_stream(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+async def acompress_stream(chunks, compressor):
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        coding = self.normalize(request)
+        return self.compress(coding, self.get_response(request))
+
+    async def __acall__(self, request):
+        coding = self.normalize(request)
+        return self.compress(coding, await self.get_response(request))
+
+    def normalize(self, request):
+        coding = preferred_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        request.META['HTTP_ACCEPT_ENCODING'] = coding
+        return coding
+
+    def compress(self, coding, response):
+        # It's not worth compressing what fits in a packet or two anyway
+        if not response.streaming and len(response.content) < settings.COMPRESSION['MIN_SIZE']:
+            return response
+        if response.has_header('Content-Encoding') or 'no-transform' in response.get('Cache-Control', ''):
+            return response
+        # Against BREACH, see above
+        if response.get('Content-Type', '').startswith('text/html'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not coding:
+            return response
+        compress, compressor_class = CODINGS[coding]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, compressor_class())
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, compressor_class())
+            # The compressed size is only known once it's streamed
+            del response.headers['Content-Length']
+        else:
+            compressed = compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # A strong ETag is made weak, as the body isn't the same bytes anymore
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,50 @@
+"""
+Usage metrics of the database connections, see settings.DB_CONNECTIONS.
+
+Connections are kept per process (and per thread, outside of the 'pool' mode),
+so the metrics describe the process that collects them. `connections_opened`
+counts the connections Django set up, which in the 'pool' mode are checkouts
+from the pool; the pool's own statistics, including the time spent waiting for
+a connection (`requests_wait_ms`) and using them (`usage_ms`), are under `pool`.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_lock = threading.Lock()
+_counts = Counter()
+
+def count_connection(sender, connection, **kwargs):
+    with _lock:
+        _counts[connection.alias] += 1
+
+def count_request(sender, **kwargs):
+    with _lock:
+        _counts[None] += 1
+
+connection_created.connect(count_connection, dispatch_uid='db_connections.count_connection')
+request_started.connect(count_request, dispatch_uid='db_connections.count_request')
+
+def connection_stats():
+    with _lock:
+        counts = _counts.copy()
+    databases = {}
+    for alias in connections:
+        connection = connections[alias]
+        stats = {
+            'connections_opened': counts[alias],
+            'max_age': connection.settings_dict['CONN_MAX_AGE'],
+        }
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            stats['pool'] = pool.get_stats()
+        databases[alias] = stats
+    return {
+        'mode': settings.DB_CONNECTIONS['MODE'],
+        'requests': counts[None],
+        'databases': databases,
+    }
@@ -0,0 +1,218 @@
+"""
+Routing of reads to the read replicas listed in READ_REPLICAS['ALIASES'].
+
+The reads of GET, HEAD and OPTIONS requests go to one healthy replica, chosen
+once per request. Everything else goes to the primary:
+- writes
+- reads of other requests
+- reads outside of a request, such as management commands and workers
+- reads that follow a write in the same request
+- reads inside read_from_primary(), whose results are written back, such as
+  the rebuild of a missing counter or stats row
+
+When a request has written, its client is pinned to the primary for
+READ_REPLICAS['PIN_SECONDS']. The pin is kept in a cookie and in a cache key for
+the user, so the client never reads a replica that has not replayed its own
+writes yet. The user is only known once DRF has authenticated the request, so
+the authentication lookup itself may still be served by a replica.
+
+Each process checks a replica at most every CHECK_INTERVAL seconds. A replica
+that cannot be reached, or whose replay lag is over MAX_LAG seconds, is skipped
+until its next check.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# A standby that has replayed all the WAL it received is up to date even when
+# its last replayed transaction is old, i.e. when the primary is idle.
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_request_state = ContextVar('replica_request_state', default=None)
+_primary_reads = ContextVar('replica_primary_reads', default=False)
+
+def replica_lag(alias):
+    """Returns how many seconds the replica is behind the primary."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+@contextmanager
+def read_from_primary():
+    """
+    Routes the reads of the block to the primary. A value computed from a
+    lagging replica and written to the primary would overwrite newer data.
+    """
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+class ReplicaHealth:
+    """Per-process record of the replicas' health, refreshed every CHECK_INTERVAL seconds."""
+    def __init__(self):
+        self._checks = {}
+
+    def check(self, alias):
+        """Returns (healthy, lag in seconds) of a replica."""
+        try:
+            lag = replica_lag(alias)
+        except Exception:
+            try:
+                # Reconnected on the next check
+                connections[alias].close()
+            except Exception:
+                pass
+            return False, None
+        return lag <= settings.READ_REPLICAS['MAX_LAG'], lag
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        checked_at, healthy, lag = self._checks.get(alias, (None, False, None))
+        if checked_at is None or now - checked_at >= settings.READ_REPLICAS['CHECK_INTERVAL']:
+            healthy, lag = self.check(alias)
+            self._checks[alias] = (now, healthy, lag)
+        return healthy
+
+    def healthy_replicas(self):
+        return [alias for alias in settings.READ_REPLICAS['ALIASES'] if self.is_healthy(alias)]
+
+    def reset(self):
+        self._checks.clear()
+
+replica_health = ReplicaHealth()
+
+def pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+def pin_user(user_id):
+    cache.set(pin_key(user_id), True, settings.READ_REPLICAS['PIN_SECONDS'])
+
+async def apin_user(user_id):
+    await cache.aset(pin_key(user_id), True, settings.READ_REPLICAS['PIN_SECONDS'])
+
+def is_pinned(user_id):
+    return cache.get(pin_key(user_id)) is not None
+
+def request_user_id(request):
+    """Returns the id of the request's authenticated user, without loading a user that is not loaded yet."""
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        if user._wrapped is empty:
+            return None
+        user = user._wrapped
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+class RequestState:
+    def __init__(self, request, use_replica):
+        self.request = request
+        self.use_replica = use_replica
+        self.wrote = False
+        self.user_checked = False
+        self.replica = None
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or not state.use_replica or state.wrote or _primary_reads.get():
+            return DEFAULT_DB_ALIAS
+        if not state.user_checked:
+            user_id = request_user_id(state.request)
+            if user_id is not None:
+                state.user_checked = True
+                if is_pinned(user_id):
+                    state.use_replica = False
+                    return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            replicas = replica_health.healthy_replicas()
+            state.replica = random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets 'ReplicaRouter' route the reads of the request, and pins the client
+    to the primary after a request that wrote. Runs in sync and async stacks.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.request_state(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        user_id = self.pin(request, state, response)
+        if user_id is not None:
+            pin_user(user_id)
+        return response
+
+    async def __acall__(self, request):
+        state = self.request_state(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        user_id = self.pin(request, state, response)
+        if user_id is not None:
+            await apin_user(user_id)
+        return response
+
+    def request_state(self, request):
+        return RequestState(
+            request,
+            use_replica=(
+                bool(settings.READ_REPLICAS['ALIASES'])
+                and request.method in SAFE_METHODS
+                and PIN_COOKIE not in request.COOKIES
+            ),
+        )
+
+    def pin(self, request, state, response):
+        """Sets the pin cookie after a write, and returns the id of the user to pin, if any."""
+        if not state.wrote or not settings.READ_REPLICAS['ALIASES']:
+            return None
+        pin_seconds = settings.READ_REPLICAS['PIN_SECONDS']
+        response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds, httponly=True, samesite='Lax')
+        return request_user_id(request)
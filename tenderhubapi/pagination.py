@@ -0,0 +1,133 @@
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+def table_row_estimate(model, using):
+    """
+    Returns the planner's row estimate for the model's table (pg_class.reltuples),
+    or None if the table was never vacuumed or analyzed.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def query_row_estimate(queryset):
+    """Returns the number of rows EXPLAIN expects the queryset to return."""
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids an exact COUNT(*) on large tables.
+
+    - Unfiltered querysets are counted from `pg_class.reltuples`.
+    - Filtered querysets are counted exactly up to the threshold with a bounded
+      `COUNT(*)` over a LIMIT subquery, and from the EXPLAIN row estimate above it.
+    - Anything below `ESTIMATED_COUNT_THRESHOLD` rows gets an exact count.
+
+    `count_is_approximate` tells whether `count` came from the planner. The
+    estimate can be off either way, so an approximate count isn't used to tell
+    which pages exist: any page number is accepted until its page comes back
+    empty, and whether there is a next page comes from fetching one row past
+    the page.
+    """
+    def __init__(self, *args, threshold=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threshold = settings.ESTIMATED_COUNT_THRESHOLD if threshold is None else threshold
+        self.count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query') or connections[queryset.db].vendor != 'postgresql':
+            return super().count
+
+        if self.is_unfiltered(queryset):
+            estimate = table_row_estimate(queryset.model, queryset.db)
+            if estimate is None or estimate < self.threshold:
+                return queryset.count()
+        else:
+            bounded = queryset[:self.threshold + 1].count()
+            if bounded <= self.threshold:
+                return bounded
+            estimate = max(query_row_estimate(queryset), bounded)
+
+        self.count_is_approximate = True
+        return estimate
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Past the estimated last page, which page() checks against the rows instead
+            if not self.count_is_approximate or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return ApproximatePage(rows[:self.per_page], number, self, has_next=len(rows) > self.per_page)
+
+    @staticmethod
+    def is_unfiltered(queryset):
+        query = queryset.query
+        return not query.where and not query.distinct and not query.is_sliced and not query.combinator
+
+
+class ApproximatePage(Page):
+    """A page of an approximately counted list, which knows from its rows whether a next page exists."""
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    PageNumberPagination for large tables. The response carries
+    `count_is_approximate` next to `count`.
+    """
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_is_approximate', self.page.paginator.count_is_approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_approximate'] = {
+            'type': 'boolean',
+            'example': False,
+        }
+        return response_schema
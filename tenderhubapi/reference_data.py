@@ -0,0 +1,214 @@
+"""
+Process-wide cache of the small reference tables: categories, tags and skills.
+
+Each process keeps a copy of every table, tagged with the table's version. The
+version lives in the shared cache (CACHES), and is replaced whenever a row is
+saved or deleted (see the signal handlers of the tender and users apps), so
+every process reloads the table on its next check. A process checks the
+version at most every REFERENCE_DATA['CHECK_INTERVAL'] seconds; the process
+that wrote reloads at once. Queryset .update() and bulk_create() send no
+signals, so code using them calls `invalidate()` itself. A per-process cache
+(LocMemCache, DummyCache) would keep the other processes on their copy, so the
+system check below fails on one unless DEBUG is on.
+
+- `ReferenceDataViewMixin` serves the list and retrieve actions of a ViewSet
+  from the copy, and marks the lists cacheable with Cache-Control and ETag.
+- `CachedPrimaryKeyRelatedField` validates the primary keys written to a
+  relation against the copy, instead of querying its queryset.
+
+A primary key missing from the copy is looked up in the database before it is
+rejected, as the copy may not have caught up with a row just created.
+"""
+import copy
+import hashlib
+import threading
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.functional import cached_property
+from django.utils.http import quote_etag
+from rest_framework import serializers
+
+class ReferenceTable:
+    """The rows of a model, cached in this process and reloaded when their version changes."""
+    def __init__(self, model_label):
+        self.model_label = model_label
+        self.version_key = f'reference-data:{model_label}'
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __deepcopy__(self, memo):
+        # Serializer fields are deep-copied with their arguments; the table is shared
+        return self
+
+    @cached_property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def clear(self):
+        """Forgets this process' copy, which is loaded again on the next access."""
+        self._version = None
+        self._checked_at = None
+        self._rows = ()
+        self._rows_by_pk = {}
+
+    def shared_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid.uuid4().hex, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def refresh(self):
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < settings.REFERENCE_DATA['CHECK_INTERVAL']:
+            return
+        with self._lock:
+            if self._checked_at is not checked_at:
+                # Refreshed by another thread meanwhile
+                return
+            now = time.monotonic()
+            version = self.shared_version()
+            if version != self._version:
+                # From the primary, as a lagging replica could load rows older than the version
+                rows = tuple(
+                    self.model._default_manager.db_manager(DEFAULT_DB_ALIAS)
+                    .order_by(*(self.model._meta.ordering or ['pk']))
+                )
+                self._rows_by_pk = {row.pk: row for row in rows}
+                self._rows = rows
+                self._version = version
+            self._checked_at = now
+
+    def version(self):
+        self.refresh()
+        return self._version
+
+    def rows(self):
+        """The cached rows, in the model's ordering. They are shared, so they must not be changed."""
+        self.refresh()
+        return self._rows
+
+    def get(self, pk, queryset=None):
+        """
+        Returns a copy of the row of the primary key or, when the copy doesn't
+        have it, the row of `queryset` (by default every row) in the primary
+        database. Returns None when neither has it.
+        """
+        try:
+            pk = self.model._meta.pk.to_python(pk)
+        except ValidationError:
+            return None
+        self.refresh()
+        row = self._rows_by_pk.get(pk)
+        if row is not None:
+            return copy.copy(row)
+        if queryset is None:
+            queryset = self.model._default_manager.all()
+        # The primary, as a row created moments ago may not be on the replicas yet
+        return queryset.using(DEFAULT_DB_ALIAS).filter(pk=pk).first()
+
+    def bump(self):
+        cache.set(self.version_key, uuid.uuid4().hex, None)
+        self._checked_at = None
+
+    def invalidate(self):
+        """
+        Makes every process reload the table: now, and again once the current
+        transaction commits, as processes reloading before the commit miss the change.
+        """
+        self.bump()
+        transaction.on_commit(self.bump)
+
+categories = ReferenceTable('tender.Category')
+tags = ReferenceTable('tender.Tag')
+skills = ReferenceTable('users.Skill')
+
+REFERENCE_TABLES = [categories, tags, skills]
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    if settings.DEBUG or not isinstance(backend, (LocMemCache, DummyCache)):
+        return []
+    return [checks.Error(
+        f"The default cache ({type(backend).__name__}) isn't shared between processes, "
+        "so they would keep serving categories, tags and skills changed by another process.",
+        hint="Set CACHE_URL to a shared cache, e.g. redis://localhost:6379/0.",
+        id='reference_data.E001',
+    )]
+
+class ReferenceDataViewMixin:
+    """
+    Serves the list and retrieve actions of a ViewSet from `reference_table`.
+    The lists carry Cache-Control and an ETag derived from the table version,
+    and requests with a matching If-None-Match get a 304 without rendering.
+    """
+    reference_table = None
+
+    def get_queryset(self):
+        if self.action == 'list':
+            return list(self.reference_table.rows())
+        return super().get_queryset()
+
+    def get_object(self):
+        if self.action != 'retrieve':
+            return super().get_object()
+        obj = self.reference_table.get(
+            self.kwargs[self.lookup_url_kwarg or self.lookup_field], self.filter_queryset(super().get_queryset())
+        )
+        if obj is None:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def list_etag(self, request):
+        # Pages and formats of the same version are different representations
+        variant = f'{self.reference_table.version()}:{request.get_full_path()}:{request.accepted_media_type}'
+        return quote_etag(hashlib.md5(variant.encode(), usedforsecurity=False).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        etag = self.list_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        patch_cache_control(
+            response, max_age=settings.REFERENCE_DATA['MAX_AGE'],
+            **({'public': True} if settings.REFERENCE_DATA['PUBLIC'] else {'private': True}),
+        )
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that looks the primary keys up in a ReferenceTable.
+    The queryset is still required, for the choices of the browsable API.
+    """
+    def __init__(self, reference_table, **kwargs):
+        self.reference_table = reference_table
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            self.reference_table.model._meta.pk.to_python(data)
+        except ValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = self.reference_table.get(data, self.get_queryset())
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
@@ -0,0 +1,117 @@
+"""
+Renderers and parsers for JSON encoded with orjson, and for MessagePack.
+
+Both are pinned in requirements.txt, but remain optional:
+- Without orjson, the JSON classes behave exactly like DRF's JSONRenderer and
+  JSONParser, which they extend.
+- MessagePack (application/msgpack) is only offered when msgpack is installed;
+  see REST_FRAMEWORK in settings.
+
+The JSON output is the same as DRF's, except for the floats in exponent
+notation, which orjson writes without the sign and padding of the exponent or
+in positional form (1e-05 as 0.00001, 1e+16 as 1e16); both parse to the same
+values. NaN and infinities, which orjson would write as null, are left to DRF,
+which rejects them. Values that neither format knows, such as Decimals, dates,
+lazy translation strings and UUIDs, are converted the way DRF's JSONEncoder
+converts them.
+"""
+import io
+import math
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# DRF's conversions of the values JSON can't represent
+encode_default = JSONEncoder().default
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+
+# orjson decodes the integers that don't fit in 64 bits as floats, so content
+# with a run of 20 digits is left to the json module. Mapping every digit to '0'
+# makes that a substring search, much faster than a regular expression.
+DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+LONG_NUMBER = b'0' * 20
+
+def has_non_finite_float(data):
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(has_non_finite_float(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(has_non_finite_float(value) for value in data)
+    if hasattr(data, 'tolist'):
+        # e.g. numpy arrays, which DRF's JSONEncoder converts with tolist()
+        return has_non_finite_float(data.tolist())
+    return False
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers over 64 bits, which the json module encodes
+            return super().render(data, accepted_media_type, renderer_context)
+        # orjson writes NaN and infinities as null, so only a body with a null can hold one
+        if b'null' in rendered and has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like DRF does, as they end lines in JavaScript
+        if b'\xe2\x80\xa8' in rendered or b'\xe2\x80\xa9' in rendered:
+            rendered = rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return rendered
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        if LONG_NUMBER not in content.translate(DIGITS_TO_ZERO):
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass
+        # The json module reports the errors, with DRF's messages
+        return super().parse(io.BytesIO(content), media_type, parser_context)
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
@@ -19,12 +19,26 @@ from django.urls import include, path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.conf import settings
 from django.conf.urls.static import static
+from tender.async_views import (
+    AsyncCategoryListView, AsyncTagListView, AsyncTenderDetailView, AsyncTenderListView
+)
+from users.async_views import AsyncOtherUserProfileView
+from .views import DatabaseConnectionStatsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/v1/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/v1/users/', include('users.urls')),
+    path('api/v1/notifications/', include('notifications.urls')),
+    path('api/v1/webhooks/', include('webhooks.urls')),
+    path('api/v1/metrics/database/', DatabaseConnectionStatsView.as_view(), name='database-connection-stats'),
+    # Native async versions of the busiest reads, for ASGI deployments
+    path('api/v1/async/tenders/', AsyncTenderListView.as_view(), name='async-tender-list'),
+    path('api/v1/async/tenders/<int:pk>/', AsyncTenderDetailView.as_view(), name='async-tender-detail'),
+    path('api/v1/async/tags/', AsyncTagListView.as_view(), name='async-tag-list'),
+    path('api/v1/async/categories/', AsyncCategoryListView.as_view(), name='async-category-list'),
+    path('api/v1/async/users/<int:user_id>/profile/', AsyncOtherUserProfileView.as_view(), name='async-other-user-profile'),
     path('api/v1/', include('tender.urls')),
 ]
 
@@ -0,0 +1,14 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .db_connections import connection_stats
+
+class DatabaseConnectionStatsView(APIView):
+    """
+    Connection usage and pool statistics of the process answering the request.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(connection_stats())
@@ -5,6 +5,7 @@ from django.urls import reverse
 from django.utils import timezone
 from django.db.models import Avg, Count
 
+from tenderhubapi.admin_search import AutocompleteSearchMixin, TrigramSearchMixin
 from .models import (
     User, ClientProfile, VendorProfile, Skill, 
     Portfolio, Certification, Education, Review
@@ -64,7 +65,7 @@ class ReviewInline(admin.TabularInline):
     verbose_name_plural = "Reviews Received"
     classes = ('collapse',)
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(AutocompleteSearchMixin, TrigramSearchMixin, UserAdmin):
     list_display = ('username', 'email', 'full_name', 'user_type', 'profile_picture_thumbnail', 'date_joined', 'last_login', 'is_active', 'is_staff')
     list_filter = ('is_client', 'is_vendor', 'is_staff', 'is_active', 'date_joined')
     fieldsets = UserAdmin.fieldsets + (
@@ -73,6 +74,7 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
     search_fields = ('username', 'email', 'first_name', 'last_name', 'bio', 'location')
+    autocomplete_search_fields = ('^username',)
     actions = [make_client, make_vendor, reset_user_type]
     list_per_page = 20
     save_on_top = True
@@ -0,0 +1,17 @@
+"""
+Async versions of the busiest profile reads, see tenderhubapi.async_views.
+"""
+from django.shortcuts import aget_object_or_404
+
+from tenderhubapi.async_views import AsyncReadView
+
+from .models import User
+from .serializers import OtherUserProfileSerializer
+from .views import OtherUserProfileView
+
+class AsyncOtherUserProfileView(AsyncReadView):
+    permission_classes = OtherUserProfileView.permission_classes
+
+    async def get(self, request, user_id):
+        user = await aget_object_or_404(User, id=user_id)
+        return OtherUserProfileSerializer(user, context=self.serializer_context(request)).data
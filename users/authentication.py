@@ -0,0 +1,155 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class ExpiringLRUCache:
+    """
+    Thread-safe, size-bounded LRU mapping where every entry carries its own expiry time.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def _get_cache(name):
+    if name not in _caches:
+        with _caches_lock:
+            if name not in _caches:
+                _caches[name] = ExpiringLRUCache(settings.JWT_AUTH_CACHE[f'{name}_CACHE_SIZE'])
+    return _caches[name]
+
+def invalidate_cached_user(user_id):
+    """Drop a user row from this process' authentication cache."""
+    _get_cache('USER').discard(user_id)
+
+def clear_auth_caches():
+    for name in ('TOKEN', 'USER'):
+        _get_cache(name).clear()
+
+def token_user_id(validated_token):
+    try:
+        return validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+
+def check_user(user, validated_token):
+    """The checks JWTAuthentication runs on the user of a token."""
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that memoizes verified tokens and user rows in this process.
+
+    - Verified tokens are kept in an LRU until their `exp` claim, so the signature
+      is only checked once per token and process.
+    - User rows are kept for `JWT_AUTH_CACHE['USER_TTL']` seconds and dropped when
+      the user is saved or deleted (see `users.signals`). Bulk `.update()` calls
+      don't send signals, so those changes take effect once the TTL runs out.
+
+    The active and revoked-token checks still run on every request.
+    """
+    def get_validated_token(self, raw_token):
+        cache = _get_cache('TOKEN')
+        now = time.time()
+        validated_token = cache.get(raw_token, now)
+        if validated_token is not None:
+            return validated_token
+
+        validated_token = super().get_validated_token(raw_token)
+        expires_at = validated_token.get('exp')
+        if expires_at:
+            cache.set(raw_token, validated_token, expires_at)
+        return validated_token
+
+    def get_user(self, validated_token):
+        user_id = token_user_id(validated_token)
+
+        cache = _get_cache('USER')
+        now = time.monotonic()
+        user = cache.get(user_id, now)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(user_id, user, now + settings.JWT_AUTH_CACHE['USER_TTL'])
+
+        check_user(user, validated_token)
+
+        # Each request gets its own instance so request-level changes never leak into the cache
+        return copy.copy(user)
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication for the async views (see tenderhubapi.async_views), which
+    loads the user with the async ORM.
+    """
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = token_user_id(validated_token)
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        check_user(user, validated_token)
+        return user
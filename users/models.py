@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 class User(AbstractUser):
     """
@@ -18,6 +20,13 @@ class User(AbstractUser):
         verbose_name = "User"
         verbose_name_plural = "Users"
         ordering = ['username']
+        indexes = [
+            # Supports the admin's case-insensitive prefix search (username__istartswith)
+            models.Index(
+                OpClass(Upper('username'), name='text_pattern_ops'),
+                name='users_username_prefix_idx',
+            ),
+        ]
         
     def __str__(self):
         return self.username
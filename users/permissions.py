@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .models import User
+
 class IsProfileOwnerOrReadOnly(permissions.BasePermission):
     """
     Custom permission to handle profile access permissions.
@@ -14,4 +16,5 @@ class IsProfileOwnerOrReadOnly(permissions.BasePermission):
             return True
         
         # Write permissions are only allowed to the profile owner
-        return obj == request.user or obj.user == request.user
+        owner_id = obj.pk if isinstance(obj, User) else obj.user_id
+        return owner_id == request.user.id
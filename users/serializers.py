@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import User, ClientProfile, VendorProfile, Portfolio, Certification, Education, Review, Skill
 from django.contrib.auth.password_validation import validate_password
+from tender.serializers import get_vendor_stats
+from tenderhubapi.reference_data import CachedPrimaryKeyRelatedField, skills
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -83,7 +85,8 @@ class ClientProfileSerializer(serializers.ModelSerializer):
 class VendorProfileSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
     skills = SkillSerializer(many=True, read_only=True)
-    skill_ids = serializers.PrimaryKeyRelatedField(
+    skill_ids = CachedPrimaryKeyRelatedField(
+        reference_table=skills,
         many=True, 
         write_only=True,
         queryset=Skill.objects.all(),
@@ -95,10 +98,11 @@ class VendorProfileSerializer(serializers.ModelSerializer):
     education = EducationSerializer(many=True, read_only=True)
     reviews = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
+    stats = serializers.SerializerMethodField()
     
     class Meta:
         model = VendorProfile
-        fields = ['id', 'user', 'skills', 'skill_ids', 'hourly_rate', 'portfolios', 'certifications', 'education', 'reviews', 'average_rating']
+        fields = ['id', 'user', 'skills', 'skill_ids', 'hourly_rate', 'portfolios', 'certifications', 'education', 'reviews', 'average_rating', 'stats']
     
     def get_reviews(self, obj):
         reviews = Review.objects.filter(reviewee=obj.user)
@@ -109,6 +113,9 @@ class VendorProfileSerializer(serializers.ModelSerializer):
         if reviews.exists():
             return sum(review.rating for review in reviews) / reviews.count()
         return 0
+    
+    def get_stats(self, obj):
+        return get_vendor_stats(obj.user)
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -126,4 +133,41 @@ class OtherUserProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'first_name', 'last_name', 'profile_picture', 'bio', 
                   'location', 'language', 'is_client', 'is_vendor']
         read_only_fields = ['id', 'username', 'first_name', 'last_name', 'profile_picture', 'bio', 
-                          'location', 'language', 'is_client', 'is_vendor']
\ No newline at end of file
+                          'location', 'language', 'is_client', 'is_vendor']
+
+class ClientProfileSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ClientProfile
+        fields = ['company_name', 'contact_number', 'address']
+
+class VendorProfileSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VendorProfile
+        fields = ['id', 'hourly_rate']
+
+class OtherUserBatchSerializer(OtherUserProfileSerializer):
+    """
+    Serializer for batch user lookups, optionally including the client or vendor profile summary
+    """
+    client_profile = serializers.SerializerMethodField()
+    vendor_profile = serializers.SerializerMethodField()
+    
+    class Meta(OtherUserProfileSerializer.Meta):
+        fields = OtherUserProfileSerializer.Meta.fields + ['client_profile', 'vendor_profile']
+    
+    def __init__(self, *args, role=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the summary for the requested role is included
+        if role != 'client':
+            self.fields.pop('client_profile')
+        if role != 'vendor':
+            self.fields.pop('vendor_profile')
+    
+    def get_client_profile(self, obj):
+        # Loaded with select_related, so a missing profile does not cost a query
+        profile = getattr(obj, 'client_profile', None)
+        return ClientProfileSummarySerializer(profile).data if profile else None
+    
+    def get_vendor_profile(self, obj):
+        profile = getattr(obj, 'vendor_profile', None)
+        return VendorProfileSummarySerializer(profile).data if profile else None
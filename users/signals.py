@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from tenderhubapi.reference_data import skills
+from .authentication import invalidate_cached_user
+from .models import Skill, User
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_authentication_cache(sender, instance, **kwargs):
+    # Permission and activation changes must not wait for the cache TTL
+    invalidate_cached_user(getattr(instance, api_settings.USER_ID_FIELD))
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def invalidate_skills(sender, **kwargs):
+    skills.invalidate()
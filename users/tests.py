@@ -1,9 +1,13 @@
 import pytest
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
 from faker import Faker
 from .models import User, VendorProfile, ClientProfile, Portfolio, Skill, Education
+from .authentication import CachedJWTAuthentication, clear_auth_caches
+from tender.models import VendorStats
 from datetime import date
 
 fake = Faker()
@@ -187,6 +191,27 @@ class TestSkillEndpoints:
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert 'error' in response.data
 
+    def test_skills_are_read_from_the_cache(self, api_client, vendor_user):
+        skill = Skill.objects.create(name=fake.word() + ' Design')
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.get(reverse('skill-list'))
+        assert response['ETag']
+        assert skill.id in [row['id'] for row in response.data['results']]
+
+        # The new skill is listed, and can be added, right after it's created
+        response = api_client.post(reverse('skill-list'), {'name': fake.word() + ' Writing'})
+        created = Skill.objects.get(pk=response.data['id'])
+        response = api_client.get(reverse('skill-list'))
+        assert created.id in [row['id'] for row in response.data['results']]
+        url = reverse('vendor-add-skill', kwargs={'pk': 'me'})
+        response = api_client.post(url, {'id': created.id})
+        assert response.status_code == status.HTTP_200_OK
+
+        created_id = created.id
+        created.delete()
+        response = api_client.post(url, {'id': created_id})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
 @pytest.mark.django_db
 class TestCertificationEndpoints:
     def test_delete_certification(self, api_client, vendor_user):
@@ -300,3 +325,124 @@ class TestEducationEndpoints:
         url = reverse('vendor-delete-education', kwargs={'pk': 'me'})
         response = api_client.delete(url)
         assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+class TestOtherUserBatchEndpoint:
+    def test_batch_lookup_keeps_requested_order(self, api_client, vendor_user):
+        users = [
+            User.objects.create_user(username=fake.unique.user_name(), password=fake.password())
+            for _ in range(3)
+        ]
+        api_client.force_authenticate(user=vendor_user)
+        ids = [users[2].id, users[0].id, users[1].id]
+        response = api_client.get(reverse('other-user-batch'), {'ids': ','.join(map(str, ids))})
+        assert response.status_code == status.HTTP_200_OK
+        assert [user['id'] for user in response.data['results']] == ids
+        assert response.data['missing'] == []
+        assert 'vendor_profile' not in response.data['results'][0]
+    
+    def test_batch_lookup_reports_missing_ids(self, api_client, vendor_user):
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.get(reverse('other-user-batch'), {'ids': f'{vendor_user.id},999999'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [user['id'] for user in response.data['results']] == [vendor_user.id]
+        assert response.data['missing'] == [999999]
+    
+    def test_batch_lookup_with_role_includes_profile_summary(self, api_client, vendor_user, django_assert_num_queries):
+        client = User.objects.create_user(username=fake.unique.user_name(), password=fake.password(), is_client=True)
+        ClientProfile.objects.create(user=client, company_name=fake.company(), contact_number='123', address=fake.address())
+        api_client.force_authenticate(user=vendor_user)
+        
+        # A single query regardless of how many profiles are included
+        with django_assert_num_queries(1):
+            response = api_client.get(
+                reverse('other-user-batch'),
+                {'ids': f'{client.id},{vendor_user.id}', 'role': 'vendor'}
+            )
+        assert response.status_code == status.HTTP_200_OK
+        assert [user['id'] for user in response.data['results']] == [vendor_user.id]
+        assert response.data['results'][0]['vendor_profile']['id'] == vendor_user.vendor_profile.id
+        assert response.data['missing'] == [client.id]
+    
+    def test_batch_lookup_invalid_ids(self, api_client, vendor_user):
+        api_client.force_authenticate(user=vendor_user)
+        response = api_client.get(reverse('other-user-batch'), {'ids': '1,abc'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'error' in response.data
+    
+    def test_batch_lookup_too_many_ids(self, api_client, vendor_user):
+        api_client.force_authenticate(user=vendor_user)
+        ids = ','.join(str(user_id) for user_id in range(1, 202))
+        response = api_client.get(reverse('other-user-batch'), {'ids': ids})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    @pytest.fixture(autouse=True)
+    def clear_caches(self):
+        clear_auth_caches()
+        yield
+        clear_auth_caches()
+    
+    def authenticate(self, user):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return CachedJWTAuthentication().authenticate(request)
+    
+    def test_user_is_cached_between_requests(self, vendor_user, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            user, _ = self.authenticate(vendor_user)
+        assert user == vendor_user
+        
+        with django_assert_num_queries(0):
+            cached_user, _ = self.authenticate(vendor_user)
+        assert cached_user == vendor_user
+        assert cached_user is not user
+    
+    def test_saving_user_invalidates_cache(self, vendor_user, django_assert_num_queries):
+        self.authenticate(vendor_user)
+        vendor_user.is_client = True
+        vendor_user.save()
+        
+        with django_assert_num_queries(1):
+            user, _ = self.authenticate(vendor_user)
+        assert user.is_client
+    
+    def test_deactivated_user_is_rejected(self, vendor_user):
+        self.authenticate(vendor_user)
+        vendor_user.is_active = False
+        vendor_user.save()
+        
+        with pytest.raises(AuthenticationFailed):
+            self.authenticate(vendor_user)
+
+@pytest.mark.django_db
+def test_vendor_profile_includes_stats(api_client, vendor_user):
+    VendorStats.objects.create(vendor=vendor_user, bids_total=4, bids_won=1, deliveries=2, on_time_deliveries=1)
+    api_client.force_authenticate(user=vendor_user)
+    response = api_client.get(reverse('other-vendor-profile', args=[vendor_user.id]))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['stats']['bids_total'] == 4
+    assert response.data['stats']['win_rate'] == 0.25
+    assert response.data['stats']['on_time_rate'] == 0.5
+    assert response.data['stats']['revision_rate'] == 0.0
+
+@pytest.mark.django_db
+class TestAsyncOtherUserProfile:
+    def test_matches_the_sync_endpoint(self, api_client, vendor_user):
+        other = User.objects.create_user(
+            username=fake.unique.user_name(), password=fake.password(), bio=fake.text(), is_client=True
+        )
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(vendor_user)}')
+        for user_id in (other.id, 999999):
+            sync_response = api_client.get(reverse('other-user-profile', args=[user_id]))
+            async_response = api_client.get(reverse('async-other-user-profile', args=[user_id]))
+            assert async_response.status_code == sync_response.status_code
+            assert async_response.content == sync_response.content
+
+    def test_inactive_user_token_is_rejected(self, api_client, vendor_user):
+        token = AccessToken.for_user(vendor_user)
+        User.objects.filter(pk=vendor_user.pk).update(is_active=False)
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = api_client.get(reverse('async-other-user-profile', args=[vendor_user.id]))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.json()['code'] == 'user_inactive'
@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     RegisterView, UserProfileView, ClientProfileView, 
     VendorProfileViewSet, SkillViewSet, ReviewViewSet,
-    OtherUserProfileView, OtherClientProfileView, OtherVendorProfileView
+    OtherUserProfileView, OtherClientProfileView, OtherVendorProfileView,
+    OtherUserBatchView
 )
 
 router = DefaultRouter()
@@ -73,6 +74,7 @@ urlpatterns = [
     path('client-profile/', ClientProfileView.as_view(), name='client-profile'),
     
     # New endpoints for retrieving other users' profiles
+    path('users/', OtherUserBatchView.as_view(), name='other-user-batch'),
     path('users/<int:user_id>/profile/', OtherUserProfileView.as_view(), name='other-user-profile'),
     path('users/<int:user_id>/client-profile/', OtherClientProfileView.as_view(), name='other-client-profile'),
     path('users/<int:user_id>/vendor-profile/', OtherVendorProfileView.as_view(), name='other-vendor-profile'),
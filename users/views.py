@@ -4,6 +4,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
+from tenderhubapi.reference_data import ReferenceDataViewMixin, skills
 from .permissions import IsProfileOwnerOrReadOnly
 
 from .models import (
@@ -13,7 +14,8 @@ from .models import (
 from .serializers import (
     UserRegistrationSerializer, UserProfileSerializer, ClientProfileSerializer,
     VendorProfileSerializer, PortfolioSerializer, CertificationSerializer,
-    EducationSerializer, ReviewSerializer, SkillSerializer, OtherUserProfileSerializer
+    EducationSerializer, ReviewSerializer, SkillSerializer, OtherUserProfileSerializer,
+    OtherUserBatchSerializer
 )
 
 class RegisterView(generics.CreateAPIView):
@@ -39,6 +41,65 @@ class OtherUserProfileView(generics.RetrieveAPIView):
         user_id = self.kwargs.get('user_id')
         return get_object_or_404(User, id=user_id)
 
+class OtherUserBatchView(APIView):
+    """
+    API view to retrieve several users' profile information in a single request.
+    
+    Results keep the order of the requested ids, and ids that don't match a user
+    (or don't have the requested role) are reported in `missing`.
+    """
+    permission_classes = [IsAuthenticated]
+    max_ids = 200
+    
+    def get(self, request):
+        raw_ids = request.query_params.get('ids', '')
+        role = request.query_params.get('role')
+        
+        if role not in (None, 'client', 'vendor'):
+            return Response(
+                {"error": "role must be either 'client' or 'vendor'"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            # Drop duplicates but keep the requested order
+            user_ids = list(dict.fromkeys(int(user_id) for user_id in raw_ids.split(',') if user_id.strip()))
+        except ValueError:
+            return Response(
+                {"error": "ids must be a comma-separated list of integers"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not user_ids:
+            return Response(
+                {"error": "ids parameter is required"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(user_ids) > self.max_ids:
+            return Response(
+                {"error": f"A maximum of {self.max_ids} ids can be requested at once"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = User.objects.filter(id__in=user_ids)
+        if role == 'client':
+            queryset = queryset.filter(is_client=True).select_related('client_profile')
+        elif role == 'vendor':
+            queryset = queryset.filter(is_vendor=True).select_related('vendor_profile')
+        
+        users = {user.id: user for user in queryset}
+        serializer = OtherUserBatchSerializer(
+            [users[user_id] for user_id in user_ids if user_id in users], 
+            many=True, 
+            role=role, 
+            context={'request': request}
+        )
+        return Response({
+            "results": serializer.data,
+            "missing": [user_id for user_id in user_ids if user_id not in users],
+        })
+
 class ClientProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = ClientProfileSerializer
     permission_classes = [IsAuthenticated]
@@ -63,13 +124,14 @@ class VendorProfileViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
+        queryset = VendorProfile.objects.select_related('user__vendor_stats')
         if self.action == 'list':
-            return VendorProfile.objects.all()
-        return VendorProfile.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
     
     def get_object(self):
         if self.kwargs.get('pk') == 'me':
-            return get_object_or_404(VendorProfile, user=self.request.user)
+            return get_object_or_404(self.get_queryset(), user=self.request.user)
         return super().get_object()
     
     @action(detail=True, methods=['get'])
@@ -129,18 +191,17 @@ class VendorProfileViewSet(viewsets.ModelViewSet):
         skill_name = request.data.get('name')
         
         if skill_id:
-            try:
-                skill = Skill.objects.get(id=skill_id)
-                vendor.skills.add(skill)
-                return Response(
-                    {"message": f"Skill '{skill.name}' added successfully"}, 
-                    status=status.HTTP_200_OK
-                )
-            except Skill.DoesNotExist:
+            skill = skills.get(skill_id)
+            if skill is None:
                 return Response(
                     {"error": "Skill not found"}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
+            vendor.skills.add(skill)
+            return Response(
+                {"message": f"Skill '{skill.name}' added successfully"}, 
+                status=status.HTTP_200_OK
+            )
         elif skill_name:
             # Get or create the skill
             skill, created = Skill.objects.get_or_create(name=skill_name)
@@ -167,23 +228,22 @@ class VendorProfileViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        try:
-            skill = Skill.objects.get(id=skill_id)
-            if skill not in vendor.skills.all():
-                return Response(
-                    {"error": "This skill is not associated with your profile"}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            vendor.skills.remove(skill)
-            return Response(
-                {"message": f"Skill '{skill.name}' removed successfully"}, 
-                status=status.HTTP_200_OK
-            )
-        except Skill.DoesNotExist:
+        skill = skills.get(skill_id)
+        if skill is None:
             return Response(
                 {"error": "Skill not found"}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        if not vendor.skills.filter(pk=skill.pk).exists():
+            return Response(
+                {"error": "This skill is not associated with your profile"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        vendor.skills.remove(skill)
+        return Response(
+            {"message": f"Skill '{skill.name}' removed successfully"}, 
+            status=status.HTTP_200_OK
+        )
     
     @action(detail=True, methods=['get'])
     def certifications(self, request, pk=None):
@@ -277,10 +337,12 @@ class OtherVendorProfileView(generics.RetrieveAPIView):
     def get_object(self):
         user_id = self.kwargs.get('user_id')
         user = get_object_or_404(User, id=user_id, is_vendor=True)
-        return get_object_or_404(VendorProfile, user=user)
+        return get_object_or_404(VendorProfile.objects.select_related('user__vendor_stats'), user=user)
 
-class SkillViewSet(viewsets.ModelViewSet):
-    queryset = Skill.objects.all()
+class SkillViewSet(ReferenceDataViewMixin, viewsets.ModelViewSet):
+    # Listed and retrieved from the reference data cache, in the same order
+    queryset = Skill.objects.order_by('pk')
+    reference_table = skills
     serializer_class = SkillSerializer
     permission_classes = [IsAuthenticated]
     
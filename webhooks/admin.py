@@ -0,0 +1,41 @@
+from django.contrib import admin
+from django.utils import timezone
+from tenderhubapi.pagination import EstimatedCountPaginator
+from .models import WebhookDelivery, WebhookSubscription
+
+def retry_deliveries(modeladmin, request, queryset):
+    count = queryset.exclude(status='succeeded').update(status='pending', next_attempt_at=timezone.now())
+    modeladmin.message_user(request, f"{count} deliveries were queued again.")
+retry_deliveries.short_description = "Retry selected deliveries"
+
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('subscription_id', 'owner', 'url', 'is_active', 'deliveries_succeeded', 'deliveries_failed',
+                    'average_latency', 'consecutive_failures', 'last_delivery_at')
+    list_filter = ('is_active',)
+    search_fields = ('url', 'owner__username')
+    list_select_related = ('owner',)
+    autocomplete_fields = ('owner',)
+    readonly_fields = ('deliveries_succeeded', 'deliveries_failed', 'total_latency_ms', 'last_latency_ms',
+                       'last_status_code', 'last_delivery_at', 'last_failure_at', 'consecutive_failures')
+    
+    def average_latency(self, obj):
+        latency = obj.average_latency_ms
+        return f"{latency:.0f} ms" if latency is not None else "-"
+    average_latency.short_description = 'Avg Latency'
+
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('delivery_id', 'subscription', 'event_type', 'status', 'attempts', 'last_status_code',
+                    'latency_ms', 'next_attempt_at', 'created_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('=event_id',)
+    list_select_related = ('subscription__owner',)
+    readonly_fields = [field.name for field in WebhookDelivery._meta.fields]
+    actions = [retry_deliveries]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+
+admin.site.register(WebhookSubscription, WebhookSubscriptionAdmin)
+admin.site.register(WebhookDelivery, WebhookDeliveryAdmin)
@@ -0,0 +1,50 @@
+"""
+Queuing of webhook deliveries, registered as an outbox handler in settings.OUTBOX.
+
+A subscription receives the events whose payload names its owner as the client,
+vendor or user. The deliveries are only queued here; they are sent by
+`python manage.py deliver_webhooks`, so a slow receiver never holds up the relay
+or the API.
+"""
+import fnmatch
+
+from .models import WebhookDelivery, WebhookSubscription
+
+PARTICIPANT_KEYS = ('client_id', 'vendor_id', 'user_id')
+
+def event_participants(event):
+    return {event.payload[key] for key in PARTICIPANT_KEYS if event.payload.get(key) is not None}
+
+def matches(subscription, event_type):
+    return any(fnmatch.fnmatchcase(event_type, pattern) for pattern in subscription.event_types)
+
+def enqueue_deliveries(events):
+    participants = {event.id: event_participants(event) for event in events}
+    owner_ids = set().union(*participants.values())
+    if not owner_ids:
+        return
+
+    subscriptions = {}
+    for subscription in WebhookSubscription.objects.filter(owner_id__in=owner_ids, is_active=True):
+        subscriptions.setdefault(subscription.owner_id, []).append(subscription)
+
+    deliveries = [
+        WebhookDelivery(
+            subscription=subscription,
+            event_id=event.event_id,
+            event_type=event.event_type,
+            payload={
+                'event_id': str(event.event_id),
+                'event_type': event.event_type,
+                'aggregate_type': event.aggregate_type,
+                'aggregate_id': event.aggregate_id,
+                'created_at': event.created_at,
+                'data': event.payload,
+            },
+        )
+        for event in events
+        for owner_id in participants[event.id]
+        for subscription in subscriptions.get(owner_id, ())
+        if matches(subscription, event.event_type)
+    ]
+    WebhookDelivery.objects.bulk_create(deliveries, ignore_conflicts=True)
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from webhooks.worker import ConnectionPool, deliver_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends the pending webhook deliveries and retries the failed ones. "
+        "Polls every --interval seconds while idle unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send the due deliveries and exit.")
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="Seconds to wait when no delivery is due (default: 1).",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=settings.WEBHOOKS['MAX_WORKERS'],
+            help="Maximum number of concurrent requests.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.WEBHOOKS['BATCH_SIZE'],
+            help="Deliveries claimed per batch.",
+        )
+
+    def handle(self, *args, **options):
+        # The pool outlives the batches, so connections are kept alive between polls
+        pool = ConnectionPool(settings.WEBHOOKS['TIMEOUT'], settings.WEBHOOKS['MAX_CONNECTIONS_PER_HOST'])
+        try:
+            while True:
+                sent = deliver_pending(
+                    pool, max_workers=max(1, options['workers']), batch_size=max(1, options['batch_size'])
+                )
+                if sent:
+                    self.stdout.write(f"Sent {sent} deliveries.")
+                if options['once']:
+                    return
+                try:
+                    time.sleep(options['interval'])
+                except KeyboardInterrupt:
+                    return
+        finally:
+            pool.close()
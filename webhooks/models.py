@@ -0,0 +1,94 @@
+import secrets
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import User
+
+def generate_secret():
+    return secrets.token_hex(32)
+
+class WebhookSubscription(models.Model):
+    """
+    An endpoint of a user that receives the domain events they take part in,
+    signed with HMAC-SHA256 using `secret`. The delivery metrics of the endpoint
+    are maintained by the webhook worker.
+    """
+    subscription_id = models.BigAutoField(primary_key=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='webhook_subscriptions')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_secret)
+    # Event type patterns, e.g. ["bid.placed", "project.*"]
+    event_types = models.JSONField(default=list)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    # Delivery metrics
+    deliveries_succeeded = models.PositiveIntegerField(default=0)
+    deliveries_failed = models.PositiveIntegerField(default=0)
+    total_latency_ms = models.FloatField(default=0)
+    last_latency_ms = models.FloatField(null=True, blank=True)
+    last_status_code = models.PositiveIntegerField(null=True, blank=True)
+    last_delivery_at = models.DateTimeField(null=True, blank=True)
+    last_failure_at = models.DateTimeField(null=True, blank=True)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "Webhook Subscription"
+        verbose_name_plural = "Webhook Subscriptions"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner'], condition=Q(is_active=True), name='webhook_active_owner_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.owner}: {self.url}"
+    
+    @property
+    def average_latency_ms(self):
+        attempts = self.deliveries_succeeded + self.deliveries_failed
+        return self.total_latency_ms / attempts if attempts else None
+
+class WebhookDelivery(models.Model):
+    """
+    One event to send to one subscription. Pending deliveries are the retry
+    queue: a failed attempt moves `next_attempt_at` forward with an exponential
+    backoff until MAX_ATTEMPTS marks the delivery failed.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+    
+    delivery_id = models.BigAutoField(primary_key=True)
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    event_id = models.UUIDField()
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_status_code = models.PositiveIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    latency_ms = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Webhook Delivery"
+        verbose_name_plural = "Webhook Deliveries"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['next_attempt_at'], condition=Q(status='pending'), name='webhook_pending_idx'),
+            models.Index(fields=['subscription', '-created_at'], name='webhook_delivery_history_idx'),
+        ]
+        constraints = [
+            # An event is queued once per subscription, even if the relay hands it over again
+            models.UniqueConstraint(fields=['subscription', 'event_id'], name='unique_webhook_delivery'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} to {self.subscription.url}"
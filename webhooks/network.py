@@ -0,0 +1,61 @@
+"""
+Restriction of the webhook requests to public addresses.
+
+The URLs of the subscriptions are chosen by the users, so without this a
+subscription could make the worker post to the services of its own network,
+e.g. a database admin on 10.0.0.5 or the cloud metadata at 169.254.169.254.
+The host of a URL is resolved, and rejected when any of its addresses is not
+a public (global) one, both when the subscription is saved and when the worker
+connects. The worker connects to the address it checked, so a DNS record
+changed in between can't redirect it.
+
+WEBHOOKS['ALLOW_PRIVATE_ADDRESSES'] lifts the restriction, for development.
+"""
+import ipaddress
+import socket
+
+from django.conf import settings
+
+class NonPublicAddress(ValueError):
+    pass
+
+def resolve(host, port):
+    """Returns the getaddrinfo() entries of the host, for TCP connections."""
+    return socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+
+def public_addresses(host, port):
+    """
+    Returns the getaddrinfo() entries of the host, and raises NonPublicAddress
+    when one of them isn't a public address.
+    """
+    try:
+        entries = resolve(host, port)
+    except (socket.gaierror, UnicodeError) as exc:
+        raise NonPublicAddress(f"{host} could not be resolved: {exc}") from exc
+    if settings.WEBHOOKS['ALLOW_PRIVATE_ADDRESSES']:
+        return entries
+    for entry in entries:
+        address = ipaddress.ip_address(entry[4][0].split('%')[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise NonPublicAddress(f"{host} resolves to {address}, which is not a public address")
+    return entries
+
+def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+    """socket.create_connection(), restricted to the public addresses of the host."""
+    host, port = address
+    error = None
+    for family, type_, proto, _, sockaddr in public_addresses(host, port):
+        sock = socket.socket(family, type_, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as exc:
+            error = exc
+            sock.close()
+    raise error or OSError(f"{host} has no address")
@@ -0,0 +1,44 @@
+from urllib.parse import urlsplit
+
+from rest_framework import serializers
+
+from .models import WebhookDelivery, WebhookSubscription
+from .network import NonPublicAddress, public_addresses
+
+class WebhookSubscriptionSerializer(serializers.ModelSerializer):
+    average_latency_ms = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = WebhookSubscription
+        fields = [
+            'subscription_id', 'url', 'secret', 'event_types', 'is_active', 'created_at',
+            'deliveries_succeeded', 'deliveries_failed', 'average_latency_ms', 'last_latency_ms',
+            'last_status_code', 'last_delivery_at', 'last_failure_at', 'consecutive_failures'
+        ]
+        read_only_fields = [
+            'subscription_id', 'secret', 'created_at', 'deliveries_succeeded', 'deliveries_failed',
+            'last_latency_ms', 'last_status_code', 'last_delivery_at', 'last_failure_at', 'consecutive_failures'
+        ]
+    
+    def validate_url(self, value):
+        if not value.startswith(('http://', 'https://')):
+            raise serializers.ValidationError("Only http and https URLs are supported")
+        parts = urlsplit(value)
+        try:
+            public_addresses(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        except NonPublicAddress as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+    
+    def validate_event_types(self, value):
+        if not isinstance(value, list) or not value or not all(isinstance(pattern, str) and pattern for pattern in value):
+            raise serializers.ValidationError("Must be a non-empty list of event types, e.g. [\"bid.placed\", \"project.*\"]")
+        return value
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDelivery
+        fields = [
+            'delivery_id', 'event_id', 'event_type', 'status', 'attempts', 'next_attempt_at',
+            'last_status_code', 'last_error', 'latency_ms', 'created_at', 'delivered_at'
+        ]
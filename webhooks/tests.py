@@ -0,0 +1,243 @@
+import json
+import socket
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from faker import Faker
+from outbox.relay import relay_pending
+from tender.models import Tender
+from users.models import User
+from . import network
+from .models import WebhookDelivery, WebhookSubscription
+from .worker import (
+    SIGNATURE_HEADER, ConnectionPool, claim_deliveries, deliver_pending, lease_duration, record_results, sign
+)
+
+fake = Faker()
+
+class Receiver(BaseHTTPRequestHandler):
+    """Stand-in webhook receiver, answering with the server's `status_code` after `delay` seconds."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((self.client_address, dict(self.headers), body))
+        time.sleep(self.server.delay)
+        self.send_response(self.server.status_code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def public_dns(monkeypatch):
+    """Resolves the host names to a public address, except intranet.example.com and localhost."""
+    resolve = network.resolve
+    def fake_resolve(host, port):
+        if host == 'localhost' or host.replace('.', '').isdigit() or ':' in host:
+            return resolve(host, port)
+        address = '192.168.1.10' if host == 'intranet.example.com' else '93.184.215.14'
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port))]
+    monkeypatch.setattr(network, 'resolve', fake_resolve)
+
+@pytest.fixture
+def allow_private_addresses(settings):
+    settings.WEBHOOKS = {**settings.WEBHOOKS, 'ALLOW_PRIVATE_ADDRESSES': True}
+
+@pytest.fixture
+def receiver():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Receiver)
+    server.received = []
+    server.status_code = 200
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/hooks/tenderhub'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def client_user():
+    return User.objects.create_user(
+        username=fake.user_name(),
+        password=fake.password(),
+        is_client=True
+    )
+
+@pytest.fixture
+def tender(client_user):
+    return Tender.objects.create(
+        client=client_user,
+        title=fake.sentence(),
+        description=fake.text(),
+        max_duration=30,
+        min_budget=1000,
+        max_budget=5000,
+        deadline=fake.future_date()
+    )
+
+def place_bids(api_client, tender, count):
+    for _ in range(count):
+        vendor = User.objects.create_user(
+            username=f'{fake.unique.user_name()}_vendor', password='secret', is_vendor=True
+        )
+        api_client.force_authenticate(user=vendor)
+        response = api_client.post(reverse('tender-place-bid', args=[tender.tender_id]), {
+            'amount': 2000, 'proposal': fake.text(), 'delivery_time': 10
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('allow_private_addresses')
+class TestWebhookDelivery:
+    @pytest.fixture
+    def subscription(self, client_user, receiver):
+        return WebhookSubscription.objects.create(owner=client_user, url=receiver.url, event_types=['bid.*'])
+
+    def test_bids_are_delivered_signed_over_kept_alive_connections(self, api_client, tender, subscription, receiver):
+        place_bids(api_client, tender, 5)
+        relay_pending()
+        assert WebhookDelivery.objects.filter(status='pending').count() == 5
+
+        pool = ConnectionPool(timeout=5)
+        assert deliver_pending(pool, max_workers=2) == 5
+        pool.close()
+
+        assert len(receiver.received) == 5
+        # Two concurrent requests at most, each on a connection that is reused
+        assert pool.connections_opened <= 2
+        assert len({client_address for client_address, _, _ in receiver.received}) <= 2
+        for _, headers, body in receiver.received:
+            assert headers[SIGNATURE_HEADER] == sign(subscription.secret, headers['X-TenderHub-Timestamp'], body)
+            payload = json.loads(body)
+            assert payload['event_type'] == 'bid.placed'
+            assert payload['data']['tender_id'] == tender.tender_id
+
+        subscription.refresh_from_db()
+        assert (subscription.deliveries_succeeded, subscription.deliveries_failed) == (5, 0)
+        assert subscription.last_status_code == 200
+        assert subscription.average_latency_ms > 0
+        assert set(WebhookDelivery.objects.values_list('status', flat=True)) == {'succeeded'}
+
+    def test_failures_are_retried_with_backoff(self, api_client, tender, subscription, receiver, settings):
+        settings.WEBHOOKS = {**settings.WEBHOOKS, 'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 60}
+        receiver.status_code = 503
+        place_bids(api_client, tender, 1)
+        relay_pending()
+
+        deliver_pending()
+        delivery = WebhookDelivery.objects.get()
+        assert (delivery.status, delivery.attempts, delivery.last_error) == ('pending', 1, 'HTTP 503')
+        assert delivery.next_attempt_at > delivery.created_at
+
+        # Not due again before the backoff has passed
+        assert deliver_pending() == 0
+        WebhookDelivery.objects.update(next_attempt_at=delivery.created_at)
+        deliver_pending()
+        delivery.refresh_from_db()
+        assert (delivery.status, delivery.attempts) == ('failed', 2)
+
+        subscription.refresh_from_db()
+        assert (subscription.deliveries_failed, subscription.consecutive_failures) == (2, 2)
+
+    def test_slow_receiver_times_out(self, api_client, tender, subscription, receiver):
+        receiver.delay = 1
+        place_bids(api_client, tender, 1)
+        relay_pending()
+
+        pool = ConnectionPool(timeout=0.2)
+        deliver_pending(pool)
+        pool.close()
+        delivery = WebhookDelivery.objects.get()
+        assert delivery.attempts == 1
+        assert 'timed out' in delivery.last_error
+
+    def test_only_matching_subscriptions_receive_events(self, api_client, client_user, tender, receiver):
+        WebhookSubscription.objects.create(owner=client_user, url=receiver.url, event_types=['project.completed'])
+        place_bids(api_client, tender, 1)
+        relay_pending()
+        assert not WebhookDelivery.objects.exists()
+
+    def test_private_addresses_are_not_sent_to(self, api_client, tender, subscription, receiver, settings):
+        settings.WEBHOOKS = {**settings.WEBHOOKS, 'ALLOW_PRIVATE_ADDRESSES': False}
+        place_bids(api_client, tender, 1)
+        relay_pending()
+
+        deliver_pending()
+        assert not receiver.received
+        delivery = WebhookDelivery.objects.get()
+        assert 'not a public address' in delivery.last_error
+
+    def test_lease_covers_the_batch(self, settings):
+        settings.WEBHOOKS = {**settings.WEBHOOKS, 'TIMEOUT': 10, 'LEASE_MARGIN': 30}
+        # 50 deliveries on 8 threads are sent in 7 rounds of at most 2 timeouts each
+        assert lease_duration(50, 8) == timedelta(seconds=7 * 20 + 30)
+        assert lease_duration(1, 8) == timedelta(seconds=50)
+
+    def test_results_are_dropped_once_the_lease_is_lost(self, api_client, tender, subscription):
+        place_bids(api_client, tender, 2)
+        relay_pending()
+        first, second = claim_deliveries(10)
+
+        # The lease of the first delivery ran out and another worker claimed it
+        WebhookDelivery.objects.filter(pk=first.pk).update(next_attempt_at=timezone.now() + timedelta(hours=1))
+        record_results([(first, (200, '', 5.0)), (second, (200, '', 5.0))])
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.status, first.attempts) == ('pending', 0)
+        assert (second.status, second.attempts) == ('succeeded', 1)
+        subscription.refresh_from_db()
+        assert subscription.deliveries_succeeded == 1
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('public_dns')
+class TestWebhookSubscriptionEndpoints:
+    def test_create_and_list_own_subscriptions(self, api_client, client_user):
+        api_client.force_authenticate(user=client_user)
+        response = api_client.post(reverse('webhook-subscription-list'), {
+            'url': 'https://erp.example.com/hooks', 'event_types': ['bid.placed', 'project.completed']
+        }, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data['secret']) == 64
+
+        other = User.objects.create_user(username=fake.unique.user_name(), password='secret')
+        WebhookSubscription.objects.create(owner=other, url='https://example.com', event_types=['*'])
+        response = api_client.get(reverse('webhook-subscription-list'))
+        assert [row['url'] for row in response.data['results']] == ['https://erp.example.com/hooks']
+
+    def test_rejects_invalid_event_types(self, api_client, client_user):
+        api_client.force_authenticate(user=client_user)
+        response = api_client.post(reverse('webhook-subscription-list'), {
+            'url': 'https://erp.example.com/hooks', 'event_types': []
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize('url', [
+        'http://127.0.0.1:8000/hooks',
+        'http://localhost/hooks',
+        'http://169.254.169.254/latest/meta-data/',
+        'https://10.0.0.5/hooks',
+        'http://[::1]/hooks',
+        'https://intranet.example.com/hooks',
+    ])
+    def test_rejects_non_public_addresses(self, api_client, client_user, url):
+        api_client.force_authenticate(user=client_user)
+        response = api_client.post(reverse('webhook-subscription-list'), {
+            'url': url, 'event_types': ['bid.placed']
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'not a public address' in response.data['url'][0]
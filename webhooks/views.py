@@ -0,0 +1,36 @@
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import WebhookSubscription, generate_secret
+from .serializers import WebhookDeliverySerializer, WebhookSubscriptionSerializer
+
+class DeliveryPagination(CursorPagination):
+    page_size = 50
+    ordering = '-created_at'
+
+class WebhookSubscriptionViewSet(viewsets.ModelViewSet):
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return WebhookSubscription.objects.filter(owner_id=self.request.user.id)
+    
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+    
+    @action(detail=True, methods=['post'])
+    def rotate_secret(self, request, pk=None):
+        subscription = self.get_object()
+        subscription.secret = generate_secret()
+        subscription.save(update_fields=['secret'])
+        return Response(self.get_serializer(subscription).data, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def deliveries(self, request, pk=None):
+        subscription = self.get_object()
+        paginator = DeliveryPagination()
+        page = paginator.paginate_queryset(subscription.deliveries.all(), request, view=self)
+        return paginator.get_paginated_response(WebhookDeliverySerializer(page, many=True).data)
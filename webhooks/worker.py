@@ -0,0 +1,251 @@
+"""
+Sending of webhook deliveries.
+
+Deliveries are claimed from the database with SELECT ... FOR UPDATE SKIP LOCKED
+and leased by moving their `next_attempt_at` past the time the whole batch can
+take to send, so the HTTP requests run outside of any transaction and several
+workers can run side by side. The outcome of a delivery is only saved while the
+worker still holds its lease, i.e. while `next_attempt_at` is the lease it set.
+The requests are sent from a thread pool of at most MAX_WORKERS threads through
+`ConnectionPool`, which keeps the connections to each host alive between
+deliveries, and only to public addresses (see webhooks.network).
+"""
+import hashlib
+import hmac
+import http.client
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import network
+from .models import WebhookDelivery, WebhookSubscription
+
+SIGNATURE_HEADER = 'X-TenderHub-Signature'
+
+def sign(secret, timestamp, body):
+    """HMAC-SHA256 of "<timestamp>.<body>", so receivers can also reject replayed requests."""
+    message = f'{timestamp}.'.encode() + body
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+class ConnectionPool:
+    """
+    Thread-safe pool of keep-alive HTTP connections, keyed by (scheme, host, port).
+    At most `max_idle` idle connections are kept per host.
+    """
+    def __init__(self, timeout, max_idle=4):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _acquire(self, key):
+        with self._lock:
+            if self._idle[key]:
+                return self._idle[key].pop(), True
+            self.connections_opened += 1
+        scheme, host, port = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(host, port, timeout=self.timeout)
+        connection._create_connection = network.create_connection
+        return connection, False
+
+    def _release(self, key, connection):
+        with self._lock:
+            if len(self._idle[key]) < self.max_idle:
+                self._idle[key].append(connection)
+                return
+        connection.close()
+
+    def request(self, url, body, headers):
+        """Sends a POST request and returns the response status code."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+
+        while True:
+            connection, reused = self._acquire(key)
+            try:
+                connection.request('POST', path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                # The server closed an idle connection, retry once on a new one
+                if reused:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(key, connection)
+            return response.status
+
+    def close(self):
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+def retry_delay(attempts):
+    delay = settings.WEBHOOKS['RETRY_DELAY'] * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.WEBHOOKS['MAX_RETRY_DELAY']))
+
+def lease_duration(batch_size, max_workers):
+    """
+    Returns how long a batch is leased for: the batch is sent in
+    ceil(batch_size / max_workers) rounds, and a request can take two timeouts
+    (a retry on a kept-alive connection closed by the server), plus LEASE_MARGIN.
+    """
+    rounds = math.ceil(batch_size / max_workers)
+    return timedelta(seconds=rounds * 2 * settings.WEBHOOKS['TIMEOUT'] + settings.WEBHOOKS['LEASE_MARGIN'])
+
+def claim_deliveries(batch_size, max_workers=None, now=None):
+    """
+    Leases up to `batch_size` due deliveries to this worker and returns them,
+    with their `next_attempt_at` set to the lease.
+    """
+    now = now or timezone.now()
+    # Claimed deliveries are skipped by the other workers until the lease runs out
+    lease_until = now + lease_duration(batch_size, max_workers or settings.WEBHOOKS['MAX_WORKERS'])
+    with transaction.atomic():
+        deliveries = list(
+            WebhookDelivery.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('subscription')
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if deliveries:
+            WebhookDelivery.objects.filter(
+                pk__in=[delivery.pk for delivery in deliveries]
+            ).update(next_attempt_at=lease_until)
+    for delivery in deliveries:
+        delivery.next_attempt_at = lease_until
+    return deliveries
+
+def send_delivery(pool, delivery):
+    """Sends one delivery and returns (status code, error, latency in ms)."""
+    body = json.dumps(delivery.payload, cls=DjangoJSONEncoder).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'TenderHub-Webhooks/1.0',
+        'X-TenderHub-Event': delivery.event_type,
+        'X-TenderHub-Delivery': str(delivery.event_id),
+        'X-TenderHub-Timestamp': timestamp,
+        SIGNATURE_HEADER: sign(delivery.subscription.secret, timestamp, body),
+    }
+    started = time.perf_counter()
+    try:
+        status_code = pool.request(delivery.subscription.url, body, headers)
+        error = '' if 200 <= status_code < 300 else f"HTTP {status_code}"
+    except Exception as exc:
+        status_code, error = None, f"{type(exc).__name__}: {exc}"
+    return status_code, error, (time.perf_counter() - started) * 1000
+
+def record_results(results, now=None):
+    """
+    Saves the outcome of the attempts and updates the per-endpoint metrics. The
+    deliveries whose lease ran out, and may have been claimed by another worker
+    since, are left to that worker.
+    """
+    if not results:
+        return
+    now = now or timezone.now()
+    leases = Q()
+    for delivery, _ in results:
+        leases |= Q(pk=delivery.pk, next_attempt_at=delivery.next_attempt_at)
+
+    with transaction.atomic():
+        leased = set(
+            WebhookDelivery.objects.select_for_update().filter(leases, status='pending').values_list('pk', flat=True)
+        )
+        results = [(delivery, result) for delivery, result in results if delivery.pk in leased]
+
+        metrics = {}
+        for delivery, (status_code, error, latency_ms) in results:
+            delivery.attempts += 1
+            delivery.last_status_code = status_code
+            delivery.latency_ms = latency_ms
+            delivery.last_error = error
+            if not error:
+                delivery.status = 'succeeded'
+                delivery.delivered_at = now
+            elif delivery.attempts >= settings.WEBHOOKS['MAX_ATTEMPTS']:
+                delivery.status = 'failed'
+            else:
+                delivery.next_attempt_at = now + retry_delay(delivery.attempts)
+
+            stats = metrics.setdefault(delivery.subscription_id, {
+                'succeeded': 0, 'failed': 0, 'latency': 0.0, 'last': None,
+            })
+            stats['succeeded' if not error else 'failed'] += 1
+            stats['latency'] += latency_ms
+            stats['last'] = (status_code, latency_ms, error)
+
+        WebhookDelivery.objects.bulk_update(
+            [delivery for delivery, _ in results],
+            ['status', 'attempts', 'next_attempt_at', 'last_status_code', 'last_error', 'latency_ms', 'delivered_at'],
+        )
+        for subscription_id, stats in metrics.items():
+            status_code, latency_ms, error = stats['last']
+            changes = {
+                'deliveries_succeeded': F('deliveries_succeeded') + stats['succeeded'],
+                'deliveries_failed': F('deliveries_failed') + stats['failed'],
+                'total_latency_ms': F('total_latency_ms') + stats['latency'],
+                'last_latency_ms': latency_ms,
+                'last_status_code': status_code,
+                'last_delivery_at': now,
+            }
+            if error:
+                changes.update(last_failure_at=now, consecutive_failures=F('consecutive_failures') + stats['failed'])
+            else:
+                changes['consecutive_failures'] = 0
+            WebhookSubscription.objects.filter(pk=subscription_id).update(**changes)
+
+def deliver_batch(pool, executor, batch_size=None, max_workers=None):
+    """
+    Claims and sends one batch of deliveries, and returns the number sent.
+    `max_workers` is the size of the executor, which the lease is sized for.
+    """
+    deliveries = claim_deliveries(batch_size or settings.WEBHOOKS['BATCH_SIZE'], max_workers)
+    if not deliveries:
+        return 0
+    results = list(zip(deliveries, executor.map(lambda delivery: send_delivery(pool, delivery), deliveries)))
+    record_results(results)
+    return len(deliveries)
+
+def deliver_pending(pool=None, max_workers=None, batch_size=None):
+    """Sends batches until no delivery is due, and returns the number sent."""
+    own_pool = pool is None
+    pool = pool or ConnectionPool(settings.WEBHOOKS['TIMEOUT'], settings.WEBHOOKS['MAX_CONNECTIONS_PER_HOST'])
+    batch_size = batch_size or settings.WEBHOOKS['BATCH_SIZE']
+    max_workers = max_workers or settings.WEBHOOKS['MAX_WORKERS']
+    sent = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                count = deliver_batch(pool, executor, batch_size, max_workers)
+                sent += count
+                if count < batch_size:
+                    return sent
+    finally:
+        if own_pool:
+            pool.close()